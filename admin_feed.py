@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Admin dashboard feed - Server-Sent Events instead of polling
+
+Each active call carries a `view`: the dashboard fields (formatted date and
+time, epoch start) computed once when the call is created and patched in
+place on status changes. The admin event stream sends one `snapshot` of all
+views, then forwards `call_waiting` / `call_updated` / `call_ended` events
+from the in-process EventBus. Events are full-state upserts (or deletes),
+so replaying one the snapshot already reflects is harmless.
+
+Load is one write per event per connected admin; nothing is recomputed per
+poll. A subscriber that falls behind is dropped and its stream closed - the
+browser reconnects and starts again from a fresh snapshot.
+"""
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import json_codec
+from notifier import Subscription
+
+RETRY_MS = 3000
+
+
+def call_view(call_id: str, call_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Dashboard fields for one call, computed once at creation"""
+    started: datetime = call_data['timestamp']
+    return {
+        'call_id': call_id,
+        'customer_name': call_data['customer_name'],
+        'customer_peer_id': call_data.get('peer_id'),
+        'status': call_data['status'],
+        'admin_connected': call_data.get('admin_connected', False),
+        'priority': call_data.get('priority', 0),
+        'assigned_to': None,
+        'presence': 'online',  # away / online pushed by the presence tracker
+        'start_time': started.isoformat(),
+        'start_ts': started.timestamp(),
+        'formatted_date': started.strftime('%d.%m.%Y'),
+        'formatted_time': started.strftime('%H:%M'),
+    }
+
+
+def with_minutes_ago(views: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Copies of `views` with minutes_ago filled in (for /api/active-calls)"""
+    now = time.time() if now is None else now
+    return [dict(view, minutes_ago=int((now - view['start_ts']) // 60)) for view in views]
+
+
+def format_sse(event: str, data: Any, seq: Optional[int] = None) -> bytes:
+    """One SSE frame; json_codec output never contains raw newlines"""
+    head = f'id: {seq}\n' if seq is not None else ''
+    return f'{head}event: {event}\n'.encode() + b'data: ' + json_codec.dumps(data) + b'\n\n'
+
+
+def stream_events(write: Callable[[bytes], None], subscription: Subscription,
+                  snapshot: List[Dict[str, Any]], ping_interval: float = 15.0,
+                  keep_open: Callable[[], bool] = lambda: True,
+                  extra: Optional[Dict[str, Any]] = None) -> int:
+    """Write snapshot then events until the subscription closes or keep_open() fails
+
+    keep_open is re-checked on every idle ping (e.g. session still valid);
+    `extra` is merged into the snapshot payload (e.g. the admin's own id).
+    Write errors (client gone) propagate to the caller. Returns events sent.
+    """
+    payload = {'calls': snapshot, 'server_time': time.time()}
+    payload.update(extra or {})
+    write(f'retry: {RETRY_MS}\n'.encode() + format_sse('snapshot', payload))
+    sent = 0
+    while True:
+        item = subscription.get(timeout=ping_interval)
+        if item is None:
+            if subscription.closed:
+                return sent
+            if not keep_open():
+                write(format_sse('session_expired', {}))
+                return sent
+            write(b': ping\n\n')
+            continue
+        seq, event, data = item
+        write(format_sse(event, data, seq))
+        sent += 1
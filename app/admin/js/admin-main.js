@@ -3,13 +3,15 @@ class AdminPanel {
   constructor() {
     this.sessionData = null;
     this.active = new Map();
+    this.eventStream = null;
+    this.adminId = null;
+    this.reconnectDelay = 1000;
     this.init();
   }
 
   init() {
     this.loadSession();
     this.bindEvents();
-    this.startPolling();
     this.startDatabaseMonitoring();
   }
 
@@ -74,6 +76,7 @@ class AdminPanel {
         this.sessionData = {
           callId: data.callId,
           csrfToken: data.csrfToken,
+          sessionToken: data.sessionToken || null,
           expires: new Date(Date.now() + 8 * 60 * 60 * 1000).toISOString()
         };
         localStorage.setItem('adminSession', JSON.stringify(this.sessionData));
@@ -117,10 +120,15 @@ class AdminPanel {
   showDashboard() {
     $('#otpScreen').classList.add('hidden');
     $('#dashboardScreen').classList.remove('hidden');
-    this.loadRealData();
+    this.connectEvents();
   }
 
   logout() {
+    if (this.sessionData) {
+      // Revoke the server-side session / signed token (best effort)
+      this.apiCall('/api/logout', { method: 'POST', body: '{}', keepalive: true }).catch(() => {});
+    }
+    this.eventStream?.abort();
     localStorage.removeItem('adminSession');
     this.sessionData = null;
     location.reload();
@@ -135,6 +143,9 @@ class AdminPanel {
       'X-CSRF-Token': this.sessionData.csrfToken,
       ...options.headers
     };
+    if (this.sessionData.sessionToken) {
+      headers['Authorization'] = `Bearer ${this.sessionData.sessionToken}`;
+    }
 
     return fetch(url, { ...options, headers });
   }
@@ -154,15 +165,34 @@ class AdminPanel {
 
   updateActiveCalls(calls) {
     this.active.clear();
-    calls.forEach(call => {
-      this.active.set(call.call_id, {
-        id: call.call_id,
-        name: call.customer_name,
-        status: call.status,
-        timestamp: call.formatted_time
-      });
+    calls.forEach(call => this.upsertCall(call));
+    this.renderCounts();
+  }
+
+  upsertCall(call) {
+    const previous = this.active.get(call.call_id);
+    this.active.set(call.call_id, {
+      id: call.call_id,
+      name: call.customer_name,
+      status: call.status,
+      priority: call.priority || 0,
+      assignedTo: call.assigned_to || null,
+      presence: call.presence || 'online',
+      timestamp: call.formatted_time
     });
+    // Customer stopped sending heartbeats (tab closed, network lost)
+    if (call.presence === 'away' && previous && previous.presence !== 'away'
+        && (!call.assigned_to || call.assigned_to === this.adminId)) {
+      CommonUtils.Notifications.warning(`${call.customer_name} bağlantısı koptu`, 'Müşteri Yanıt Vermiyor');
+    }
+    // Queue handed this call to us (auto-assignment)
+    if (this.adminId && call.assigned_to === this.adminId && previous?.assignedTo !== this.adminId
+        && call.status === 'waiting') {
+      CommonUtils.Notifications.info(`${call.customer_name} size atandı`, 'Yeni Arama');
+    }
+  }
 
+  renderCounts() {
     const activeCount = Array.from(this.active.values()).filter(c => c.status !== 'waiting').length;
     const queueCount = Array.from(this.active.values()).filter(c => c.status === 'waiting').length;
 
@@ -170,8 +200,74 @@ class AdminPanel {
     $('#lblQueue').textContent = queueCount;
   }
 
-  startPolling() {
-    setInterval(() => this.loadRealData(), 3000);
+  // Server-pushed dashboard feed (SSE over fetch so auth headers are sent):
+  // one snapshot, then call_waiting / call_updated / call_ended events
+  async connectEvents() {
+    if (!this.sessionData || this.eventStream) return;
+    const controller = new AbortController();
+    this.eventStream = controller;
+    try {
+      const res = await this.apiCall('/api/admin/events', { signal: controller.signal });
+      const type = res.headers.get('Content-Type') || '';
+      if (!type.startsWith('text/event-stream') || !res.body) {
+        // Unauthorized (JSON reply) or no streaming support: one plain load
+        await this.loadRealData();
+        throw new Error('Event stream unavailable');
+      }
+      const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buffer = '';
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += value;
+        let end;
+        while ((end = buffer.indexOf('\n\n')) !== -1) {
+          this.handleFrame(buffer.slice(0, end));
+          buffer = buffer.slice(end + 2);
+        }
+      }
+    } catch (err) {
+      if (controller.signal.aborted) return;
+      console.error('Event stream error:', err);
+    } finally {
+      if (this.eventStream === controller) this.eventStream = null;
+    }
+    if (!this.sessionData) return;
+    // Reconnect (the server closes slow or expired streams); back off on repeated failures
+    setTimeout(() => this.connectEvents(), this.reconnectDelay);
+    this.reconnectDelay = Math.min(this.reconnectDelay * 2, 30000);
+  }
+
+  handleFrame(frame) {
+    let event = 'message';
+    let data = '';
+    frame.split('\n').forEach(line => {
+      if (line.startsWith('event: ')) event = line.slice(7);
+      else if (line.startsWith('data: ')) data += line.slice(6);
+    });
+    if (!data) return;  // ping / retry-only frame
+    const payload = JSON.parse(data);
+
+    switch (event) {
+      case 'snapshot':
+        this.reconnectDelay = 1000;
+        this.adminId = payload.admin_id || null;
+        this.updateActiveCalls(payload.calls);
+        return;
+      case 'call_waiting':
+      case 'call_updated':
+        this.upsertCall(payload);
+        break;
+      case 'call_ended':
+        this.active.delete(payload.call_id);
+        break;
+      case 'session_expired':
+        this.logout();
+        return;
+      default:
+        return;
+    }
+    this.renderCounts();
   }
 
   async acceptCall(callId) {
@@ -205,6 +301,7 @@ class AdminPanel {
   }
 
   refreshData() {
+    // The event stream keeps the dashboard current; this forces a full reload
     this.loadRealData();
   }
 
@@ -97,6 +97,7 @@ class WebRTCManager {
       this.pc.onconnectionstatechange = () => {
         console.log('[WebRTC] Connection state:', this.pc.connectionState);
         if (this.pc.connectionState === 'connected') {
+          this.sendSignal('connected', {});  // call setup timing
           LoadingManager.hide();
           ErrorHandler.show('Gelişmiş bağlantı kuruldu', 'success');
           this.startEnhancedMonitoring();
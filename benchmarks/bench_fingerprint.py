@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: per-request rate-limit fingerprint
+
+"sha256" is the previous check_rate_limit computation (SHA-256 hexdigest of
+"ip:ua", truncated); "blake2b" is the keyed BLAKE2b now used; "lru" is
+server_v2.client_fingerprint's cached path (a new connection from a known
+client); "connection" is Handler.connection_fingerprint's per-connection
+memo (every request after the first on a keep-alive connection).
+
+    python benchmarks/bench_fingerprint.py [iterations]
+"""
+import hashlib
+import secrets
+import sys
+import timeit
+from functools import lru_cache
+
+KEY = secrets.token_bytes(32)
+IP = '203.0.113.7'
+UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36'
+
+
+def sha256_fp(ip, ua):
+    return hashlib.sha256(f"{ip}:{ua}".encode()).hexdigest()[:16]
+
+
+def blake2b_fp(ip, ua):
+    return hashlib.blake2b(f"{ip}:{ua}".encode(), digest_size=8, key=KEY).hexdigest()
+
+
+cached_fp = lru_cache(maxsize=4096)(blake2b_fp)
+
+
+class Connection:
+    """Same memo as Handler.connection_fingerprint"""
+
+    def __init__(self):
+        self._fingerprint = None
+        self.headers = {'User-Agent': UA}
+
+    def fingerprint(self):
+        user_agent = self.headers.get('User-Agent', '')
+        cached = self._fingerprint
+        if cached is None or cached[0] != user_agent:
+            cached = self._fingerprint = (user_agent, cached_fp(IP, user_agent))
+        return cached[1]
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    conn = Connection()
+    cases = {
+        'sha256': lambda: sha256_fp(IP, UA),
+        'blake2b': lambda: blake2b_fp(IP, UA),
+        'lru': lambda: cached_fp(IP, UA),
+        'connection': conn.fingerprint,
+    }
+    baseline = None
+    print(f"{'fingerprint':<14}{'ns/op':>10}{'speedup':>10}")
+    for name, fn in cases.items():
+        t = min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e9
+        baseline = baseline or t
+        print(f"{name:<14}{t:>10.0f}{baseline / t:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark: /api/poll-signal response serialization
+
+Compares the old send_json path (json.dumps + encode) and the old do_POST
+path (decode + json.loads) against every installed json_codec backend.
+
+    python benchmarks/bench_json_codec.py [iterations]
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_codec  # noqa: E402
+
+
+def make_sdp(kind: str, lines: int = 90) -> str:
+    """Realistic-size SDP blob (~4-5 KB) with audio + video sections"""
+    head = [
+        'v=0',
+        'o=- 4611731400430051336 2 IN IP4 127.0.0.1',
+        's=-',
+        't=0 0',
+        'a=group:BUNDLE 0 1',
+        'a=extmap-allow-mixed',
+        'a=msid-semantic: WMS stream',
+        'm=audio 9 UDP/TLS/RTP/SAVPF 111 63 9 0 8 13 110 126',
+        'c=IN IP4 0.0.0.0',
+        'a=ice-ufrag:abcd',
+        'a=ice-pwd:abcdefghijklmnopqrstuvwx',
+        'a=fingerprint:sha-256 ' + ':'.join(['AB'] * 32),
+        f'a=setup:{"actpass" if kind == "offer" else "active"}',
+        'a=rtpmap:111 opus/48000/2',
+        'a=fmtp:111 minptime=10;useinbandfec=1;stereo=1;maxaveragebitrate=128000',
+    ]
+    body = [f'a=rtpmap:{96 + i} VP9/90000\r\na=rtcp-fb:{96 + i} nack pli' for i in range(lines // 2)]
+    return '\r\n'.join(head + body) + '\r\n'
+
+
+def make_poll_response() -> dict:
+    candidates = [
+        {
+            'candidate': f'candidate:{i} 1 udp 2122260223 192.168.1.{i} 5{i:04d} typ host generation 0',
+            'sdpMid': '0',
+            'sdpMLineIndex': 0,
+            'usernameFragment': 'abcd',
+        }
+        for i in range(8)
+    ]
+    return {
+        'success': True,
+        'offer': {'type': 'offer', 'sdp': make_sdp('offer')},
+        'answer': {'type': 'answer', 'sdp': make_sdp('answer')},
+        'ice_candidates': candidates,
+        'status': 'connected',
+    }
+
+
+def bench(label: str, fn, number: int) -> float:
+    seconds = min(timeit.repeat(fn, number=number, repeat=5))
+    per_call_us = seconds / number * 1e6
+    print(f'  {label:<28} {per_call_us:8.2f} us/op')
+    return per_call_us
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    payload = make_poll_response()
+    encoded = json.dumps(payload).encode('utf-8')
+    print(f'poll-signal payload: {len(encoded)} bytes, {number} iterations')
+
+    print('encode:')
+    baseline = bench('stdlib dumps+encode (old)', lambda: json.dumps(payload).encode('utf-8'), number)
+    for name in json_codec.BACKENDS:
+        dumps, _, actual = json_codec.load_backend(name)
+        if actual != name:
+            continue
+        t = bench(f'json_codec[{name}]', lambda: dumps(payload), number)
+        print(f'  {"":<28} {baseline / t:8.2f}x')
+
+    print('decode:')
+    baseline = bench('decode+stdlib loads (old)', lambda: json.loads(encoded.decode('utf-8')), number)
+    for name in json_codec.BACKENDS:
+        _, loads, actual = json_codec.load_backend(name)
+        if actual != name:
+            continue
+        t = bench(f'json_codec[{name}]', lambda: loads(encoded), number)
+        print(f'  {"":<28} {baseline / t:8.2f}x')
+
+    print(f'active backend: {json_codec.BACKEND}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: 16 threads recording request metrics at once
+
+"global lock" is the pre-shard MetricsCollector.record_request hot path
+(every update under one shared lock), reproduced here so both run the same
+work; "sharded" is the current collector (fixed shard pool). Two workloads:
+long-lived threads recording throughout, and short-lived threads (one per
+keep-alive connection, a few records each, 16 running at a time) as the
+ThreadingHTTPServer produces them. Totals are checked to match after each run.
+
+    python benchmarks/bench_metrics_contention.py [records_per_thread] [threads]
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metric_types import Histogram  # noqa: E402
+from metrics import MetricsCollector  # noqa: E402
+
+logger = logging.getLogger('metrics')
+
+ENDPOINTS = ['/api/poll-signal', '/api/heartbeat', '/api/signal', '/api/admin-calls']
+
+
+class GlobalLockCollector:
+    def __init__(self):
+        self.metrics_lock = threading.Lock()
+        self.total_requests = 0
+        self.errors_total = 0
+        self.response_times = deque(maxlen=1000)
+        self.latency = Histogram()
+        self.endpoint_latency = {}
+        self.request_counts_by_status = defaultdict(int)
+
+    def record_request(self, endpoint, response_time_ms, status_code):
+        with self.metrics_lock:
+            self.total_requests += 1
+            self.response_times.append(response_time_ms)
+            self.latency.record(response_time_ms)
+            histogram = self.endpoint_latency.get(endpoint)
+            if histogram is None:
+                histogram = self.endpoint_latency[endpoint] = Histogram()
+            histogram.record(response_time_ms)
+            self.request_counts_by_status[(endpoint, status_code)] += 1
+            if status_code >= 400:
+                self.errors_total += 1
+            logger.debug(f"Request recorded: {endpoint} - {response_time_ms}ms - {status_code}")
+
+
+def worker(collector, n, seed, barrier):
+    barrier.wait()
+    for i in range(n):
+        collector.record_request(ENDPOINTS[(i + seed) % 4], float((i * 7 + seed) % 300), 404 if i % 50 == 0 else 200)
+
+
+def run(collector, n, threads):
+    barrier = threading.Barrier(threads + 1)
+    pool = [threading.Thread(target=worker, args=(collector, n, s, barrier)) for s in range(threads)]
+    for t in pool:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - start
+
+
+def run_short_lived(collector, n, threads, per_connection=20):
+    """n records per slot, in waves of `threads` connections of `per_connection` records"""
+    start = time.perf_counter()
+    for wave in range(n // per_connection):
+        barrier = threading.Barrier(threads)
+        pool = [threading.Thread(target=worker, args=(collector, per_connection, wave + s, barrier))
+                for s in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+    return time.perf_counter() - start
+
+
+def compare(label, runner, n, threads):
+    total = n * threads
+    legacy = GlobalLockCollector()
+    t_legacy = min(runner(legacy, n, threads) for _ in range(3))
+    sharded = MetricsCollector()
+    t_sharded = min(runner(sharded, n, threads) for _ in range(3))
+
+    snap = sharded.get_exposition_snapshot()
+    assert sum(snap['requests'].values()) == legacy.total_requests == total * 3
+    assert snap['errors_total'] == legacy.errors_total
+    assert snap['requests'] == dict(legacy.request_counts_by_status)
+
+    print(f'{label}: {threads} threads x {n} records')
+    print(f'  global lock  {t_legacy / total * 1e6:8.3f} us/record   {total / t_legacy:>12,.0f} rec/s')
+    print(f'  sharded      {t_sharded / total * 1e6:8.3f} us/record   {total / t_sharded:>12,.0f} rec/s   ({t_legacy / t_sharded:.2f}x)')
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f'GIL {"on" if gil else "off"}')
+    compare('long-lived', run, n, threads)
+    compare('short-lived (20 records per thread)', run_short_lived, max(n // 200, 1) * 20, threads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: admin auth check, session table vs signed token
+
+"table" is check_admin_auth's in-process path (dict lookup under the
+server's 2000-session table, datetime expiry and IP comparison); "token" is
+SessionTokenSigner.verify (HMAC-SHA256 + two keyed BLAKE2b fingerprints).
+The token check costs a few microseconds of CPU but needs no shared state,
+so it is the same on every worker and node and survives restarts.
+
+    python benchmarks/bench_session_tokens.py [iterations]
+"""
+import os
+import secrets
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_tokens import SessionTokenSigner  # noqa: E402
+
+IP = '203.0.113.7'
+UA = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15'
+
+
+def make_table(size):
+    sessions = {}
+    for _ in range(size):
+        sessions[secrets.token_urlsafe(16)] = {
+            'expires': datetime.now() + timedelta(hours=8),
+            'ip_address': IP,
+            'user_agent': UA,
+        }
+    return sessions
+
+
+def table_check(sessions, call_id):
+    if not call_id or call_id not in sessions:
+        return False
+    session = sessions[call_id]
+    if datetime.now() >= session['expires']:
+        return False
+    if session.get('ip_address') != IP:
+        return False
+    return True
+
+
+def main() -> None:
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    sessions = make_table(2000)
+    call_id = next(iter(sessions))
+    signer = SessionTokenSigner(secrets.token_bytes(32), 8 * 3600)
+    token = signer.issue(IP, UA)['token']
+    assert table_check(sessions, call_id) and signer.verify(token, IP, UA)
+
+    t_table = min(timeit.repeat(lambda: table_check(sessions, call_id), number=number, repeat=5))
+    t_token = min(timeit.repeat(lambda: signer.verify(token, IP, UA), number=number, repeat=5))
+    t_reject = min(timeit.repeat(lambda: signer.verify(token[:-1] + 'x', IP, UA), number=number, repeat=5))
+
+    print(f"{'check':<22}{'us/op':>10}")
+    print(f"{'table lookup':<22}{t_table / number * 1e6:>10.2f}")
+    print(f"{'token verify':<22}{t_token / number * 1e6:>10.2f}")
+    print(f"{'token reject (MAC)':<22}{t_reject / number * 1e6:>10.2f}")
+    print(f"token length: {len(token)} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Call queue - waiting calls in a heap, handed to admins automatically
+
+Ordering key is `arrival - priority * priority_step`: one priority level is
+worth `priority_step` seconds of waiting, so higher priority calls go first
+but an old low priority call still overtakes newer ones (no starvation).
+The key never changes while a call waits, so a plain heap with lazy
+deletion gives O(log n) enqueue, dequeue and reprioritise.
+
+Admins register while their dashboard is connected. With auto_assign, the
+head of the queue goes to the admin that has been idle longest; an admin
+stays busy until the call is released. An assignment that was not accepted
+goes back to the queue, at its original place, when the admin disconnects
+or when `assign_timeout` passes (the owner schedules expire_assignments,
+e.g. on the expiry scheduler); the admin who let it lapse becomes the
+idle-last admin, so another idle admin is offered the call first.
+
+position() / estimate() are O(1): positions are cached and rebuilt lazily
+on the first query after the queue changed (customer pages poll far more
+often than calls arrive). The wait estimate is
+ceil(position / admins) * average handle time (EWMA of assigned -> released).
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Assignment = Tuple[str, Optional[str]]  # (call_id, admin_id); None = back in the queue
+
+# Heap entry: [key, seq, call_id (None = removed), enqueued_at, priority]
+_KEY, _SEQ, _CALL, _ENQUEUED, _PRIORITY = range(5)
+
+
+class CallQueue:
+    """Priority/FIFO queue of waiting calls with admin auto-assignment"""
+
+    def __init__(self, priority_step: float = 60.0, handle_seconds: float = 180.0,
+                 auto_assign: bool = True, ewma_alpha: float = 0.2,
+                 assign_timeout: Optional[float] = None,
+                 on_wait: Optional[Callable[[str, float], None]] = None,
+                 on_depth: Optional[Callable[[int], None]] = None):
+        self.priority_step = priority_step
+        self.auto_assign = auto_assign
+        self.ewma_alpha = ewma_alpha
+        self.assign_timeout = assign_timeout  # seconds to accept an auto-assignment; None = no limit
+        self.handle_seconds = handle_seconds  # EWMA, seeded with the configured guess
+        self._on_wait = on_wait    # (outcome, waited_ms): assigned | answered | abandoned
+        self._on_depth = on_depth
+        self._lock = threading.Lock()
+        self._heap: List[list] = []
+        self._entries: Dict[str, list] = {}
+        self._seq = itertools.count()
+        self._removed = 0
+        self._positions: Optional[Dict[str, int]] = None
+        self._admins: Dict[str, int] = {}       # admin_id -> open dashboards
+        self._idle: Dict[str, None] = {}        # insertion order = idle longest first
+        self._busy: Dict[str, str] = {}         # admin_id -> call_id
+        # call_id -> [admin_id, assigned_at, accepted, heap entry for requeue]
+        self._assigned: Dict[str, list] = {}
+        self._requeued: List[Assignment] = []   # reported by the next _dispatch
+        self.counters = {'enqueued': 0, 'assigned': 0, 'answered': 0, 'abandoned': 0, 'requeued': 0,
+                         'assign_expired': 0}
+
+    # -- queue ---------------------------------------------------------
+
+    def enqueue(self, call_id: str, priority: int = 0, now: Optional[float] = None) -> List[Assignment]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if call_id in self._entries or call_id in self._assigned:
+                return []
+            self._push([now - priority * self.priority_step, next(self._seq), call_id, now, priority])
+            self.counters['enqueued'] += 1
+            return self._dispatch(now)
+
+    def reprioritize(self, call_id: str, priority: int) -> bool:
+        """Change a waiting call's priority, keeping its original arrival time"""
+        with self._lock:
+            entry = self._entries.get(call_id)
+            if entry is None:
+                return False
+            self._discard(entry)
+            enqueued = entry[_ENQUEUED]
+            self._push([enqueued - priority * self.priority_step, next(self._seq), call_id, enqueued, priority])
+            return True
+
+    def remove(self, call_id: str, now: Optional[float] = None) -> List[Assignment]:
+        """Call ended or abandoned: leave the queue or free its admin"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(call_id)
+            if entry is not None:
+                self._discard(entry)
+                self._waited('abandoned', entry, now)
+                return []
+            assignment = self._assigned.pop(call_id, None)
+            if assignment is None:
+                return []
+            admin_id, assigned_at, accepted, _ = assignment
+            if accepted:
+                self.handle_seconds += self.ewma_alpha * ((now - assigned_at) - self.handle_seconds)
+            self._free(admin_id, call_id)
+            return self._dispatch(now)
+
+    def claim(self, call_id: str, admin_id: str, now: Optional[float] = None) -> List[Assignment]:
+        """Admin accepted `call_id` (picked manually or the one assigned to them)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(call_id)
+            assignment = self._assigned.get(call_id)
+            if entry is not None:
+                self._discard(entry)
+                self._waited('answered', entry, now)
+                self._take(admin_id, call_id, now, entry)
+            elif assignment is not None and assignment[0] != admin_id:
+                # Another admin answered first; the assigned one is free again
+                self._free(assignment[0], call_id)
+                self._take(admin_id, call_id, assignment[1], assignment[3])
+            elif assignment is None:
+                self._take(admin_id, call_id, now, None)
+            self._assigned[call_id][2] = True
+            return self._dispatch(now)
+
+    # -- admins --------------------------------------------------------
+
+    def add_admin(self, admin_id: str, now: Optional[float] = None) -> List[Assignment]:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._admins[admin_id] = self._admins.get(admin_id, 0) + 1
+            if admin_id not in self._busy:
+                self._idle.setdefault(admin_id, None)
+            return self._dispatch(now)
+
+    def remove_admin(self, admin_id: str, now: Optional[float] = None) -> List[Assignment]:
+        """Dashboard closed; an unaccepted assignment goes back to its place in the queue"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            count = self._admins.get(admin_id, 0) - 1
+            if count > 0:
+                self._admins[admin_id] = count
+                return []
+            self._admins.pop(admin_id, None)
+            self._idle.pop(admin_id, None)
+            call_id = self._busy.get(admin_id)
+            assignment = self._assigned.get(call_id) if call_id else None
+            if assignment is not None and not assignment[2] and assignment[3] is not None:
+                del self._busy[admin_id]
+                self._requeue(call_id)
+            return self._dispatch(now)
+
+    def expire_assignments(self, call_ids: List[str], now: Optional[float] = None
+                           ) -> Tuple[List[Assignment], Dict[str, Optional[float]]]:
+        """Requeue auto-assignments not accepted within assign_timeout
+
+        Returns (assignments, rearm) in the expiry scheduler's convention:
+        rearm maps still-pending calls to None - every assignment handed out
+        is scheduled by the owner, so a younger one already has its own entry.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            rearm: Dict[str, Optional[float]] = {}
+            if self.assign_timeout is None:
+                return [], rearm
+            for call_id in call_ids:
+                assignment = self._assigned.get(call_id)
+                if assignment is None or assignment[2] or assignment[3] is None:
+                    continue  # released, accepted or picked manually
+                admin_id, assigned_at = assignment[0], assignment[1]
+                if now - assigned_at < self.assign_timeout:
+                    rearm[call_id] = None
+                    continue
+                self._busy.pop(admin_id, None)
+                self._requeue(call_id)
+                self.counters['assign_expired'] += 1
+                if admin_id in self._admins:
+                    self._idle[admin_id] = None  # idle-last: others get the call first
+            return self._dispatch(now), rearm
+
+    def awaiting_accept(self, call_id: str) -> bool:
+        """Auto-assigned to an admin who has not accepted it yet"""
+        assignment = self._assigned.get(call_id)
+        return assignment is not None and not assignment[2] and assignment[3] is not None
+
+    # -- queries -------------------------------------------------------
+
+    def position(self, call_id: str) -> Optional[int]:
+        """1-based place in the queue, None if not waiting"""
+        positions = self._positions
+        if positions is None:
+            positions = self._rebuild_positions()
+        return positions.get(call_id)
+
+    def estimate(self, position: int) -> float:
+        """Seconds until the call at `position` is likely picked up"""
+        capacity = max(1, len(self._admins))
+        return math.ceil(position / capacity) * self.handle_seconds
+
+    def status(self, call_id: str) -> Dict[str, Any]:
+        """Customer view: position and estimated wait, or who it is assigned to"""
+        position = self.position(call_id)
+        if position is not None:
+            return {
+                'position': position,
+                'estimated_wait_seconds': round(self.estimate(position)),
+                'queue_length': len(self._entries),
+            }
+        assignment = self._assigned.get(call_id)
+        return {'position': None, 'assigned': assignment is not None}
+
+    def assigned_to(self, call_id: str) -> Optional[str]:
+        assignment = self._assigned.get(call_id)
+        return assignment[0] if assignment else None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def waiting_count(self) -> int:
+        """Queued calls plus assigned ones no admin has accepted yet"""
+        return len(self._entries) + sum(1 for a in list(self._assigned.values()) if not a[2])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'depth': len(self._entries),
+                'admins': len(self._admins),
+                'idle_admins': len(self._idle),
+                'busy_admins': len(self._busy),
+                'avg_handle_seconds': round(self.handle_seconds, 1),
+                'auto_assign': self.auto_assign,
+                **self.counters,
+            }
+
+    # -- internals (caller holds self._lock) ---------------------------
+
+    def _push(self, entry: list) -> None:
+        heapq.heappush(self._heap, entry)
+        self._entries[entry[_CALL]] = entry
+        self._changed()
+
+    def _discard(self, entry: list) -> None:
+        del self._entries[entry[_CALL]]
+        entry[_CALL] = None  # tombstone, skipped when it reaches the top
+        self._removed += 1
+        if self._removed > 64 and self._removed > len(self._heap) // 2:
+            self._heap = [e for e in self._heap if e[_CALL] is not None]
+            heapq.heapify(self._heap)
+            self._removed = 0
+        self._changed()
+
+    def _pop(self) -> Optional[list]:
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if entry[_CALL] is not None:
+                del self._entries[entry[_CALL]]
+                self._changed()
+                return entry
+            self._removed -= 1
+        return None
+
+    def _changed(self) -> None:
+        self._positions = None
+        if self._on_depth is not None:
+            self._on_depth(len(self._entries))
+
+    def _rebuild_positions(self) -> Dict[str, int]:
+        with self._lock:
+            if self._positions is None:
+                ordered = sorted(self._entries.values())
+                self._positions = {entry[_CALL]: i for i, entry in enumerate(ordered, 1)}
+            return self._positions
+
+    def _waited(self, outcome: str, entry: list, now: float) -> None:
+        self.counters[outcome] += 1
+        if self._on_wait is not None:
+            self._on_wait(outcome, (now - entry[_ENQUEUED]) * 1000)
+
+    def _take(self, admin_id: str, call_id: str, assigned_at: float, entry: Optional[list]) -> None:
+        previous = self._busy.get(admin_id)
+        if previous is not None and previous != call_id:
+            old = self._assigned.get(previous)
+            if old is not None and not old[2] and old[3] is not None:
+                # Admin took another call instead of the one assigned to them
+                self._requeue(previous)
+        self._assigned[call_id] = [admin_id, assigned_at, False, entry]
+        self._busy[admin_id] = call_id
+        self._idle.pop(admin_id, None)
+
+    def _requeue(self, call_id: str) -> None:
+        """Unaccepted assignment goes back at its original place"""
+        entry = self._assigned.pop(call_id)[3]
+        self._push([entry[_KEY], next(self._seq), call_id, entry[_ENQUEUED], entry[_PRIORITY]])
+        self._requeued.append((call_id, None))
+        self.counters['requeued'] += 1
+
+    def _free(self, admin_id: str, call_id: str) -> None:
+        if self._busy.get(admin_id) != call_id:
+            return
+        del self._busy[admin_id]
+        if admin_id in self._admins:
+            self._idle[admin_id] = None
+
+    def _dispatch(self, now: float) -> List[Assignment]:
+        assignments, self._requeued = self._requeued, []
+        if not self.auto_assign:
+            return assignments
+        while self._idle and self._entries:
+            admin_id = next(iter(self._idle))
+            entry = self._pop()
+            if entry is None:
+                break
+            call_id = entry[_CALL]
+            self._waited('assigned', entry, now)
+            self._take(admin_id, call_id, now, entry)
+            assignments.append((call_id, admin_id))
+        return assignments
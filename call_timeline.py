@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Call lifecycle timeline - monotonic stage timestamps per call
+
+Each active call carries a CallTimeline. Handlers mark stages as they happen
+(created, accepted, offer, answer, first/last ICE, connected, ended); the
+first mark of a stage wins, except last_ice which tracks the latest
+candidate. Whenever a mark completes one of the SETUP_INTERVALS, the interval
+is returned so the caller can feed it into the call-setup histograms.
+"""
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+STAGES: Tuple[str, ...] = (
+    'created', 'accepted', 'offer', 'answer', 'first_ice', 'last_ice', 'connected', 'ended',
+)
+
+# Derived latencies: name -> (from stage, to stage)
+SETUP_INTERVALS: Dict[str, Tuple[str, str]] = {
+    'time_to_accept': ('created', 'accepted'),
+    'time_to_offer': ('created', 'offer'),
+    'offer_to_answer': ('offer', 'answer'),
+    'ice_gathering': ('first_ice', 'last_ice'),
+    'answer_to_connect': ('answer', 'connected'),
+    'time_to_connect': ('created', 'connected'),
+    'call_duration': ('connected', 'ended'),
+}
+
+_ENDING_AT: Dict[str, List[Tuple[str, str]]] = {}
+for _name, (_start, _end) in SETUP_INTERVALS.items():
+    _ENDING_AT.setdefault(_end, []).append((_name, _start))
+
+
+class CallTimeline:
+    """Monotonic stage marks for one call (wall clock kept only for 'created')"""
+
+    __slots__ = ('created_at', 'marks')
+
+    def __init__(self, now: Optional[float] = None):
+        self.created_at = datetime.now()
+        self.marks: Dict[str, float] = {'created': time.monotonic() if now is None else now}
+
+    def mark(self, stage: str, now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Record `stage`; returns (interval, milliseconds) pairs it completed"""
+        if stage == 'ice':
+            now = time.monotonic() if now is None else now
+            completed = self.mark('first_ice', now)
+            self.marks['last_ice'] = now
+            return completed
+        if stage in self.marks:
+            return []
+        now = time.monotonic() if now is None else now
+        self.marks[stage] = now
+        completed = []
+        for name, start_stage in _ENDING_AT.get(stage, ()):
+            start = self.marks.get(start_stage)
+            if start is not None:
+                completed.append((name, (now - start) * 1000))
+        if stage == 'ended' and 'first_ice' in self.marks:
+            # ICE gathering ends with the last candidate seen before hang-up
+            completed.append(('ice_gathering', (self.marks['last_ice'] - self.marks['first_ice']) * 1000))
+        return completed
+
+    def offsets_ms(self) -> Dict[str, float]:
+        """Milliseconds from 'created' to each recorded stage, in lifecycle order"""
+        created = self.marks['created']
+        return {stage: round((self.marks[stage] - created) * 1000, 1) for stage in STAGES if stage in self.marks}
+
+    def interval_ms(self, name: str) -> Optional[float]:
+        start_stage, end_stage = SETUP_INTERVALS[name]
+        if start_stage in self.marks and end_stage in self.marks:
+            return round((self.marks[end_stage] - self.marks[start_stage]) * 1000, 1)
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'created_at': self.created_at.isoformat(),
+            'stages_ms': self.offsets_ms(),
+            'intervals_ms': {name: self.interval_ms(name) for name in SETUP_INTERVALS if self.interval_ms(name) is not None},
+        }
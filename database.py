@@ -5,9 +5,12 @@ Database Manager - SQLite for persistent storage
 """
 import sqlite3
 import json
+import logging
+import threading
 from datetime import datetime
 from contextlib import contextmanager
 import os
+from tracing import span
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor
@@ -15,6 +18,8 @@ except Exception:
     psycopg2 = None
     RealDictCursor = None
 
+logger = logging.getLogger(__name__)
+
 class DatabaseManager:
     def __init__(self, db_path='admin_data.db'):
         self.database_url = os.getenv('DATABASE_URL')
@@ -23,6 +28,12 @@ class DatabaseManager:
         self.is_postgres = bool(self.database_url)
         self.db_path = db_path if not self.is_postgres else None
         self._connection_pool = None
+        self._pool_maxconn = 10
+        # Connection usage counters (exposed via get_pool_stats)
+        self._stats_lock = threading.Lock()
+        self._connections_opened = 0
+        self._connections_in_use = 0
+        self._connection_errors = 0
         self.init_database()
         self.init_connection_pool()
     
@@ -33,40 +44,70 @@ class DatabaseManager:
                 from psycopg2 import pool
                 self._connection_pool = pool.SimpleConnectionPool(
                     minconn=1,
-                    maxconn=10,
-                    dsn=self.database_url
+                    maxconn=self._pool_maxconn,
+                    dsn=self.database_url,
+                    cursor_factory=RealDictCursor
                 )
             except Exception as e:
-                print(f"Connection pool init failed: {e}")
+                logger.error("Connection pool init failed: %s", e)
 
     @contextmanager
     def get_connection(self):
         """Context manager with connection pooling"""
-        if self.is_postgres:
-            if psycopg2 is None:
-                raise RuntimeError("psycopg2 is required for Postgres but not installed")
-            if self._connection_pool:
-                conn = self._connection_pool.getconn()
-            else:
-                conn = psycopg2.connect(self.database_url, cursor_factory=RealDictCursor)
-        else:
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            conn.execute('PRAGMA journal_mode=WAL')
+        try:
+            with span('db.connect'):
+                if self.is_postgres:
+                    if psycopg2 is None:
+                        raise RuntimeError("psycopg2 is required for Postgres but not installed")
+                    if self._connection_pool:
+                        conn = self._connection_pool.getconn()
+                    else:
+                        conn = psycopg2.connect(self.database_url, cursor_factory=RealDictCursor)
+                else:
+                    conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                    conn.row_factory = sqlite3.Row
+                    conn.execute('PRAGMA journal_mode=WAL')
+        except Exception:
+            with self._stats_lock:
+                self._connection_errors += 1
+            raise
+        
+        with self._stats_lock:
+            self._connections_opened += 1
+            self._connections_in_use += 1
         
         try:
-            conn.autocommit = False
-            yield conn
-            conn.commit()
+            if self.is_postgres:
+                conn.autocommit = False
+            # Queries + commit; nested spans show up alongside this one
+            with span('db'):
+                yield conn
+                conn.commit()
         except Exception as e:
             conn.rollback()
             raise e
         finally:
+            with self._stats_lock:
+                self._connections_in_use -= 1
             if self.is_postgres and self._connection_pool:
                 self._connection_pool.putconn(conn)
             else:
                 conn.close()
     
+    def get_pool_stats(self):
+        """Connection usage counters (cheap, no DB round trip)"""
+        with self._stats_lock:
+            stats = {
+                'type': 'postgresql' if self.is_postgres else 'sqlite',
+                'connections_opened': self._connections_opened,
+                'connections_in_use': self._connections_in_use,
+                'connection_errors': self._connection_errors,
+                'pool_max': self._pool_maxconn if self._connection_pool else 0,
+            }
+        if self._connection_pool:
+            stats['pool_idle'] = len(getattr(self._connection_pool, '_pool', []))
+        return stats
+    
     def init_database(self):
         """Initialize database tables"""
         with self.get_connection() as conn:
@@ -115,6 +156,33 @@ class DatabaseManager:
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_calls_status ON calls(status)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_calls_start_time ON calls(start_time)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_start_time ON call_logs(start_time)')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS metric_rollups (
+                        resolution TEXT NOT NULL,
+                        bucket_start BIGINT NOT NULL,
+                        name TEXT NOT NULL,
+                        value_count BIGINT NOT NULL DEFAULT 0,
+                        value_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                        PRIMARY KEY (resolution, bucket_start, name)
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS call_timings (
+                        call_id TEXT PRIMARY KEY,
+                        created_at TIMESTAMP NOT NULL,
+                        outcome TEXT NOT NULL,
+                        time_to_connect_ms DOUBLE PRECISION,
+                        offer_to_answer_ms DOUBLE PRECISION,
+                        timeline TEXT NOT NULL
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_call_timings_connect ON call_timings(time_to_connect_ms)')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS call_presence (
+                        call_id TEXT PRIMARY KEY,
+                        last_seen TIMESTAMP NOT NULL
+                    )
+                ''')
             else:
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS calls (
@@ -159,6 +227,33 @@ class DatabaseManager:
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_calls_status ON calls(status)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_calls_start_time ON calls(start_time)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_start_time ON call_logs(start_time)')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS metric_rollups (
+                        resolution TEXT NOT NULL,
+                        bucket_start INTEGER NOT NULL,
+                        name TEXT NOT NULL,
+                        value_count INTEGER NOT NULL DEFAULT 0,
+                        value_sum REAL NOT NULL DEFAULT 0,
+                        PRIMARY KEY (resolution, bucket_start, name)
+                    ) WITHOUT ROWID
+                ''')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS call_timings (
+                        call_id TEXT PRIMARY KEY,
+                        created_at DATETIME NOT NULL,
+                        outcome TEXT NOT NULL,
+                        time_to_connect_ms REAL,
+                        offer_to_answer_ms REAL,
+                        timeline TEXT NOT NULL
+                    )
+                ''')
+                cursor.execute('CREATE INDEX IF NOT EXISTS idx_call_timings_connect ON call_timings(time_to_connect_ms)')
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS call_presence (
+                        call_id TEXT PRIMARY KEY,
+                        last_seen DATETIME NOT NULL
+                    ) WITHOUT ROWID
+                ''')
     
     # Calls
     def save_call(self, call_id, customer_name, peer_id=None, status='waiting'):
@@ -204,6 +299,30 @@ class DatabaseManager:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             self._execute(cursor, 'DELETE FROM calls WHERE call_id = ?', (call_id,))
+            self._execute(cursor, 'DELETE FROM call_presence WHERE call_id = ?', (call_id,))
+    
+    def save_last_seen(self, rows, removed=()):
+        """Upsert (call_id, last_seen) rows and delete rows of `removed` calls in one transaction (see presence.py)"""
+        if not rows and not removed:
+            return
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if rows:
+                self._executemany(cursor, '''
+                    INSERT INTO call_presence (call_id, last_seen) VALUES (?, ?)
+                    ON CONFLICT (call_id) DO UPDATE SET last_seen = excluded.last_seen
+                ''', rows)
+            if removed:
+                self._executemany(cursor, 'DELETE FROM call_presence WHERE call_id = ?',
+                                  [(call_id,) for call_id in removed])
+    
+    def get_last_seen(self, call_id):
+        """Last persisted heartbeat time of a call, None if never flushed"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, 'SELECT last_seen FROM call_presence WHERE call_id = ?', (call_id,))
+            row = cursor.fetchone()
+            return row['last_seen'] if row else None
     
     # Call Logs
     def save_call_log(self, customer_name, start_time, duration, status):
@@ -321,16 +440,34 @@ class DatabaseManager:
                 return json.loads(row['value'])
             return default
     
+    def delete_setting(self, key):
+        """Delete a setting"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, 'DELETE FROM settings WHERE key = ?', (key,))
+    
     # OTP
     def save_otp(self, call_id, code, expires):
-        """Save OTP code"""
+        """Save OTP code (code is the hash kept by OTPManager); re-issue resets attempts"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             self._execute(cursor, '''
                 INSERT INTO otp_codes (call_id, code, expires)
                 VALUES (?, ?, ?)
+                ON CONFLICT (call_id) DO UPDATE SET
+                code = excluded.code, expires = excluded.expires, attempts = 0
             ''', (call_id, code, expires))
     
+    def get_active_otps(self):
+        """All unexpired OTP rows (startup recovery)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, '''
+                SELECT call_id, code, expires, attempts FROM otp_codes
+                WHERE expires > ?
+            ''', (datetime.now(),))
+            return [dict(row) for row in cursor.fetchall()]
+    
     def get_otp(self, call_id):
         """Get OTP code"""
         with self.get_connection() as conn:
@@ -365,6 +502,71 @@ class DatabaseManager:
             self._execute(cursor, 'DELETE FROM otp_codes WHERE expires < ?', (datetime.now(),))
             return cursor.rowcount
     
+    # Call setup timings (see call_timeline.py)
+    def save_call_timing(self, call_id, created_at, outcome, time_to_connect_ms, offer_to_answer_ms, timeline):
+        """Store one finished call's lifecycle timeline (JSON text)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, '''
+                INSERT INTO call_timings (call_id, created_at, outcome, time_to_connect_ms, offer_to_answer_ms, timeline)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (call_id) DO UPDATE SET
+                outcome = excluded.outcome,
+                time_to_connect_ms = excluded.time_to_connect_ms,
+                offer_to_answer_ms = excluded.offer_to_answer_ms,
+                timeline = excluded.timeline
+            ''', (call_id, created_at, outcome, time_to_connect_ms, offer_to_answer_ms, timeline))
+    
+    def get_slow_call_setups(self, limit=20):
+        """Slowest connected calls first, then calls that never connected"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, '''
+                SELECT * FROM call_timings
+                ORDER BY CASE WHEN time_to_connect_ms IS NULL THEN 1 ELSE 0 END, time_to_connect_ms DESC, created_at DESC
+                LIMIT ?
+            ''', (limit,))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    # Metric rollups (see metrics_store.py)
+    def save_metric_rollups(self, rows):
+        """Add (resolution, bucket_start, name, count, sum) rows in one transaction"""
+        if not rows:
+            return
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._executemany(cursor, '''
+                INSERT INTO metric_rollups (resolution, bucket_start, name, value_count, value_sum)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (resolution, bucket_start, name) DO UPDATE SET
+                value_count = metric_rollups.value_count + excluded.value_count,
+                value_sum = metric_rollups.value_sum + excluded.value_sum
+            ''', rows)
+    
+    def get_metric_rollups(self, resolution, start, end, names=None):
+        """Rows with start <= bucket_start < end, oldest first"""
+        query = '''
+            SELECT bucket_start, name, value_count, value_sum FROM metric_rollups
+            WHERE resolution = ? AND bucket_start >= ? AND bucket_start < ?
+        '''
+        params = [resolution, int(start), int(end)]
+        if names:
+            query += ' AND name IN (' + ', '.join('?' for _ in names) + ')'
+            params.extend(names)
+        query += ' ORDER BY bucket_start'
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, query, tuple(params))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def delete_metric_rollups(self, resolution, before):
+        """Drop rollups of one resolution older than `before` (epoch seconds)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, 'DELETE FROM metric_rollups WHERE resolution = ? AND bucket_start < ?',
+                          (resolution, int(before)))
+            return cursor.rowcount
+    
     # Export/Import
     def export_data(self):
         """Export all data as JSON"""
@@ -436,10 +638,7 @@ class DatabaseManager:
                         INSERT OR REPLACE INTO settings (key, value)
                         VALUES (?, ?)
                     ''', (setting['key'], setting['value']))
-
-# Singleton instance
-db = DatabaseManager()
-
+    
     def _execute(self, cursor, query, params=None):
         """Unified execute helper for SQLite and Postgres.
         - Converts SQLite-style placeholders ('?') to Postgres-style ('%s') when needed.
@@ -458,56 +657,40 @@ db = DatabaseManager()
             else:
                 cursor.execute(query, params)
     
+    def _executemany(self, cursor, query, rows):
+        """executemany counterpart of _execute (same placeholder normalization)"""
+        if self.is_postgres:
+            query = query.replace('?', '%s')
+        cursor.executemany(query, rows)
+    
     def test_connection(self):
         """Test database connection and return status"""
         import time
         start_time = time.time()
+        db_type = 'postgresql' if self.is_postgres else 'sqlite'
         
         try:
-            if self.is_postgresql:
-                # Test PostgreSQL connection
-                cursor = self.connection.cursor()
-                cursor.execute("SELECT 1")
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 AS ok")
                 result = cursor.fetchone()
                 cursor.close()
-                
-                if result and result[0] == 1:
-                    return {
-                        'status': 'connected',
-                        'type': 'postgresql',
-                        'connection_time_ms': int((time.time() - start_time) * 1000),
-                        'test_query': 'SELECT 1',
-                        'result': 'success'
-                    }
-                else:
-                    return {
-                        'status': 'error',
-                        'type': 'postgresql',
-                        'error': 'Test query failed',
-                        'connection_time_ms': int((time.time() - start_time) * 1000)
-                    }
+            
+            if result and result['ok'] == 1:
+                return {
+                    'status': 'connected',
+                    'type': db_type,
+                    'connection_time_ms': int((time.time() - start_time) * 1000),
+                    'test_query': 'SELECT 1',
+                    'result': 'success'
+                }
             else:
-                # Test SQLite connection
-                cursor = self.connection.cursor()
-                cursor.execute("SELECT 1")
-                result = cursor.fetchone()
-                cursor.close()
-                
-                if result and result[0] == 1:
-                    return {
-                        'status': 'connected',
-                        'type': 'sqlite',
-                        'connection_time_ms': int((time.time() - start_time) * 1000),
-                        'test_query': 'SELECT 1',
-                        'result': 'success'
-                    }
-                else:
-                    return {
-                        'status': 'error',
-                        'type': 'sqlite',
-                        'error': 'Test query failed',
-                        'connection_time_ms': int((time.time() - start_time) * 1000)
-                    }
+                return {
+                    'status': 'error',
+                    'type': db_type,
+                    'error': 'Test query failed',
+                    'connection_time_ms': int((time.time() - start_time) * 1000)
+                }
                     
         except Exception as e:
             return {
@@ -519,44 +702,38 @@ db = DatabaseManager()
     
     def get_database_type(self):
         """Get database type"""
-        return 'postgresql' if self.is_postgresql else 'sqlite'
+        return 'postgresql' if self.is_postgres else 'sqlite'
     
     def get_database_info(self):
         """Get detailed database information"""
         try:
-            if self.is_postgresql:
-                cursor = self.connection.cursor()
-                cursor.execute("SELECT version()")
-                version = cursor.fetchone()[0]
-                
-                cursor.execute("SELECT current_database()")
-                db_name = cursor.fetchone()[0]
-                
-                cursor.execute("SELECT current_user")
-                user = cursor.fetchone()[0]
-                
-                cursor.close()
-                
-                return {
-                    'type': 'postgresql',
-                    'version': version,
-                    'database_name': db_name,
-                    'user': user,
-                    'host': self.connection.get_dsn_parameters().get('host', 'unknown'),
-                    'port': self.connection.get_dsn_parameters().get('port', 'unknown')
-                }
-            else:
-                cursor = self.connection.cursor()
-                cursor.execute("SELECT sqlite_version()")
-                version = cursor.fetchone()[0]
-                cursor.close()
-                
-                return {
-                    'type': 'sqlite',
-                    'version': version,
-                    'database_file': self.db_path,
-                    'file_exists': os.path.exists(self.db_path) if self.db_path else False
-                }
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if self.is_postgres:
+                    cursor.execute("SELECT version() AS version, current_database() AS db_name, current_user AS db_user")
+                    row = cursor.fetchone()
+                    cursor.close()
+                    
+                    dsn = conn.get_dsn_parameters()
+                    return {
+                        'type': 'postgresql',
+                        'version': row['version'],
+                        'database_name': row['db_name'],
+                        'user': row['db_user'],
+                        'host': dsn.get('host', 'unknown'),
+                        'port': dsn.get('port', 'unknown')
+                    }
+                else:
+                    cursor.execute("SELECT sqlite_version() AS version")
+                    version = cursor.fetchone()['version']
+                    cursor.close()
+                    
+                    return {
+                        'type': 'sqlite',
+                        'version': version,
+                        'database_file': self.db_path,
+                        'file_exists': os.path.exists(self.db_path) if self.db_path else False
+                    }
         except Exception as e:
             return {
                 'type': 'unknown',
@@ -566,60 +743,63 @@ db = DatabaseManager()
     def get_table_stats(self):
         """Get database table statistics"""
         try:
-            if self.is_postgresql:
-                cursor = self.connection.cursor()
-                cursor.execute("""
-                    SELECT 
-                        schemaname,
-                        tablename,
-                        n_tup_ins as inserts,
-                        n_tup_upd as updates,
-                        n_tup_del as deletes,
-                        n_live_tup as live_rows,
-                        n_dead_tup as dead_rows
-                    FROM pg_stat_user_tables
-                    ORDER BY n_live_tup DESC
-                """)
-                stats = cursor.fetchall()
-                cursor.close()
-                
-                return {
-                    'type': 'postgresql',
-                    'tables': [
-                        {
-                            'schema': row[0],
-                            'table': row[1],
-                            'inserts': row[2],
-                            'updates': row[3],
-                            'deletes': row[4],
-                            'live_rows': row[5],
-                            'dead_rows': row[6]
-                        } for row in stats
-                    ]
-                }
-            else:
-                cursor = self.connection.cursor()
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = cursor.fetchall()
-                
-                table_stats = []
-                for table in tables:
-                    table_name = table[0]
-                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                    count = cursor.fetchone()[0]
-                    table_stats.append({
-                        'table': table_name,
-                        'rows': count
-                    })
-                
-                cursor.close()
-                
-                return {
-                    'type': 'sqlite',
-                    'tables': table_stats
-                }
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if self.is_postgres:
+                    cursor.execute("""
+                        SELECT 
+                            schemaname,
+                            relname AS tablename,
+                            n_tup_ins as inserts,
+                            n_tup_upd as updates,
+                            n_tup_del as deletes,
+                            n_live_tup as live_rows,
+                            n_dead_tup as dead_rows
+                        FROM pg_stat_user_tables
+                        ORDER BY n_live_tup DESC
+                    """)
+                    stats = cursor.fetchall()
+                    cursor.close()
+                    
+                    return {
+                        'type': 'postgresql',
+                        'tables': [
+                            {
+                                'schema': row['schemaname'],
+                                'table': row['tablename'],
+                                'inserts': row['inserts'],
+                                'updates': row['updates'],
+                                'deletes': row['deletes'],
+                                'live_rows': row['live_rows'],
+                                'dead_rows': row['dead_rows']
+                            } for row in stats
+                        ]
+                    }
+                else:
+                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                    tables = cursor.fetchall()
+                    
+                    table_stats = []
+                    for table in tables:
+                        table_name = table['name']
+                        cursor.execute(f"SELECT COUNT(*) AS count FROM {table_name}")
+                        count = cursor.fetchone()['count']
+                        table_stats.append({
+                            'table': table_name,
+                            'rows': count
+                        })
+                    
+                    cursor.close()
+                    
+                    return {
+                        'type': 'sqlite',
+                        'tables': table_stats
+                    }
         except Exception as e:
             return {
                 'type': 'unknown',
                 'error': str(e)
-            }
\ No newline at end of file
+            }
+
+# Singleton instance
+db = DatabaseManager()
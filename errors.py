@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API exception types shared by the server and its helper modules
+"""
+
+
+class APIError(Exception):
+    """Custom API exception"""
+    def __init__(self, message: str, status_code: int = 400) -> None:
+        self.message = message
+        self.status_code = status_code
+        super().__init__(self.message)
+
+
+class ValidationError(APIError):
+    """Input validation error"""
+    def __init__(self, message: str) -> None:
+        super().__init__(message, 422)
+
+
+class RateLimitError(APIError):
+    """Rate limit exceeded error"""
+    def __init__(self, message: str = "Rate limit exceeded") -> None:
+        super().__init__(message, 429)
+
+
+class AuthenticationError(APIError):
+    """Authentication error"""
+    def __init__(self, message: str = "Authentication required") -> None:
+        super().__init__(message, 401)
+
+
+class PayloadTooLargeError(APIError):
+    """Request body exceeds the route's size limit"""
+    def __init__(self, message: str = "Request body too large") -> None:
+        super().__init__(message, 413)
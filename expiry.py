@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Expiry scheduler - one timer thread for every "forget X after T seconds"
+
+OTPs, admin sessions and rate-limit entries schedule a deadline here
+instead of being found by periodic full scans (call heartbeats have their
+own timer wheel in presence.py). Deadlines live
+in a min-heap keyed by monotonic time; the timer thread wakes when the
+earliest one is due and hands the due keys, batched per kind, to the owner's
+callback:
+
+    def expire(keys, now) -> {key: seconds_left}
+
+The owner re-checks each key under its own lock (the heap entry may be
+stale: a session was refreshed, a code was re-issued), removes what really
+expired, runs DB side effects after releasing the lock, and returns the
+remaining delay for keys that are still alive so they are re-armed. A key
+therefore needs one heap entry, not one per refresh, and each tick costs
+O(due log n). A None delay means "alive, already scheduled again elsewhere".
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ExpireCallback = Callable[[List[Hashable], float], Optional[Dict[Hashable, Optional[float]]]]
+
+
+class ExpiryScheduler:
+    """Heap of (deadline, kind, key) processed by one background thread"""
+
+    def __init__(self, resolution: float = 1.0):
+        # Due entries are coalesced: the thread wakes at most once per `resolution`
+        self.resolution = resolution
+        self._heap: List[Tuple[float, int, str, Hashable]] = []
+        self._seq = itertools.count()
+        self._callbacks: Dict[str, ExpireCallback] = {}
+        self._cond = threading.Condition(threading.Lock())
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.expired_total: Dict[str, int] = defaultdict(int)
+
+    def register(self, kind: str, callback: ExpireCallback) -> None:
+        self._callbacks[kind] = callback
+
+    def schedule(self, kind: str, key: Hashable, delay: float) -> None:
+        """Ask for `callback([key], now)` about `delay` seconds from now"""
+        deadline = time.monotonic() + max(0.0, delay)
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), kind, key))
+            if self._heap[0][0] == deadline:
+                self._cond.notify()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='expiry', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+            self.run_pending()
+            time.sleep(self.resolution)
+
+    def run_pending(self, now: Optional[float] = None) -> int:
+        """Expire everything due at `now` (monotonic); returns keys expired"""
+        now = time.monotonic() if now is None else now
+        due: Dict[str, List[Hashable]] = defaultdict(list)
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, kind, key = heapq.heappop(self._heap)
+                due[kind].append(key)
+
+        expired = 0
+        for kind, keys in due.items():
+            callback = self._callbacks.get(kind)
+            if callback is None:
+                logger.warning("No expiry callback for %s (%d keys dropped)", kind, len(keys))
+                continue
+            try:
+                rearm = callback(keys, now) or {}
+            except Exception as e:
+                logger.error("Expiry callback %s failed: %s", kind, e)
+                continue
+            for key, delay in rearm.items():
+                if delay is not None:
+                    self.schedule(kind, key, delay)
+            count = len(keys) - len(rearm)
+            self.expired_total[kind] += count
+            expired += count
+        return expired
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            pending: Dict[str, int] = defaultdict(int)
+            for _, _, kind, _ in self._heap:
+                pending[kind] += 1
+            next_due = self._heap[0][0] - time.monotonic() if self._heap else None
+        return {
+            'pending': dict(pending),
+            'expired_total': dict(self.expired_total),
+            'next_due_seconds': round(next_due, 3) if next_due is not None else None,
+        }
+
+
+# Shared by otp_manager and server_v2 (started in server_v2 __main__)
+expiry_scheduler = ExpiryScheduler()
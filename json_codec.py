@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON Codec - orjson / ujson when installed, stdlib json otherwise
+
+dumps() always returns UTF-8 bytes ready for the socket and loads() accepts
+bytes or str, so request bodies never need a separate decode step. All
+decode failures are ValueError subclasses regardless of backend.
+"""
+import json
+import os
+from collections import deque
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Any, Callable, Optional, Tuple, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+BACKENDS = ('orjson', 'ujson', 'json')
+
+
+def _default(obj: Any) -> Any:
+    """Serialize types the backends don't handle natively"""
+    if isinstance(obj, (datetime, date, dt_time)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (set, frozenset, deque)):
+        return list(obj)
+    return str(obj)
+
+
+def _orjson_codec() -> Tuple[Callable, Callable]:
+    base_opts = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        opts = (base_opts | orjson.OPT_INDENT_2) if indent else base_opts
+        return orjson.dumps(obj, default=_default, option=opts)
+
+    return dumps, orjson.loads
+
+
+def _ujson_codec() -> Tuple[Callable, Callable]:
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        return ujson.dumps(
+            obj, default=_default, ensure_ascii=False,
+            escape_forward_slashes=False, indent=2 if indent else 0
+        ).encode('utf-8')
+
+    return dumps, ujson.loads
+
+
+def _stdlib_codec() -> Tuple[Callable, Callable]:
+    compact = json.JSONEncoder(default=_default, separators=(',', ':'))
+    pretty = json.JSONEncoder(default=_default, indent=2)
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        return (pretty if indent else compact).encode(obj).encode('utf-8')
+
+    return dumps, json.loads
+
+
+def load_backend(name: Optional[str] = None) -> Tuple[Callable, Callable, str]:
+    """Pick a backend: explicit name, JSON_BACKEND env var, or fastest installed"""
+    name = (name or os.getenv('JSON_BACKEND', '')).lower()
+    available = {
+        'orjson': orjson is not None,
+        'ujson': ujson is not None,
+        'json': True,
+    }
+    if name not in available or not available[name]:
+        name = next(b for b in BACKENDS if available[b])
+
+    factory = {'orjson': _orjson_codec, 'ujson': _ujson_codec, 'json': _stdlib_codec}[name]
+    dumps_fn, loads_fn = factory()
+    return dumps_fn, loads_fn, name
+
+
+_dumps, _loads, BACKEND = load_backend()
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Encode obj to UTF-8 JSON bytes (datetimes as ISO 8601)"""
+    return _dumps(obj, indent)
+
+
+def dumps_str(obj: Any, indent: bool = False) -> str:
+    """Encode obj to a JSON str"""
+    return _dumps(obj, indent).decode('utf-8')
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Decode JSON from bytes or str; raises ValueError on bad input"""
+    if isinstance(data, memoryview) and BACKEND != 'orjson':
+        # orjson parses buffers in place; the others need bytes
+        data = data.tobytes()
+    return _loads(data)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Logging pipeline - request threads enqueue, one listener thread writes
+
+Loggers hand records to a bounded in-memory queue (QueueHandler); a single
+QueueListener thread formats them (JSON lines or plain text) and does the
+console/file I/O, so a slow disk or terminal never stalls a request. When
+the queue is full records are dropped and counted instead of blocking.
+
+High-volume loggers (per-ICE-candidate signaling, polling) get a
+SamplingFilter that keeps 1 in N records per message template.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+import json_codec
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JSONLineFormatter(logging.Formatter):
+    """One JSON object per line; `extra` fields are included as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text  # pre-rendered by NonBlockingQueueHandler
+        return json_codec.dumps_str(entry)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps the first and then every Nth DEBUG/INFO record per message template
+
+    Warnings and errors always pass. Kept records carry `sample_every` so
+    readers can scale counts back up.
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        key = record.msg if isinstance(record.msg, str) else repr(record.msg)
+        seen = self._counts.get(key, 0)
+        if len(self._counts) < 1000 or key in self._counts:
+            # Racy increments only skew which record is sampled, never correctness
+            self._counts[key] = seen + 1
+        if seen % self.every:
+            return False
+        record.sample_every = self.every
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may be mutated after the call returns) but
+        # leave formatting/serialization to the listener thread.
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+_lock = threading.Lock()
+
+
+def setup_logging(level: str = 'INFO', handlers: Sequence[logging.Handler] = (),
+                  json_format: bool = True, queue_size: int = 10000,
+                  sampled_loggers: Optional[Dict[str, int]] = None) -> logging.Logger:
+    """Route the root logger through a bounded queue to `handlers`"""
+    global _listener, _queue_handler
+    formatter = JSONLineFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+        log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        # Listener respects each handler's own level (console vs file)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.setLevel(getattr(logging, level.upper(), logging.INFO))
+    root_logger.addHandler(_queue_handler)
+
+    for name, every in (sampled_loggers or {}).items():
+        sampled = logging.getLogger(name)
+        for existing in [f for f in sampled.filters if isinstance(f, SamplingFilter)]:
+            sampled.removeFilter(existing)
+        sampled.addFilter(SamplingFilter(every))
+
+    return root_logger
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+@atexit.register
+def stop_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Metric data structures - constant-cost recording, cheap reads
+
+Histogram keeps running count/sum/min/max plus fixed-bucket counts, so
+recording is one bisect over a small tuple and a few integer updates, and
+two histograms with the same bounds merge by adding their buckets.
+SpaceSaving and TimeBuckets keep call analytics at a fixed size no matter
+how many distinct customers or days the process sees.
+"""
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds (inclusive) in milliseconds; values above the last go to +Inf
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    0.5, 1, 2, 3, 5, 7.5, 10, 15, 25, 50, 75, 100,
+    150, 250, 500, 750, 1000, 2500, 5000, 10000,
+)
+
+# Call setup stages (accept, offer->answer, connect) run from ~100 ms to minutes
+CALL_SETUP_BUCKETS_MS: Tuple[float, ...] = (
+    100, 250, 500, 1000, 2000, 3000, 5000, 7500, 10000, 15000,
+    20000, 30000, 45000, 60000, 120000, 300000,
+)
+
+
+class Histogram:
+    """Mergeable fixed-bucket histogram with running aggregates"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts: List[int] = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, value: float) -> None:
+        """O(log buckets): one bisect plus running aggregate updates"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other: 'Histogram') -> None:
+        """Add another histogram's observations (bounds must match)"""
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different bounds")
+        if not other.count:
+            return
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def copy(self) -> 'Histogram':
+        h = Histogram(self.bounds)
+        h.merge(self)
+        return h
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Estimate the q-th percentile (0-100), interpolating within a bucket"""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            if not c:
+                continue
+            if cumulative + c >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                # Clamp to the observed range so sparse buckets stay honest
+                lower = max(lower, self.min)
+                upper = min(upper, self.max)
+                fraction = (rank - cumulative) / c
+                return lower + (upper - lower) * fraction
+            cumulative += c
+        return self.max
+
+    def count_le(self, value: float) -> int:
+        """Observations <= value (exact when value is a bucket bound)"""
+        return sum(self.counts[:bisect_right(self.bounds, value)])
+
+    def cumulative_counts(self) -> List[Tuple[float, int]]:
+        """(upper_bound, cumulative_count) pairs, last bound is +Inf"""
+        out = []
+        running = 0
+        for bound, c in zip(self.bounds + (float('inf'),), self.counts):
+            running += c
+            out.append((bound, running))
+        return out
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'min': round(self.min, 3) if self.min is not None else 0,
+            'max': round(self.max, 3) if self.max is not None else 0,
+            'mean': round(self.mean, 3),
+            'p50': round(self.percentile(50), 3),
+            'p90': round(self.percentile(90), 3),
+            'p99': round(self.percentile(99), 3),
+        }
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters: top-k counts in `capacity` counters
+
+    Each tracked key stores (count, error); count over-estimates the true
+    frequency by at most error. Keys outside the top `capacity` evict the
+    current minimum and inherit its count as their error bound.
+    """
+
+    __slots__ = ('capacity', 'counters')
+
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.counters: Dict[Any, List[int]] = {}
+
+    def add(self, key: Any, n: int = 1) -> None:
+        entry = self.counters.get(key)
+        if entry is not None:
+            entry[0] += n
+        elif len(self.counters) < self.capacity:
+            self.counters[key] = [n, 0]
+        else:
+            # O(capacity) scan only on eviction; capacity is small and fixed
+            victim = min(self.counters, key=lambda k: self.counters[k][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[key] = [floor + n, floor]
+
+    def merge(self, other: 'SpaceSaving') -> None:
+        """Add another summary, then keep the `capacity` largest counters
+
+        Mergeable Space-Saving: a key missing from one side may still have
+        been seen there up to that side's minimum count (only if it is full,
+        otherwise it was never seen), so that minimum is added to both its
+        count and its error. The bounds count >= true > count - error then
+        hold across any number of merges.
+        """
+        own_floor = self._floor()
+        other_floor = other._floor()
+        for key, entry in self.counters.items():
+            if key not in other.counters:
+                entry[0] += other_floor
+                entry[1] += other_floor
+        for key, (count, error) in other.counters.items():
+            entry = self.counters.get(key)
+            if entry is None:
+                self.counters[key] = [count + own_floor, error + own_floor]
+            else:
+                entry[0] += count
+                entry[1] += error
+        if len(self.counters) > self.capacity:
+            keep = heapq.nlargest(self.capacity, self.counters.items(), key=lambda kv: kv[1][0])
+            self.counters = {k: v for k, v in keep}
+
+    def _floor(self) -> int:
+        """Largest count an untracked key can have had (0 until the summary fills)"""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self.counters.values())
+
+    def top_k(self, k: int) -> List[Tuple[Any, int]]:
+        """k most frequent (key, count) pairs, largest first"""
+        return [(key, entry[0]) for key, entry in
+                heapq.nlargest(k, self.counters.items(), key=lambda kv: kv[1][0])]
+
+    def __len__(self) -> int:
+        return len(self.counters)
+
+
+class TimeBuckets:
+    """Ring buffer of counts for the last `size` integer time buckets
+
+    Callers pass the bucket index (e.g. a date ordinal, or ordinal*24+hour
+    for hours). Writing index i reuses slot i % size, so buckets older than
+    `size` expire automatically and memory stays fixed.
+    """
+
+    __slots__ = ('size', 'indexes', 'counts', 'latest')
+
+    def __init__(self, size: int):
+        self.size = size
+        self.indexes: List[Optional[int]] = [None] * size
+        self.counts: List[int] = [0] * size
+        self.latest: Optional[int] = None
+
+    def add(self, index: int, n: int = 1) -> None:
+        if self.latest is not None and index <= self.latest - self.size:
+            return  # already expired
+        slot = index % self.size
+        if self.indexes[slot] != index:
+            self.indexes[slot] = index
+            self.counts[slot] = 0
+        self.counts[slot] += n
+        if self.latest is None or index > self.latest:
+            self.latest = index
+
+    def get(self, index: int) -> int:
+        slot = index % self.size
+        return self.counts[slot] if self.indexes[slot] == index else 0
+
+    def merge(self, other: 'TimeBuckets') -> None:
+        for index, count in zip(other.indexes, other.counts):
+            if index is not None and count:
+                self.add(index, count)
+
+    def range(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """(index, count) for non-empty buckets in [start, end]; O(end - start)"""
+        if self.latest is not None:
+            start = max(start, self.latest - self.size + 1)
+        return [(i, c) for i in range(start, end + 1) for c in (self.get(i),) if c]
+
+    def items(self) -> List[Tuple[int, int]]:
+        """All live (index, count) pairs, oldest first"""
+        if self.latest is None:
+            return []
+        return self.range(self.latest - self.size + 1, self.latest)
@@ -4,29 +4,124 @@
 Metrics and Analytics System for Canli Destek Sistemi
 """
 import time
-import json
 import threading
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict, deque
 import logging
+import json_codec
+from metric_types import CALL_SETUP_BUCKETS_MS, Histogram, SpaceSaving, TimeBuckets
+from profiler import InstrumentedLock
 
 logger = logging.getLogger(__name__)
 
+# Bounded call analytics: tracked customer names, daily/hourly history
+TOP_CUSTOMERS_CAPACITY = 100
+CALL_HISTORY_DAYS = 90
+CALL_HISTORY_HOURS = 7 * 24
 
-class MetricsCollector:
-    """Centralized metrics collection system"""
+# Call setup SLO: share of calls connected within this many ms (a bucket bound)
+CALL_CONNECT_SLO_MS = 10000
+
+
+class _MetricShard:
+    """Counters for the recording threads mapped to one slot (merged into totals on read)"""
     
     def __init__(self):
-        self.metrics_lock = threading.Lock()
+        # Taken by the threads sharing this slot and by readers; with more
+        # slots than busy workers, recording rarely waits
+        self.lock = threading.Lock()
+        self.total_requests = 0
+        self.errors_total = 0
+        self.rate_limit_hits = 0
+        self.latency = Histogram()
+        self.endpoint_latency: Dict[str, Histogram] = {}
+        self.request_counts_by_status: Dict[Tuple[str, int], int] = defaultdict(int)
+        self.call_event_counts: Dict[str, int] = defaultdict(int)
+        self.total_calls = 0
+        self.completed_calls = 0
+        self.failed_calls = 0
+        self.total_duration_seconds = 0
+        self.max_call_duration_seconds = 0
+        self.calls_by_hour: Dict[int, int] = defaultdict(int)  # hour of day, 24 keys max
+        # Call history is allocated on the first call_started (see call_history())
+        self.daily_calls: Optional[TimeBuckets] = None  # keyed by date ordinal
+        self.hourly_calls: Optional[TimeBuckets] = None  # keyed by ordinal * 24 + hour
+        self.customer_names: Optional[SpaceSaving] = None
+        self.call_outcomes: Dict[str, int] = defaultdict(int)
+        self.call_setup: Dict[str, Histogram] = {}  # call_timeline interval -> ms
+        self.queue_wait: Dict[str, Histogram] = {}  # call_queue outcome -> ms waited
+    
+    def call_history(self) -> '_MetricShard':
+        """Allocate the daily/hourly/top-customer structures if not done yet"""
+        if self.daily_calls is None:
+            self.daily_calls = TimeBuckets(CALL_HISTORY_DAYS)
+            self.hourly_calls = TimeBuckets(CALL_HISTORY_HOURS)
+            self.customer_names = SpaceSaving(TOP_CUSTOMERS_CAPACITY)
+        return self
+    
+    def merge_into(self, total: '_MetricShard') -> None:
+        """Add this shard's values to `total` (caller holds self.lock)"""
+        total.total_requests += self.total_requests
+        total.errors_total += self.errors_total
+        total.rate_limit_hits += self.rate_limit_hits
+        total.latency.merge(self.latency)
+        for endpoint, histogram in self.endpoint_latency.items():
+            merged = total.endpoint_latency.get(endpoint)
+            if merged is None:
+                merged = total.endpoint_latency[endpoint] = Histogram(histogram.bounds)
+            merged.merge(histogram)
+        for target, source in (
+            (total.request_counts_by_status, self.request_counts_by_status),
+            (total.call_event_counts, self.call_event_counts),
+            (total.calls_by_hour, self.calls_by_hour),
+            (total.call_outcomes, self.call_outcomes),
+        ):
+            for key, count in source.items():
+                target[key] += count
+        for target, source in ((total.call_setup, self.call_setup), (total.queue_wait, self.queue_wait)):
+            for key, histogram in source.items():
+                merged = target.get(key)
+                if merged is None:
+                    merged = target[key] = Histogram(histogram.bounds)
+                merged.merge(histogram)
+        if self.daily_calls is not None:
+            total.call_history()
+            total.daily_calls.merge(self.daily_calls)
+            total.hourly_calls.merge(self.hourly_calls)
+            total.customer_names.merge(self.customer_names)
+        total.total_calls += self.total_calls
+        total.completed_calls += self.completed_calls
+        total.failed_calls += self.failed_calls
+        total.total_duration_seconds += self.total_duration_seconds
+        total.max_call_duration_seconds = max(total.max_call_duration_seconds, self.max_call_duration_seconds)
+
+
+class MetricsCollector:
+    """Centralized metrics collection system
+    
+    Hot-path counters live in a fixed pool of shards; each recording thread
+    uses the slot picked by its native thread id, so record_* calls only
+    wait on each other when their threads share a slot. Readers merge all
+    slots. Short-lived threads cost nothing beyond their records.
+    """
+    
+    # Slots in the shard pool (a few more than the usual number of busy workers)
+    SHARD_COUNT = 16
+    
+    def __init__(self, shards: Optional[int] = None):
+        self.metrics_lock = InstrumentedLock('metrics.metrics_lock')
         self.start_time = time.time()
         
-        # System metrics
+        self._shards: List[_MetricShard] = [_MetricShard() for _ in range(shards or self.SHARD_COUNT)]
+        
+        # System metrics (gauges; counters come from the shards)
         self.system_metrics = {
             'uptime_seconds': 0,
             'total_requests': 0,
             'total_calls': 0,
             'active_calls': 0,
+            'queue_depth': 0,
             'completed_calls': 0,
             'failed_calls': 0,
             'rate_limit_hits': 0,
@@ -43,108 +138,134 @@ class MetricsCollector:
             'error_rate_percent': 0
         }
         
-        # Call analytics
-        self.call_analytics = {
-            'total_duration_seconds': 0,
-            'avg_call_duration_seconds': 0,
-            'max_call_duration_seconds': 0,
-            'calls_by_hour': defaultdict(int),
-            'calls_by_day': defaultdict(int),
-            'customer_names': defaultdict(int),
-            'call_outcomes': defaultdict(int)
-        }
+        # Optional persisted rollups (metrics_store.MetricsStore)
+        self.store = None
         
-        # Real-time data (last 24 hours)
+        # Real-time data (last 24 hours). deque.append is atomic, so these
+        # are appended without a lock and copied with deque.copy() on read.
         self.realtime_data = {
             'response_times': deque(maxlen=1000),
             'error_logs': deque(maxlen=100),
-            'call_events': deque(maxlen=500),
-            'request_counts': deque(maxlen=1440)  # 24 hours * 60 minutes
-        }
-        
-        # Historical data (last 30 days)
-        self.historical_data = {
-            'daily_stats': defaultdict(dict),
-            'hourly_stats': defaultdict(dict),
-            'weekly_stats': defaultdict(dict)
+            'call_events': deque(maxlen=500)
         }
     
+    def _shard(self) -> _MetricShard:
+        # Native ids are small sequential TIDs on Linux, so they spread evenly
+        return self._shards[threading.get_native_id() % len(self._shards)]
+    
+    def _aggregate(self) -> _MetricShard:
+        """Fresh shard holding the totals of all shards (caller holds metrics_lock)"""
+        total = _MetricShard().call_history()
+        for shard in self._shards:
+            with shard.lock:
+                shard.merge_into(total)
+        return total
+    
     def record_request(self, endpoint: str, response_time_ms: float, status_code: int) -> None:
         """Record API request metrics"""
-        with self.metrics_lock:
-            self.system_metrics['total_requests'] += 1
+        shard = self._shard()
+        with shard.lock:
+            shard.total_requests += 1
             
-            # Update response time metrics
-            self.realtime_data['response_times'].append(response_time_ms)
-            self.performance_metrics['avg_response_time_ms'] = self._calculate_avg_response_time()
-            self.performance_metrics['max_response_time_ms'] = max(
-                self.performance_metrics['max_response_time_ms'], 
-                response_time_ms
-            )
-            
-            # Record error if status code >= 400
+            # Update response time metrics (O(1): no rescans of recent samples)
+            shard.latency.record(response_time_ms)
+            histogram = shard.endpoint_latency.get(endpoint)
+            if histogram is None:
+                histogram = shard.endpoint_latency[endpoint] = Histogram()
+            histogram.record(response_time_ms)
+            shard.request_counts_by_status[(endpoint, status_code)] += 1
             if status_code >= 400:
-                self.system_metrics['errors_total'] += 1
-                self.realtime_data['error_logs'].append({
-                    'timestamp': datetime.now(),
-                    'endpoint': endpoint,
-                    'status_code': status_code,
-                    'response_time_ms': response_time_ms
-                })
-            
-            logger.debug(f"Request recorded: {endpoint} - {response_time_ms}ms - {status_code}")
+                shard.errors_total += 1
+        
+        self.realtime_data['response_times'].append(response_time_ms)
+        # Record error if status code >= 400
+        if status_code >= 400:
+            self.realtime_data['error_logs'].append({
+                'timestamp': datetime.now(),
+                'endpoint': endpoint,
+                'status_code': status_code,
+                'response_time_ms': response_time_ms
+            })
+        
+        logger.debug("Request recorded: %s - %sms - %s", endpoint, response_time_ms, status_code)
     
     def record_call_event(self, event_type: str, call_id: str, customer_name: str, 
                          duration_seconds: Optional[int] = None) -> None:
         """Record call-related events"""
-        with self.metrics_lock:
-            current_time = datetime.now()
+        current_time = datetime.now()
+        shard = self._shard()
+        with shard.lock:
+            shard.call_event_counts[event_type] += 1
             
             # Update call analytics
             if event_type == 'call_started':
-                self.system_metrics['total_calls'] += 1
-                self.system_metrics['active_calls'] += 1
-                self.call_analytics['calls_by_hour'][current_time.hour] += 1
-                self.call_analytics['calls_by_day'][current_time.strftime('%Y-%m-%d')] += 1
-                self.call_analytics['customer_names'][customer_name] += 1
+                shard.total_calls += 1
+                day = current_time.toordinal()
+                shard.calls_by_hour[current_time.hour] += 1
+                shard.call_history()
+                shard.daily_calls.add(day)
+                shard.hourly_calls.add(day * 24 + current_time.hour)
+                shard.customer_names.add(customer_name)
             
             elif event_type == 'call_completed':
-                self.system_metrics['active_calls'] = max(0, self.system_metrics['active_calls'] - 1)
-                self.system_metrics['completed_calls'] += 1
-                self.call_analytics['call_outcomes']['completed'] += 1
-                
+                shard.completed_calls += 1
+                shard.call_outcomes['completed'] += 1
                 if duration_seconds:
-                    self.call_analytics['total_duration_seconds'] += duration_seconds
-                    self.call_analytics['avg_call_duration_seconds'] = (
-                        self.call_analytics['total_duration_seconds'] / 
-                        self.system_metrics['completed_calls']
-                    )
-                    self.call_analytics['max_call_duration_seconds'] = max(
-                        self.call_analytics['max_call_duration_seconds'],
-                        duration_seconds
-                    )
+                    shard.total_duration_seconds += duration_seconds
+                    shard.max_call_duration_seconds = max(shard.max_call_duration_seconds, duration_seconds)
             
             elif event_type == 'call_failed':
-                self.system_metrics['active_calls'] = max(0, self.system_metrics['active_calls'] - 1)
-                self.system_metrics['failed_calls'] += 1
-                self.call_analytics['call_outcomes']['failed'] += 1
-            
-            # Record in real-time data
-            self.realtime_data['call_events'].append({
-                'timestamp': current_time,
-                'event_type': event_type,
-                'call_id': call_id[:8],
-                'customer_name': customer_name,
-                'duration_seconds': duration_seconds
-            })
-            
-            logger.debug(f"Call event recorded: {event_type} - {call_id[:8]}")
+                shard.failed_calls += 1
+                shard.call_outcomes['failed'] += 1
+        
+        # active_calls is a gauge (also overwritten by update_system_metrics),
+        # so it stays shared; call events are rare next to requests
+        if event_type in ('call_started', 'call_completed', 'call_failed'):
+            with self.metrics_lock:
+                if event_type == 'call_started':
+                    self.system_metrics['active_calls'] += 1
+                else:
+                    self.system_metrics['active_calls'] = max(0, self.system_metrics['active_calls'] - 1)
+        
+        # Record in real-time data
+        self.realtime_data['call_events'].append({
+            'timestamp': current_time,
+            'event_type': event_type,
+            'call_id': call_id[:8],
+            'customer_name': customer_name,
+            'duration_seconds': duration_seconds
+        })
+        
+        logger.debug("Call event recorded: %s - %s", event_type, call_id[:8])
+    
+    def record_call_stage(self, stage: str, duration_ms: float) -> None:
+        """Record one call setup interval (see call_timeline.SETUP_INTERVALS)"""
+        shard = self._shard()
+        with shard.lock:
+            histogram = shard.call_setup.get(stage)
+            if histogram is None:
+                histogram = shard.call_setup[stage] = Histogram(CALL_SETUP_BUCKETS_MS)
+            histogram.record(duration_ms)
+    
+    def record_queue_wait(self, outcome: str, waited_ms: float) -> None:
+        """Record how long a call waited in the queue (assigned/answered/abandoned)"""
+        shard = self._shard()
+        with shard.lock:
+            histogram = shard.queue_wait.get(outcome)
+            if histogram is None:
+                histogram = shard.queue_wait[outcome] = Histogram(CALL_SETUP_BUCKETS_MS)
+            histogram.record(waited_ms)
+    
+    def update_queue_depth(self, depth: int) -> None:
+        """Gauge; a single dict store, so no lock on the enqueue path"""
+        self.system_metrics['queue_depth'] = depth
     
     def record_rate_limit_hit(self, client_ip: str) -> None:
         """Record rate limiting event"""
-        with self.metrics_lock:
-            self.system_metrics['rate_limit_hits'] += 1
-            logger.warning(f"Rate limit hit recorded for IP: {client_ip}")
+        shard = self._shard()
+        with shard.lock:
+            shard.rate_limit_hits += 1
+        logger.warning("Rate limit hit recorded for IP: %s", client_ip)
     
     def update_system_metrics(self, active_calls: int, memory_usage_mb: float) -> None:
         """Update system-level metrics"""
@@ -153,11 +274,14 @@ class MetricsCollector:
             self.system_metrics['memory_usage_mb'] = memory_usage_mb
             self.system_metrics['uptime_seconds'] = int(time.time() - self.start_time)
     
-    def _calculate_avg_response_time(self) -> float:
-        """Calculate average response time from recent requests"""
-        if not self.realtime_data['response_times']:
-            return 0.0
-        return sum(self.realtime_data['response_times']) / len(self.realtime_data['response_times'])
+    def _sync_system_metrics(self, total: _MetricShard) -> None:
+        """Copy merged counters into system_metrics (caller holds metrics_lock)"""
+        self.system_metrics['total_requests'] = total.total_requests
+        self.system_metrics['errors_total'] = total.errors_total
+        self.system_metrics['rate_limit_hits'] = total.rate_limit_hits
+        self.system_metrics['total_calls'] = total.total_calls
+        self.system_metrics['completed_calls'] = total.completed_calls
+        self.system_metrics['failed_calls'] = total.failed_calls
     
     def _calculate_error_rate(self) -> float:
         """Calculate error rate percentage"""
@@ -180,11 +304,45 @@ class MetricsCollector:
             return 0.0
         return self.system_metrics['total_calls'] / uptime_hours
     
+    @staticmethod
+    def _call_analytics(total: _MetricShard) -> Dict[str, Any]:
+        return {
+            'total_duration_seconds': total.total_duration_seconds,
+            'avg_call_duration_seconds': (
+                total.total_duration_seconds / total.completed_calls
+                if total.total_duration_seconds else 0
+            ),
+            'max_call_duration_seconds': total.max_call_duration_seconds,
+            'calls_by_hour': total.calls_by_hour,
+            'calls_by_day': {
+                date.fromordinal(day).isoformat(): count
+                for day, count in total.daily_calls.items()
+            },
+            'customer_names': dict(total.customer_names.top_k(TOP_CUSTOMERS_CAPACITY)),
+            'call_outcomes': total.call_outcomes
+        }
+    
+    @staticmethod
+    def _connect_slo(total: _MetricShard) -> Dict[str, Any]:
+        histogram = total.call_setup.get('time_to_connect')
+        connected = histogram.count if histogram else 0
+        within = histogram.count_le(CALL_CONNECT_SLO_MS) if histogram else 0
+        return {
+            'threshold_ms': CALL_CONNECT_SLO_MS,
+            'calls': connected,
+            'within_threshold': within,
+            'ratio': round(within / connected, 4) if connected else None
+        }
+    
     def get_current_metrics(self) -> Dict[str, Any]:
         """Get current system metrics"""
         with self.metrics_lock:
+            total = self._aggregate()
+            self._sync_system_metrics(total)
+            
             # Update calculated metrics
-            self.performance_metrics['avg_response_time_ms'] = self._calculate_avg_response_time()
+            self.performance_metrics['avg_response_time_ms'] = total.latency.mean
+            self.performance_metrics['max_response_time_ms'] = total.latency.max or 0
             self.performance_metrics['error_rate_percent'] = self._calculate_error_rate()
             self.performance_metrics['requests_per_minute'] = self._calculate_requests_per_minute()
             self.performance_metrics['calls_per_hour'] = self._calculate_calls_per_hour()
@@ -193,49 +351,109 @@ class MetricsCollector:
                 'timestamp': datetime.now().isoformat(),
                 'system': dict(self.system_metrics),
                 'performance': dict(self.performance_metrics),
-                'call_analytics': dict(self.call_analytics),
+                'call_analytics': self._call_analytics(total),
+                'latency': {
+                    'overall': total.latency.snapshot(),
+                    'endpoints': {
+                        endpoint: histogram.snapshot()
+                        for endpoint, histogram in total.endpoint_latency.items()
+                    }
+                },
+                'call_setup': {
+                    'stages': {stage: h.snapshot() for stage, h in total.call_setup.items()},
+                    'slo': self._connect_slo(total)
+                },
+                'call_queue': {
+                    'depth': self.system_metrics['queue_depth'],
+                    'wait': {outcome: h.snapshot() for outcome, h in total.queue_wait.items()}
+                },
                 'realtime': {
-                    'recent_response_times': list(self.realtime_data['response_times'])[-10:],
-                    'recent_errors': list(self.realtime_data['error_logs'])[-5:],
-                    'recent_call_events': list(self.realtime_data['call_events'])[-10:]
+                    'recent_response_times': list(self.realtime_data['response_times'].copy())[-10:],
+                    'recent_errors': list(self.realtime_data['error_logs'].copy())[-5:],
+                    'recent_call_events': list(self.realtime_data['call_events'].copy())[-10:]
                 }
             }
     
+    def get_exposition_snapshot(self) -> Dict[str, Any]:
+        """Consistent copy of the raw series for /metrics (formatting happens outside the lock)"""
+        with self.metrics_lock:
+            total = self._aggregate()
+            return {
+                'uptime_seconds': time.time() - self.start_time,
+                'requests': dict(total.request_counts_by_status),
+                'latency': total.endpoint_latency,
+                'call_events': dict(total.call_event_counts),
+                'call_setup': total.call_setup,
+                'active_calls': self.system_metrics['active_calls'],
+                'queue_depth': self.system_metrics['queue_depth'],
+                'queue_wait': total.queue_wait,
+                'rate_limit_hits': total.rate_limit_hits,
+                'errors_total': total.errors_total,
+            }
+    
+    def get_rollup_totals(self) -> Dict[str, Tuple[int, float]]:
+        """Cumulative (count, sum) per series; MetricsStore diffs these per minute"""
+        with self.metrics_lock:
+            total = self._aggregate()
+        return {
+            'requests': (total.total_requests, total.latency.total),  # sum = latency ms
+            'errors': (total.errors_total, 0.0),
+            'rate_limit_hits': (total.rate_limit_hits, 0.0),
+            'calls_started': (total.total_calls, 0.0),
+            'calls_completed': (total.completed_calls, float(total.total_duration_seconds)),
+            'calls_failed': (total.failed_calls, 0.0),
+        }
+    
     def get_historical_data(self, days: int = 7) -> Dict[str, Any]:
-        """Get historical data for specified number of days"""
+        """Get historical data for specified number of days
+        
+        With a MetricsStore attached, daily/hourly counts come from the
+        persisted rollups (survive restarts, lag by up to one flush interval).
+        """
+        persisted = None
+        if self.store is not None:
+            try:
+                persisted = self.store.call_history(days)
+            except Exception as e:
+                logger.error(f"Reading persisted call history failed: {e}")
         with self.metrics_lock:
+            total = self._aggregate()
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
             
-            historical = {
+            # Range queries over the ring buffers: O(days) / O(hours), not O(history)
+            today = end_date.toordinal()
+            first_day = today - days + 1
+            daily_stats = {
+                date.fromordinal(day).isoformat(): count
+                for day, count in total.daily_calls.range(first_day, today)
+            }
+            hourly_stats = {
+                f"{date.fromordinal(index // 24).isoformat()} {index % 24:02d}:00": count
+                for index, count in total.hourly_calls.range(first_day * 24, today * 24 + end_date.hour)
+            }
+            
+            if persisted is not None:
+                daily_stats, hourly_stats = persisted
+            
+            return {
                 'period': f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
-                'daily_stats': {},
-                'hourly_stats': {},
+                'daily_stats': daily_stats,
+                'hourly_stats': hourly_stats,
                 'summary': {
-                    'total_calls': sum(self.call_analytics['calls_by_day'].values()),
-                    'total_duration': self.call_analytics['total_duration_seconds'],
-                    'avg_duration': self.call_analytics['avg_call_duration_seconds'],
-                    'top_customers': dict(sorted(
-                        self.call_analytics['customer_names'].items(),
-                        key=lambda x: x[1], reverse=True
-                    )[:10])
+                    'total_calls': total.total_calls,
+                    'total_duration': total.total_duration_seconds,
+                    'avg_duration': self._call_analytics(total)['avg_call_duration_seconds'],
+                    'top_customers': dict(total.customer_names.top_k(10))
                 }
             }
-            
-            # Filter data by date range
-            for date_str, count in self.call_analytics['calls_by_day'].items():
-                date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                if start_date <= date_obj <= end_date:
-                    historical['daily_stats'][date_str] = count
-            
-            return historical
     
     def export_metrics(self, format_type: str = 'json') -> str:
         """Export metrics in specified format"""
         metrics = self.get_current_metrics()
         
         if format_type == 'json':
-            return json.dumps(metrics, indent=2, default=str)
+            return json_codec.dumps_str(metrics, indent=True)
         elif format_type == 'csv':
             # Simple CSV export for key metrics
             csv_lines = [
@@ -245,6 +463,9 @@ class MetricsCollector:
                 f'total_calls,{metrics["system"]["total_calls"]}',
                 f'active_calls,{metrics["system"]["active_calls"]}',
                 f'avg_response_time_ms,{metrics["performance"]["avg_response_time_ms"]:.2f}',
+                f'p50_response_time_ms,{metrics["latency"]["overall"]["p50"]:.2f}',
+                f'p90_response_time_ms,{metrics["latency"]["overall"]["p90"]:.2f}',
+                f'p99_response_time_ms,{metrics["latency"]["overall"]["p99"]:.2f}',
                 f'error_rate_percent,{metrics["performance"]["error_rate_percent"]:.2f}'
             ]
             return '\n'.join(csv_lines)
@@ -267,6 +488,21 @@ def record_call_metrics(event_type: str, call_id: str, customer_name: str,
     metrics_collector.record_call_event(event_type, call_id, customer_name, duration_seconds)
 
 
+def record_call_stage_metrics(stage: str, duration_ms: float) -> None:
+    """Convenience function to record a call setup interval"""
+    metrics_collector.record_call_stage(stage, duration_ms)
+
+
+def record_queue_wait_metrics(outcome: str, waited_ms: float) -> None:
+    """Convenience function to record a call queue wait"""
+    metrics_collector.record_queue_wait(outcome, waited_ms)
+
+
+def update_queue_depth_metrics(depth: int) -> None:
+    """Convenience function to update the call queue depth gauge"""
+    metrics_collector.update_queue_depth(depth)
+
+
 def record_rate_limit_metrics(client_ip: str) -> None:
     """Convenience function to record rate limit metrics"""
     metrics_collector.record_rate_limit_hit(client_ip)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persisted metric rollups - per-minute series that survive restarts
+
+A background flusher diffs MetricsCollector's cumulative totals once per
+interval and writes the delta into the `metric_rollups` table at minute,
+hour and day resolution in one batched transaction (downsampling happens at
+write time, rows are additive). Old rows are pruned per resolution.
+
+Rows hold (count, sum) so any bucket can be re-aggregated: e.g. 'requests'
+stores request count and total latency (ms), so mean = sum / count.
+"""
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+RESOLUTIONS: Dict[str, int] = {'minute': 60, 'hour': 3600, 'day': 86400}
+RETENTION_SECONDS: Dict[str, int] = {
+    'minute': 2 * 86400,
+    'hour': 90 * 86400,
+    'day': 730 * 86400,
+}
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+def bucket_start(timestamp: float, resolution: str) -> int:
+    """Start of the bucket containing `timestamp`; days align to local midnight"""
+    if resolution == 'day':
+        midnight = datetime.fromtimestamp(timestamp).replace(hour=0, minute=0, second=0, microsecond=0)
+        return int(midnight.timestamp())
+    step = RESOLUTIONS[resolution]
+    return int(timestamp) - int(timestamp) % step
+
+
+def pick_resolution(start: float, end: float) -> str:
+    """Coarsest resolution that still gives a useful number of points"""
+    span = end - start
+    if span <= 6 * 3600:
+        return 'minute'
+    if span <= 14 * 86400:
+        return 'hour'
+    return 'day'
+
+
+class MetricsStore:
+    """Batches collector deltas into DatabaseManager.metric_rollups"""
+
+    def __init__(self, collector, db, interval: float = 60.0):
+        self.collector = collector
+        self.db = db
+        self.interval = interval
+        self._last: Optional[Dict[str, Tuple[int, float]]] = None
+        self._flush_lock = threading.Lock()
+        self._last_prune = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        # Baseline: only activity after startup is attributed to this process
+        self._last = self.collector.get_rollup_totals()
+        self._thread = threading.Thread(target=self._run, name='metrics-flusher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and write whatever accumulated since the last flush"""
+        self._stop.set()
+        self.flush()
+
+    def _run(self) -> None:
+        while True:
+            # Wake just after each interval boundary so deltas map onto whole minutes
+            now = time.time()
+            if self._stop.wait(self.interval - now % self.interval + 0.05):
+                return
+            self.flush(timestamp=time.time() - 1)
+
+    def flush(self, timestamp: Optional[float] = None) -> int:
+        """Write counter deltas since the previous flush; returns rows written"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._flush_lock:
+            totals = self.collector.get_rollup_totals()
+            previous = self._last or {}
+            rows: List[Tuple[str, int, str, int, float]] = []
+            for name, (count, total) in totals.items():
+                prev_count, prev_total = previous.get(name, (0, 0.0))
+                d_count, d_total = count - prev_count, total - prev_total
+                if not d_count and not d_total:
+                    continue
+                for resolution in RESOLUTIONS:
+                    rows.append((resolution, bucket_start(timestamp, resolution), name, d_count, d_total))
+            try:
+                self.db.save_metric_rollups(rows)
+            except Exception as e:
+                # Keep the old baseline so the delta is retried next flush
+                logger.error(f"Metric rollup flush failed: {e}")
+                return 0
+            self._last = totals
+            if time.time() - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+                self.prune()
+            return len(rows)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        self._last_prune = now
+        removed = 0
+        for resolution, retention in RETENTION_SECONDS.items():
+            try:
+                removed += self.db.delete_metric_rollups(resolution, now - retention) or 0
+            except Exception as e:
+                logger.error(f"Metric rollup prune failed ({resolution}): {e}")
+        return removed
+
+    def query(self, names: Sequence[str], start: float, end: float,
+              resolution: Optional[str] = None) -> Dict[str, Any]:
+        """Range query for the dashboard: {name: [{timestamp, count, sum, mean}]}"""
+        resolution = resolution or pick_resolution(start, end)
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        rows = self.db.get_metric_rollups(resolution, bucket_start(start, resolution), end, list(names))
+        series: Dict[str, List[Dict[str, Any]]] = {name: [] for name in names}
+        for row in rows:
+            count, total = row['value_count'], row['value_sum']
+            series[row['name']].append({
+                'timestamp': row['bucket_start'],
+                'count': count,
+                'sum': round(total, 3),
+                'mean': round(total / count, 3) if count else 0,
+            })
+        return {'resolution': resolution, 'start': int(start), 'end': int(end), 'series': series}
+
+    def call_history(self, days: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Persisted calls_started per day and per hour for the last `days` days"""
+        end = time.time()
+        first_day = datetime.combine(date.today() - timedelta(days=days - 1), datetime.min.time())
+        start = first_day.timestamp()
+        daily = self.db.get_metric_rollups('day', start, end, ['calls_started'])
+        hourly = self.db.get_metric_rollups('hour', start, end, ['calls_started'])
+        return (
+            {datetime.fromtimestamp(r['bucket_start']).strftime('%Y-%m-%d'): r['value_count'] for r in daily},
+            {datetime.fromtimestamp(r['bucket_start']).strftime('%Y-%m-%d %H:00'): r['value_count'] for r in hourly},
+        )
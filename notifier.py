@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Notification backends - one notify() call, several pluggable sinks
+
+Handlers publish an event once through NotificationHub.notify(event, data,
+text). Each registered backend decides whether it wants the event and
+delivers it without blocking the request thread:
+
+- TelegramNotifier: hands `text` (HTML) to the queued TelegramDispatcher
+- WebhookNotifier: POSTs {"event", "data", "ts"} as JSON to a URL from a
+  background worker over a keep-alive connection, optionally signed with
+  X-Signature-256 (HMAC-SHA256 of the body)
+- EventBus: in-process pub/sub; connected admin panels subscribe and get
+  events pushed with no external round trip
+
+Backends filter by event name (`events`, None = all). Sensitive events such
+as admin OTP codes are only routed to backends that explicitly list them.
+"""
+import hashlib
+import hmac
+import http.client
+import itertools
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Notifier:
+    """Backend interface: accepts() filters, deliver() must not block"""
+
+    name = 'notifier'
+
+    def __init__(self, events: Optional[Iterable[str]] = None):
+        self.events: Optional[Set[str]] = set(events) if events is not None else None
+
+    def accepts(self, event: str) -> bool:
+        return self.events is None or event in self.events
+
+    def deliver(self, event: str, data: Dict[str, Any], text: Optional[str], urgent: bool) -> bool:
+        raise NotImplementedError
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class TelegramNotifier(Notifier):
+    """Routes `text` to a TelegramDispatcher; urgent messages are never coalesced"""
+
+    name = 'telegram'
+
+    def __init__(self, dispatcher, events: Optional[Iterable[str]] = None):
+        super().__init__(events)
+        self.dispatcher = dispatcher
+
+    def deliver(self, event, data, text, urgent):
+        if not text:
+            return False
+        return self.dispatcher.send(text, coalesce=not urgent)
+
+    def start(self):
+        self.dispatcher.start()
+
+    def stop(self):
+        self.dispatcher.stop()
+
+    def stats(self):
+        return self.dispatcher.stats()
+
+
+class WebhookNotifier(Notifier):
+    """JSON POSTs to one URL from a single background worker"""
+
+    name = 'webhook'
+
+    def __init__(self, url: str, events: Optional[Iterable[str]] = None, secret: Optional[str] = None,
+                 queue_size: int = 500, max_retries: int = 3, timeout: float = 5.0):
+        super().__init__(events)
+        parts = urlsplit(url)
+        self._scheme, self._host = parts.scheme, parts.netloc
+        self._path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        self._secret = secret.encode() if secret else None
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._stats = {'sent': 0, 'failed': 0, 'dropped': 0, 'retries': 0}
+
+    def deliver(self, event, data, text, urgent):
+        body = json_codec.dumps({'event': event, 'data': data, 'ts': time.time()})
+        try:
+            self._queue.put_nowait((event, body))
+        except queue.Full:
+            self._stats['dropped'] += 1
+            return False
+        return True
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='webhook', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        try:
+            self._queue.put(_STOP, timeout=0.1)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        return dict(self._stats, queue_depth=self._queue.qsize())
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                ok = self._post(*item)
+                self._stats['sent' if ok else 'failed'] += 1
+        finally:
+            self._close()
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _post(self, event: str, body: bytes) -> bool:
+        headers = {'Content-Type': 'application/json', 'X-Event': event}
+        if self._secret:
+            headers['X-Signature-256'] = 'sha256=' + hmac.new(self._secret, body, hashlib.sha256).hexdigest()
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self._conn is None:
+                    cls = http.client.HTTPSConnection if self._scheme == 'https' else http.client.HTTPConnection
+                    self._conn = cls(self._host, timeout=self.timeout)
+                self._conn.request('POST', self._path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                response.read()
+                if response.will_close:
+                    self._close()
+                if response.status < 300:
+                    return True
+                if response.status < 500 and response.status != 429:
+                    logger.error("Webhook rejected %s: HTTP %s", event, response.status)
+                    return False
+            except (OSError, http.client.HTTPException) as e:
+                self._close()
+                logger.warning("Webhook %s failed (attempt %d): %s", event, attempt + 1, e)
+            if attempt == self.max_retries or self._stopping.wait(min(10.0, 0.5 * (2 ** attempt))):
+                break
+            self._stats['retries'] += 1
+        return False
+
+
+class Subscription:
+    """One subscriber's bounded event queue
+
+    A subscriber that falls behind is marked `overflowed` and stops receiving
+    events; it should resynchronise (e.g. reconnect and fetch a snapshot)
+    rather than silently miss updates.
+    """
+
+    def __init__(self, max_pending: int):
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+        self.closed = False
+
+    def put(self, item: Tuple[int, str, Dict[str, Any]]) -> bool:
+        if self.overflowed or self.closed:
+            return False
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            return False
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[int, str, Dict[str, Any]]]:
+        """(seq, event, data), or None on timeout/close"""
+        try:
+            item = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return None if item is _STOP else item
+
+    def close(self) -> None:
+        self.closed = True
+        try:
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+
+
+class EventBus(Notifier):
+    """In-process pub/sub for admin panels; events carry a monotonic seq"""
+
+    name = 'local'
+
+    def __init__(self, events: Optional[Iterable[str]] = None, max_pending: int = 256):
+        super().__init__(events)
+        self.max_pending = max_pending
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self._stats = {'published': 0, 'delivered': 0, 'overflowed': 0}
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.max_pending)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+        subscription.close()
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: str, data: Dict[str, Any]) -> int:
+        """Fan out to all subscribers; returns how many received it"""
+        with self._lock:
+            item = (next(self._seq), event, data)
+            subscribers = list(self._subscribers)
+        delivered = 0
+        for subscription in subscribers:
+            if subscription.put(item):
+                delivered += 1
+            elif subscription.overflowed and not subscription.closed:
+                self._stats['overflowed'] += 1
+                self.unsubscribe(subscription)
+        self._stats['published'] += 1
+        self._stats['delivered'] += delivered
+        return delivered
+
+    def deliver(self, event, data, text, urgent):
+        self.publish(event, data)
+        return True
+
+    def stop(self):
+        with self._lock:
+            subscribers, self._subscribers = list(self._subscribers), set()
+        for subscription in subscribers:
+            subscription.close()
+
+    def stats(self):
+        return dict(self._stats, subscribers=self.subscriber_count())
+
+
+class NotificationHub:
+    """Fans one notification out to every backend that accepts it"""
+
+    def __init__(self, backends: Iterable[Notifier] = ()):
+        self.backends: List[Notifier] = list(backends)
+
+    def register(self, backend: Notifier) -> None:
+        self.backends.append(backend)
+
+    def notify(self, event: str, data: Optional[Dict[str, Any]] = None,
+               text: Optional[str] = None, urgent: bool = False) -> List[str]:
+        """Deliver to accepting backends; returns the names that took it"""
+        data = data or {}
+        accepted = []
+        for backend in self.backends:
+            if not backend.accepts(event):
+                continue
+            try:
+                if backend.deliver(event, data, text, urgent):
+                    accepted.append(backend.name)
+            except Exception as e:
+                logger.error("Notifier %s failed for %s: %s", backend.name, event, e)
+        return accepted
+
+    def start(self) -> None:
+        for backend in self.backends:
+            backend.start()
+
+    def stop(self) -> None:
+        for backend in self.backends:
+            try:
+                backend.stop()
+            except Exception as e:
+                logger.error("Notifier %s stop failed: %s", backend.name, e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {backend.name: backend.stats() for backend in self.backends}
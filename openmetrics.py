@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OpenMetrics exposition for GET /metrics
+
+Series are copied out of MetricsCollector under its lock and formatted
+outside it. Label sets and bucket bounds are formatted once and reused, and
+the finished payload is cached for `cache_seconds`, so frequent scrapes cost
+a dict lookup plus (at most once per window) a string join.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from system_sampler import process_stats
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'canli_destek_'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _fmt(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class OpenMetricsRenderer:
+    """Renders MetricsCollector (+ DB pool and process stats) as OpenMetrics text"""
+
+    def __init__(self, collector, db_stats: Optional[Callable[[], Dict[str, Any]]] = None,
+                 process_stats_fn: Callable[[], Dict[str, float]] = process_stats,
+                 cache_seconds: float = 1.0):
+        self.collector = collector
+        self.db_stats = db_stats
+        self.process_stats_fn = process_stats_fn
+        self.cache_seconds = cache_seconds
+        self._lock = threading.Lock()
+        self._cache: Optional[bytes] = None
+        self._cache_time = 0.0
+        # Pre-formatted '{a="x",b="y"}' strings keyed by label values
+        self._label_cache: Dict[Tuple, str] = {}
+        self._bucket_cache: Dict[Tuple, List[str]] = {}
+
+    def render(self) -> bytes:
+        cached = self._cache
+        if cached is not None and time.monotonic() - self._cache_time < self.cache_seconds:
+            return cached
+        with self._lock:
+            # Another scrape may have refreshed the cache while we waited
+            if self._cache is not None and time.monotonic() - self._cache_time < self.cache_seconds:
+                return self._cache
+            body = self._build().encode('utf-8')
+            self._cache = body
+            self._cache_time = time.monotonic()
+            return body
+
+    def _labels(self, names: Tuple[str, ...], values: Tuple) -> str:
+        key = (names, values)
+        formatted = self._label_cache.get(key)
+        if formatted is None:
+            pairs = ','.join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+            formatted = self._label_cache[key] = '{' + pairs + '}'
+        return formatted
+
+    def _bucket_prefixes(self, name: str, label: str, value: str,
+                         bounds_ms: Tuple[float, ...]) -> List[str]:
+        """'<name>_bucket{<label>="..",le=".."} ' line prefixes for one series"""
+        key = (name, label, value, bounds_ms)
+        prefixes = self._bucket_cache.get(key)
+        if prefixes is None:
+            escaped = _escape(value)
+            les = [_fmt(b / 1000.0) for b in bounds_ms] + ['+Inf']
+            prefixes = [
+                f'{PREFIX}{name}_bucket{{{label}="{escaped}",le="{le}"}} '
+                for le in les
+            ]
+            self._bucket_cache[key] = prefixes
+        return prefixes
+    
+    def _histograms(self, out: List[str], name: str, label: str, series: Dict[str, Any]) -> None:
+        """Bucket/count/sum lines for histograms in ms, exposed in seconds"""
+        for value, hist in sorted(series.items()):
+            for prefix, (_, cumulative) in zip(self._bucket_prefixes(name, label, value, hist.bounds),
+                                               hist.cumulative_counts()):
+                out.append(prefix + str(cumulative))
+            labels = self._labels((label,), (value,))
+            out.append(f'{PREFIX}{name}_count{labels} {hist.count}')
+            out.append(f'{PREFIX}{name}_sum{labels} {_fmt(hist.total / 1000.0)}')
+
+    @staticmethod
+    def _family(out: List[str], name: str, kind: str, help_text: str) -> None:
+        out.append(f'# TYPE {PREFIX}{name} {kind}')
+        out.append(f'# HELP {PREFIX}{name} {help_text}')
+
+    def _build(self) -> str:
+        snap = self.collector.get_exposition_snapshot()
+        out: List[str] = []
+        p = PREFIX
+
+        self._family(out, 'http_requests', 'counter', 'HTTP requests by route and status.')
+        for (route, status), count in sorted(snap['requests'].items()):
+            out.append(f'{p}http_requests_total{self._labels(("route", "status"), (route, status))} {count}')
+
+        self._family(out, 'http_request_duration_seconds', 'histogram', 'HTTP request latency by route.')
+        self._histograms(out, 'http_request_duration_seconds', 'route', snap['latency'])
+
+        self._family(out, 'call_events', 'counter', 'Call lifecycle events by type.')
+        for event, count in sorted(snap['call_events'].items()):
+            out.append(f'{p}call_events_total{self._labels(("event",), (event,))} {count}')
+
+        self._family(out, 'call_setup_duration_seconds', 'histogram', 'Call setup latency by lifecycle stage.')
+        self._histograms(out, 'call_setup_duration_seconds', 'stage', snap.get('call_setup', {}))
+
+        self._family(out, 'call_queue_wait_seconds', 'histogram', 'Time calls spent in the queue by outcome.')
+        self._histograms(out, 'call_queue_wait_seconds', 'outcome', snap.get('queue_wait', {}))
+
+        self._family(out, 'active_calls', 'gauge', 'Calls currently active.')
+        out.append(f'{p}active_calls {snap["active_calls"]}')
+        self._family(out, 'call_queue_depth', 'gauge', 'Calls waiting in the queue.')
+        out.append(f'{p}call_queue_depth {snap.get("queue_depth", 0)}')
+        self._family(out, 'rate_limit_hits', 'counter', 'Requests rejected by the rate limiter.')
+        out.append(f'{p}rate_limit_hits_total {snap["rate_limit_hits"]}')
+        self._family(out, 'uptime_seconds', 'gauge', 'Seconds since the metrics collector started.')
+        out.append(f'{p}uptime_seconds {_fmt(round(snap["uptime_seconds"], 3))}')
+
+        if self.db_stats is not None:
+            try:
+                db = self.db_stats()
+            except Exception:
+                db = None
+            if db:
+                self._family(out, 'db_connections_opened', 'counter', 'Database connections checked out.')
+                out.append(f'{p}db_connections_opened_total {db["connections_opened"]}')
+                self._family(out, 'db_connection_errors', 'counter', 'Failed database connection attempts.')
+                out.append(f'{p}db_connection_errors_total {db["connection_errors"]}')
+                self._family(out, 'db_connections_in_use', 'gauge', 'Database connections currently in use.')
+                out.append(f'{p}db_connections_in_use {db["connections_in_use"]}')
+                self._family(out, 'db_pool_max', 'gauge', 'Connection pool size limit (0 without a pool).')
+                out.append(f'{p}db_pool_max {db["pool_max"]}')
+
+        proc = self.process_stats_fn()
+        if 'cpu_seconds' in proc:
+            out.append('# TYPE process_cpu_seconds counter')
+            out.append(f'process_cpu_seconds_total {_fmt(round(proc["cpu_seconds"], 3))}')
+        if 'resident_memory_bytes' in proc:
+            out.append('# TYPE process_resident_memory_bytes gauge')
+            out.append(f'process_resident_memory_bytes {_fmt(proc["resident_memory_bytes"])}')
+        if 'open_fds' in proc:
+            out.append('# TYPE process_open_fds gauge')
+            out.append(f'process_open_fds {_fmt(proc["open_fds"])}')
+        out.append('# TYPE process_threads gauge')
+        out.append(f'process_threads {_fmt(proc["threads"])}')
+        out.append('# TYPE process_start_time_seconds gauge')
+        out.append(f'process_start_time_seconds {_fmt(round(proc["start_time_seconds"], 3))}')
+
+        out.append('# EOF')
+        return '\n'.join(out) + '\n'
@@ -1,11 +1,19 @@
 import secrets
 import hashlib
+import hmac
+import logging
+import queue
 import threading
 import time
 import re
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
+
+from expiry import expiry_scheduler
+from profiler import InstrumentedLock
+
+logger = logging.getLogger(__name__)
 
 # Sabitler
 MAX_OTP_ATTEMPTS = 5
@@ -16,11 +24,103 @@ SESSION_TIMEOUT_HOURS = int(os.getenv('SESSION_TIMEOUT_HOURS', '8'))
 RATE_LIMIT_REQUESTS = int(os.getenv('RATE_LIMIT_CALLS', '50'))  # Default 50 istek
 RATE_LIMIT_WINDOW = int(os.getenv('RATE_LIMIT_PERIOD', '3600'))  # Default 1 saat
 
+OTP_WRITE_QUEUE_SIZE = 1000
+
+# OTP'ler düz metin tutulmaz: HMAC-SHA256(key, code). Key gizli olduğu için
+# 6 haneli kod uzayı hash'lerden brute-force ile geri çözülemez - bu yüzden key
+# asla hash'lerle aynı veritabanına yazılmaz. Key OTP_HASH_KEY env'inden ya da
+# OTP_HASH_KEY_FILE dosyasından gelir; ikisi de yoksa süreç başına rastgeledir
+# ve restart sonrası eski OTP'ler geri yüklenmez.
+def _load_hash_key() -> Optional[bytes]:
+    key = os.getenv('OTP_HASH_KEY', '').encode()
+    key_file = os.getenv('OTP_HASH_KEY_FILE')
+    if not key and key_file:
+        with open(key_file, 'rb') as f:
+            key = f.read().strip()
+    return key or None
+
+
+_configured_key = _load_hash_key()
+OTP_HASH_KEY = _configured_key or secrets.token_bytes(32)
+OTP_HASH_KEY_DURABLE = _configured_key is not None  # aynı key restart sonrası da geçerli
+
 # Global storage
-otp_codes: Dict = {}
+otp_codes: Dict = {}  # call_id -> {code_hash, expires, attempts, type, created_at}
+otp_index: Dict[str, str] = {}  # code_hash -> call_id (aktif kodlar benzersiz)
 admin_sessions: Dict = {}
 rate_limit_storage: Dict = {}  # Rate limiting storage
-data_lock = threading.Lock()
+data_lock = InstrumentedLock('otp.data_lock')
+
+
+def _hash_code(code: str) -> str:
+    return hmac.new(OTP_HASH_KEY, code.encode(), hashlib.sha256).hexdigest()
+
+
+def _remove_otp(call_id: str) -> None:
+    """OTP kaydını ve index'ini sil (data_lock tutulurken çağrılır)"""
+    entry = otp_codes.pop(call_id, None)
+    if entry is not None and otp_index.get(entry['code_hash']) == call_id:
+        del otp_index[entry['code_hash']]
+
+
+class OTPPersistence:
+    """otp_codes tablosuna asenkron yazım - istek thread'i sadece kuyruğa ekler
+
+    Tek writer thread işlemleri sırayla uygular (save -> attempt -> delete
+    sırası korunur). Kuyruk doluysa işlem çağıran thread'de (kilit dışında)
+    yapılır, yani kayıp yerine geri basınç uygulanır.
+    """
+
+    def __init__(self, db, queue_size: int = OTP_WRITE_QUEUE_SIZE):
+        self.db = db
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='otp-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Kuyruktaki yazımları bitir ve thread'i durdur"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def submit(self, op: str, *args: Any) -> None:
+        try:
+            self._queue.put_nowait((op, args))
+        except queue.Full:
+            self._apply(op, args)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._apply(*item)
+            finally:
+                self._queue.task_done()
+
+    def _apply(self, op: str, args: Tuple) -> None:
+        try:
+            getattr(self.db, op)(*args)
+        except Exception as e:
+            logger.error("OTP persistence failed (%s): %s", op, e)
+
+
+_persistence: Optional[OTPPersistence] = None
+
+
+def _persist(op: str, *args: Any) -> None:
+    """DatabaseManager.<op>(*args) arka planda (persistence yoksa no-op)"""
+    if _persistence is not None:
+        _persistence.submit(op, *args)
 
 
 class OTPManager:
@@ -48,34 +148,33 @@ class OTPManager:
     @staticmethod
     def create_otp(call_id: str, otp_type: str = 'admin') -> str:
         """OTP oluştur ve kaydet"""
-        otp = OTPManager.generate_otp()
+        now = datetime.now()
+        expires = now + timedelta(minutes=OTP_VALIDITY_MINUTES)
 
         with data_lock:
+            _remove_otp(call_id)
+            # Aktif kodlar benzersiz olsun ki find_call_id_by_code tek sonuç versin
+            otp = OTPManager.generate_otp()
+            code_hash = _hash_code(otp)
+            while code_hash in otp_index:
+                otp = OTPManager.generate_otp()
+                code_hash = _hash_code(otp)
+
             otp_codes[call_id] = {
-                'code': otp,
-                'expires': datetime.now() + timedelta(minutes=OTP_VALIDITY_MINUTES),
+                'code_hash': code_hash,
+                'expires': expires,
                 'attempts': 0,
                 'type': otp_type,
-                'created_at': datetime.now()
+                'created_at': now
             }
+            otp_index[code_hash] = call_id
+        expiry_scheduler.schedule('otp', call_id, OTP_VALIDITY_MINUTES * 60)
 
-            # Yedekleme (opsiyonel)
-            try:
-                backup_data = {
-                    cid: {
-                        'code': data['code'],
-                        'expires': data['expires'].isoformat(),
-                        'type': data['type']
-                    } for cid, data in otp_codes.items()
-                }
-                with open('otp_backup.json', 'w') as f:
-                    import json
-                    json.dump(backup_data, f)
-            except Exception as e:
-                print(f"OTP backup failed: {e}")
+        # DB'ye yazım kilit dışında, arka plan thread'inde
+        _persist('save_otp', call_id, code_hash, expires)
 
         # Hassas veriyi loglamadan hash'le
-        print(f"OTP created: hash={OTPManager.hash_sensitive_data(otp)}, type={otp_type}")
+        logger.info("OTP created: hash=%s, type=%s", OTPManager.hash_sensitive_data(otp), otp_type)
         return otp
 
     @staticmethod
@@ -85,65 +184,96 @@ class OTPManager:
         if not OTPManager.validate_otp_format(otp_input):
             return False, 'OTP 6 haneli sayi olmali'
 
+        input_hash = _hash_code(otp_input)
         with data_lock:
-            # 1. OTP kaydı var mı?
-            if call_id not in otp_codes:
-                return False, 'Gecersiz veya suresi dolmus OTP'
-
-            otp_data = otp_codes[call_id]
-
-            # 2. Süre kontrolü (10 dakika)
-            if datetime.now() >= otp_data['expires']:
-                del otp_codes[call_id]
-                return False, 'OTP suresi dolmus'
-
-            # 3. Deneme sayısı kontrolü (max 5)
-            if otp_data.get('attempts', 0) >= MAX_OTP_ATTEMPTS:
-                del otp_codes[call_id]
-                return False, 'Cok fazla yanlis deneme'
-
-            # 4. Kod eşleşmesi
-            if otp_data['code'] == otp_input:
-                del otp_codes[call_id]
-                return True, 'OTP dogrulandi'
-            else:
-                # Yanlış kod: Deneme sayısını artır
-                otp_data['attempts'] += 1
-                remaining = MAX_OTP_ATTEMPTS - otp_data['attempts']
-
-                if remaining > 0:
-                    return False, f'Yanlis OTP. {remaining} deneme hakkiniz kaldi'
-                else:
-                    del otp_codes[call_id]
-                    return False, 'Cok fazla yanlis deneme'
+            result, persist_op = OTPManager._check_otp(call_id, input_hash)
+        if persist_op:
+            _persist(persist_op, call_id)
+        return result
 
     @staticmethod
-    def cleanup_expired() -> int:
-        """Süresi dolmuş OTP'leri temizle"""
-        current_time = datetime.now()
-        cleaned = 0
+    def _check_otp(call_id: str, input_hash: str) -> Tuple[Tuple[bool, str], Optional[str]]:
+        """verify_otp kontrolleri (data_lock tutulurken); DB işlemi adını da döndürür"""
+        # 1. OTP kaydı var mı?
+        if call_id not in otp_codes:
+            return (False, 'Gecersiz veya suresi dolmus OTP'), None
+
+        otp_data = otp_codes[call_id]
+
+        # 2. Süre kontrolü (10 dakika)
+        if datetime.now() >= otp_data['expires']:
+            _remove_otp(call_id)
+            return (False, 'OTP suresi dolmus'), 'delete_otp'
+
+        # 3. Deneme sayısı kontrolü (max 5)
+        if otp_data.get('attempts', 0) >= MAX_OTP_ATTEMPTS:
+            _remove_otp(call_id)
+            return (False, 'Cok fazla yanlis deneme'), 'delete_otp'
+
+        # 4. Kod eşleşmesi
+        if hmac.compare_digest(otp_data['code_hash'], input_hash):
+            _remove_otp(call_id)
+            return (True, 'OTP dogrulandi'), 'delete_otp'
+
+        # Yanlış kod: Deneme sayısını artır
+        otp_data['attempts'] += 1
+        remaining = MAX_OTP_ATTEMPTS - otp_data['attempts']
+        if remaining > 0:
+            return (False, f'Yanlis OTP. {remaining} deneme hakkiniz kaldi'), 'increment_otp_attempts'
+        _remove_otp(call_id)
+        return (False, 'Cok fazla yanlis deneme'), 'delete_otp'
 
+    @staticmethod
+    def init_persistence(db) -> int:
+        """Aktif OTP'leri DB'den geri yükle ve asenkron yazıcıyı başlat"""
+        global _persistence
+        # Eski sürümler key'i settings tablosuna, hash'lerin yanına yazıyordu
+        if db.get_setting('otp_hash_key') is not None:
+            db.delete_setting('otp_hash_key')
+
+        restored = 0
+        now = datetime.now()
+        if OTP_HASH_KEY_DURABLE:
+            rows = db.get_active_otps()
+        else:
+            rows = []
+            logger.warning("OTP_HASH_KEY / OTP_HASH_KEY_FILE not set: using a per-process key, "
+                           "OTPs issued before this restart are not restored")
         with data_lock:
-            expired_otps = [
-                call_id for call_id, otp_data in otp_codes.items()
-                if current_time >= otp_data['expires']
-            ]
-            for call_id in expired_otps:
-                del otp_codes[call_id]
-                cleaned += 1
-
-            # Süresi dolmuş session'ları da temizle
-            expired_sessions = [
-                call_id for call_id, session in admin_sessions.items()
-                if current_time >= session['expires']
-            ]
-            for call_id in expired_sessions:
-                del admin_sessions[call_id]
-
-        if cleaned > 0:
-            print(f"Cleaned {cleaned} expired OTPs")
+            for row in rows:
+                expires = row['expires']
+                if not isinstance(expires, datetime):
+                    expires = datetime.fromisoformat(expires)
+                if expires <= now or row['code'] in otp_index:
+                    continue
+                _remove_otp(row['call_id'])
+                otp_codes[row['call_id']] = {
+                    'code_hash': row['code'],
+                    'expires': expires,
+                    'attempts': row.get('attempts') or 0,
+                    'type': 'admin',
+                    'created_at': now
+                }
+                otp_index[row['code']] = row['call_id']
+                expiry_scheduler.schedule('otp', row['call_id'], (expires - now).total_seconds())
+                restored += 1
+
+        if _persistence is None:
+            _persistence = OTPPersistence(db)
+            _persistence.start()
+        # Önceki süreçten kalan süresi dolmuş satırlar
+        _persist('cleanup_expired_otps')
+        if restored:
+            logger.info("Restored %d OTPs from database", restored)
+        return restored
 
-        return cleaned
+    @staticmethod
+    def stop_persistence() -> None:
+        """Bekleyen OTP yazımlarını bitir (shutdown)"""
+        global _persistence
+        if _persistence is not None:
+            _persistence.stop()
+            _persistence = None
 
     @staticmethod
     def create_session(call_id: str, ip_address: str) -> Dict:
@@ -155,6 +285,7 @@ class OTPManager:
                 'expires': datetime.now() + timedelta(hours=SESSION_TIMEOUT_HOURS),
                 'ip_address': ip_address
             }
+        expiry_scheduler.schedule('otp_session', call_id, SESSION_TIMEOUT_HOURS * 3600)
         return admin_sessions[call_id]
 
     @staticmethod
@@ -179,6 +310,7 @@ class OTPManager:
         with data_lock:
             if identifier not in rate_limit_storage:
                 rate_limit_storage[identifier] = {'requests': [], 'blocked_until': 0}
+                expiry_scheduler.schedule('rate_limit', identifier, RATE_LIMIT_WINDOW)
 
             # Bloke kontrolü
             if current_time < rate_limit_storage[identifier]['blocked_until']:
@@ -219,21 +351,73 @@ class OTPManager:
 
     @staticmethod
     def find_call_id_by_code(otp_input: str) -> Optional[str]:
-        """OTP kodundan call_id bul"""
+        """OTP kodundan call_id bul - hash index ile O(1)"""
+        # Index anahtarı gizli key ile HMAC olduğundan dict aramasının
+        # zamanlaması kod hakkında bilgi sızdırmaz
+        code_hash = _hash_code(otp_input)
         with data_lock:
-            for cid, data in otp_codes.items():
-                if data['code'] == otp_input and datetime.now() < data['expires']:
-                    return cid
+            cid = otp_index.get(code_hash)
+            data = otp_codes.get(cid) if cid else None
+            if data is not None and datetime.now() < data['expires']:
+                return cid
         return None
 
 
-def start_cleanup_thread():
-    """Otomatik temizlik thread'i başlat"""
-    def cleanup_loop():
-        while True:
-            time.sleep(3600)  # Her 1 saatte bir
-            OTPManager.cleanup_expired()
+def _expire_otps(call_ids: List[str], now: float) -> Dict[str, Optional[float]]:
+    """expiry_scheduler: süresi dolan OTP'leri sil (DB silme kilit dışında)"""
+    current = datetime.now()
+    expired, alive = [], {}
+    with data_lock:
+        for call_id in call_ids:
+            entry = otp_codes.get(call_id)
+            if entry is None:
+                continue  # doğrulandı veya silindi
+            if entry['expires'] <= current:
+                _remove_otp(call_id)
+                expired.append(call_id)
+            else:
+                alive[call_id] = None  # yeniden üretildi; yeni kaydı zaten planlı
+    for call_id in expired:
+        _persist('delete_otp', call_id)
+    if expired:
+        logger.info("Cleaned %d expired OTPs", len(expired))
+    return alive
+
+
+def _expire_sessions(call_ids: List[str], now: float) -> Dict[str, float]:
+    current = datetime.now()
+    rearm = {}
+    with data_lock:
+        for call_id in call_ids:
+            session = admin_sessions.get(call_id)
+            if session is None:
+                continue
+            remaining = (session['expires'] - current).total_seconds()
+            if remaining > 0:
+                rearm[call_id] = remaining
+            else:
+                del admin_sessions[call_id]
+    return rearm
+
+
+def _expire_rate_limits(identifiers: List[str], now: float) -> Dict[str, float]:
+    """Pencere ve bloke süresi geçmiş rate-limit kayıtlarını unut"""
+    current = time.time()
+    rearm = {}
+    with data_lock:
+        for identifier in identifiers:
+            entry = rate_limit_storage.get(identifier)
+            if entry is None:
+                continue
+            last_request = entry['requests'][-1] if entry['requests'] else 0
+            remaining = max(entry['blocked_until'], last_request + RATE_LIMIT_WINDOW) - current
+            if remaining > 0:
+                rearm[identifier] = remaining
+            else:
+                del rate_limit_storage[identifier]
+    return rearm
+
 
-    thread = threading.Thread(target=cleanup_loop, daemon=True)
-    thread.start()
-    print("OTP cleanup thread started")
+expiry_scheduler.register('otp', _expire_otps)
+expiry_scheduler.register('otp_session', _expire_sessions)
+expiry_scheduler.register('rate_limit', _expire_rate_limits)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Presence tracker - last-seen times and missed-heartbeat detection
+
+A heartbeat is one attribute write on the call's entry (monotonic time): no
+global lock, no heap push, nothing else to update. Missed heartbeats are
+found by a hashed timer wheel ticking every `tick` seconds. Each entry sits
+in exactly one slot, due when it would turn `away` (no heartbeat for
+`away_after`) or `offline` (`offline_after`). When its slot comes round the
+entry is re-checked against its real last-seen time and either moved to the
+slot of its new deadline (heartbeats arrived meanwhile) or changes state, so
+a live entry costs the wheel one visit per `away_after` seconds however
+often it heartbeats, and a dead one is noticed within one tick.
+
+State changes go to `on_change(key, state, last_seen)` (wall-clock epoch),
+called outside the tracker lock: online -> away -> offline, and away ->
+online as soon as a heartbeat arrives. Offline entries are forgotten.
+
+Last-seen times are persisted in batches: every `flush_interval` seconds
+the entries whose time moved since the previous flush are handed to
+`persist(rows, removed)` as (key, datetime) rows, together with the keys
+forgotten or gone offline since, whose rows are deleted - one DB
+transaction per flush instead of one write per heartbeat or per call end.
+A key forgotten while a flush is in flight is deleted by the next one.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ONLINE, AWAY, OFFLINE = 'online', 'away', 'offline'
+
+ChangeCallback = Callable[[str, str, float], None]
+PersistCallback = Callable[[List[Tuple[str, datetime]], List[str]], None]
+
+
+class _Entry:
+    __slots__ = ('last_seen', 'state', 'due', 'flushed')
+
+    def __init__(self, now: float):
+        self.last_seen = now   # monotonic; written by heartbeat() without a lock
+        self.state = ONLINE
+        self.due = 0           # wheel tick the entry is filed under
+        self.flushed = None    # last_seen value already persisted
+
+
+class PresenceTracker:
+    """Heartbeat last-seen times with a timer wheel for away/offline detection"""
+
+    def __init__(self, away_after: float = 40.0, offline_after: float = 120.0,
+                 tick: float = 1.0, flush_interval: float = 30.0,
+                 on_change: Optional[ChangeCallback] = None,
+                 persist: Optional[PersistCallback] = None):
+        self.away_after = away_after
+        self.offline_after = max(offline_after, away_after)
+        self.tick = tick
+        self.flush_interval = flush_interval
+        self._on_change = on_change
+        self._persist = persist
+        self._entries: Dict[str, _Entry] = {}
+        self._removed: Set[str] = set()  # keys whose persisted row is deleted on the next flush
+        self._lock = threading.Lock()  # wheel and state changes, never taken by a plain heartbeat
+        # Deadlines are at most offline_after ahead, so this many slots never wrap
+        self._wheel: List[Set[str]] = [set() for _ in range(int(math.ceil(self.offline_after / tick)) + 2)]
+        self._origin = time.monotonic()
+        self._current = 0              # last tick processed
+        self._next_flush = self._origin + flush_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counters = {'heartbeats': 0, 'went_away': 0, 'went_offline': 0, 'flushes': 0, 'rows_flushed': 0,
+                         'rows_removed': 0}
+
+    # -- callers -------------------------------------------------------
+
+    def track(self, key: str, now: Optional[float] = None) -> None:
+        """Start tracking `key` (seen now)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(now)
+            else:
+                entry.last_seen = now
+            self._file(key, entry, now + self.away_after)
+
+    def heartbeat(self, key: str, now: Optional[float] = None) -> bool:
+        """Record a heartbeat; False if `key` is not tracked"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        now = time.monotonic() if now is None else now
+        entry.last_seen = now
+        self.counters['heartbeats'] += 1  # approximate under contention, stats only
+        if entry.state == AWAY:
+            with self._lock:
+                back = entry.state == AWAY and self._entries.get(key) is entry
+                if back:
+                    entry.state = ONLINE
+                    self._file(key, entry, now + self.away_after)
+            if back:
+                self._emit([(key, ONLINE, now)], now)
+        return True
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._wheel[entry.due % len(self._wheel)].discard(key)
+                if self._persist is not None:
+                    self._removed.add(key)
+
+    def state(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        return entry.state if entry is not None else None
+
+    def last_seen(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        """Wall-clock epoch of the last heartbeat, None if not tracked"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic() if now is None else now
+        return time.time() - (now - entry.last_seen)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -- wheel ---------------------------------------------------------
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Process every tick up to `now` (monotonic); returns state changes"""
+        now = time.monotonic() if now is None else now
+        changes: List[Tuple[str, str, float]] = []
+        with self._lock:
+            target = int((now - self._origin) // self.tick)
+            size = len(self._wheel)
+            # A jump longer than the wheel visits each slot once
+            for tick in range(max(self._current + 1, target - size + 1), target + 1):
+                self._current = tick
+                slot = self._wheel[tick % size]
+                if slot:
+                    keys = list(slot)
+                    slot.clear()
+                    for key in keys:
+                        self._check(key, now, changes)
+            self._current = max(self._current, target)
+        self._emit(changes, now)
+        if now >= self._next_flush:
+            self._next_flush = now + self.flush_interval
+            self.flush(now)
+        return len(changes)
+
+    def flush(self, now: Optional[float] = None) -> int:
+        """Persist last-seen times that moved since the previous flush, drop rows of forgotten keys"""
+        if self._persist is None:
+            return 0
+        now = time.monotonic() if now is None else now
+        wall = time.time()
+        rows, moved = [], []
+        with self._lock:
+            # Snapshot under the lock: a forgotten key is either absent here or in `removed`
+            for key, entry in self._entries.items():
+                seen = entry.last_seen
+                if seen != entry.flushed:
+                    moved.append((entry, seen))
+                    rows.append((key, datetime.fromtimestamp(wall - (now - seen))))
+            removed = list(self._removed)
+            self._removed.clear()
+        if not rows and not removed:
+            return 0
+        try:
+            self._persist(rows, removed)
+        except Exception as e:
+            logger.error("Presence flush failed (%d rows, %d removed): %s", len(rows), len(removed), e)
+            with self._lock:
+                self._removed.update(removed)
+            return 0  # retried on the next flush
+        for entry, seen in moved:
+            entry.flushed = seen
+        self.counters['flushes'] += 1
+        self.counters['rows_flushed'] += len(rows)
+        self.counters['rows_removed'] += len(removed)
+        return len(rows)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='presence', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        states = [entry.state for entry in list(self._entries.values())]
+        return {
+            'tracked': len(states),
+            'online': states.count(ONLINE),
+            'away': states.count(AWAY),
+            'tick_seconds': self.tick,
+            'away_after': self.away_after,
+            'offline_after': self.offline_after,
+            **self.counters,
+        }
+
+    # -- internals -----------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.tick):
+            try:
+                self.advance()
+            except Exception as e:
+                logger.error("Presence tick failed: %s", e)
+
+    def _file(self, key: str, entry: _Entry, deadline: float) -> None:
+        """(Re)file `key` under the tick of `deadline` (caller holds self._lock)"""
+        size = len(self._wheel)
+        self._wheel[entry.due % size].discard(key)
+        tick = int(math.ceil((deadline - self._origin) / self.tick))
+        entry.due = min(max(tick, self._current + 1), self._current + size - 1)
+        self._wheel[entry.due % size].add(key)
+
+    def _check(self, key: str, now: float, changes: List[Tuple[str, str, float]]) -> None:
+        """Slot came round: re-check against the real last-seen time (caller holds self._lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        seen = entry.last_seen
+        idle = now - seen
+        if idle >= self.offline_after:
+            del self._entries[key]
+            if self._persist is not None:
+                self._removed.add(key)
+            self.counters['went_offline'] += 1
+            changes.append((key, OFFLINE, seen))
+        elif idle >= self.away_after:
+            if entry.state != AWAY:
+                entry.state = AWAY
+                self.counters['went_away'] += 1
+                changes.append((key, AWAY, seen))
+            self._file(key, entry, seen + self.offline_after)
+        else:
+            self._file(key, entry, seen + self.away_after)
+
+    def _emit(self, changes: List[Tuple[str, str, float]], now: float) -> None:
+        if self._on_change is None:
+            return
+        wall = time.time()
+        for key, state, seen in changes:
+            try:
+                self._on_change(key, state, wall - (now - seen))
+            except Exception as e:
+                logger.error("Presence callback failed for %s (%s): %s", key, state, e)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Production profiling - statistical stack sampler and lock wait statistics
+
+SamplingProfiler reads sys._current_frames() at a fixed rate for a few
+seconds and counts stacks in collapsed form ("thread;outer;inner N"), which
+flamegraph.pl / speedscope read directly. Sampling cost is measured as it
+runs and the interval stretches so it never exceeds `max_overhead` of wall
+time.
+
+InstrumentedLock is a drop-in threading.Lock that records how often and how
+long threads wait for it; the uncontended path is one non-blocking acquire.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from metric_types import Histogram
+from tracing import span
+
+
+class InstrumentedLock:
+    """threading.Lock with contention counters (registered by name)"""
+
+    __slots__ = ('name', '_lock', '_span_name', 'acquisitions', 'contended',
+                 'wait_total', 'wait_max', 'wait_ms')
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._span_name = f'lock.{name}'
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_ms = Histogram()
+        _locks[name] = self
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            self.acquisitions += 1  # safe: we hold the lock
+            return True
+        if not blocking:
+            return False
+        with span(self._span_name):
+            start = time.perf_counter()
+            acquired = self._lock.acquire(True, timeout)
+            waited = time.perf_counter() - start
+        if acquired:
+            self.acquisitions += 1
+            self.contended += 1
+            self.wait_total += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+            self.wait_ms.record(waited * 1000)
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self._lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'acquisitions': self.acquisitions,
+            'contended': self.contended,
+            'contention_percent': round(self.contended / self.acquisitions * 100, 3) if self.acquisitions else 0,
+            'wait_total_ms': round(self.wait_total * 1000, 3),
+            'wait_max_ms': round(self.wait_max * 1000, 3),
+            'wait_ms': self.wait_ms.snapshot(),
+        }
+
+
+_locks: Dict[str, InstrumentedLock] = {}
+
+
+def lock_stats() -> Dict[str, Dict[str, Any]]:
+    """Wait statistics of every InstrumentedLock, by name"""
+    return {name: lock.stats() for name, lock in sorted(_locks.items())}
+
+
+# Per-connection worker threads are numbered; fold them into one root frame
+_THREAD_NUMBER_RE = re.compile(r'-\d+')
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+class SamplingProfiler:
+    """All-thread stack sampler; one run at a time"""
+
+    def __init__(self, max_seconds: float = 30.0, max_hz: float = 250.0,
+                 max_overhead: float = 0.05, max_depth: int = 64):
+        self.max_seconds = max_seconds
+        self.max_hz = max_hz
+        self.max_overhead = max_overhead
+        self.max_depth = max_depth
+        self._running = threading.Lock()
+        self._labels: Dict[Any, str] = {}
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+            self._labels[code] = label
+        return label
+
+    def _sample(self, own_ident: int, names: Dict[int, str], stacks: Counter) -> None:
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            labels: List[str] = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(self._label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(ident) or f'thread-{ident}')
+            labels.reverse()
+            stacks[';'.join(labels)] += 1
+
+    def profile(self, seconds: float, hz: float = 100.0) -> Dict[str, Any]:
+        """Sample every other thread for `seconds`; raises ProfilerBusyError if already running"""
+        if not self._running.acquire(False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            seconds = max(0.1, min(seconds, self.max_seconds))
+            interval = 1.0 / max(1.0, min(hz, self.max_hz))
+            own_ident = threading.get_ident()
+            stacks: Counter = Counter()
+            samples = 0
+            busy = 0.0
+            start = time.perf_counter()
+            deadline = start + seconds
+            names: Dict[int, str] = {}
+            while True:
+                tick = time.perf_counter()
+                if tick >= deadline:
+                    break
+                if samples % 50 == 0:
+                    names = {t.ident: _THREAD_NUMBER_RE.sub('', t.name) for t in threading.enumerate()}
+                self._sample(own_ident, names, stacks)
+                cost = time.perf_counter() - tick
+                busy += cost
+                samples += 1
+                # Overhead cap: stretch the sleep so cost / (cost + sleep) <= max_overhead
+                sleep = max(interval - cost, cost * (1.0 / self.max_overhead - 1.0))
+                time.sleep(min(sleep, max(0.0, deadline - time.perf_counter())))
+            elapsed = time.perf_counter() - start
+        finally:
+            self._running.release()
+
+        return {
+            'duration_seconds': round(elapsed, 3),
+            'requested_hz': round(1.0 / interval, 1),
+            'effective_hz': round(samples / elapsed, 1) if elapsed else 0,
+            'samples': samples,
+            'overhead_percent': round(busy / elapsed * 100, 3) if elapsed else 0,
+            'stacks': dict(stacks.most_common()),
+        }
+
+    @staticmethod
+    def collapsed(result: Dict[str, Any]) -> str:
+        """Brendan Gregg collapsed-stack text (input for flamegraph.pl / speedscope)"""
+        return ''.join(f'{stack} {count}\n' for stack, count in result['stacks'].items())
@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-from http.server import HTTPServer, SimpleHTTPRequestHandler
-import json
+from http.server import HTTPServer, ThreadingHTTPServer, SimpleHTTPRequestHandler
 import secrets
 import threading
 import time
@@ -12,18 +11,39 @@ import traceback
 import signal
 import sys
 import hashlib
+import math
 from datetime import datetime, timedelta
-from urllib.parse import urlparse, urlencode
-import urllib.request
+from functools import lru_cache
+from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
+import json_codec
+import log_config
+from errors import APIError, ValidationError, RateLimitError, AuthenticationError
+from validation import validate_request
+from request_body import BodyReader
+from tls_config import TLSConfig, load_tls_config_from_env
+from openmetrics import OpenMetricsRenderer, CONTENT_TYPE as OPENMETRICS_CONTENT_TYPE
+from system_sampler import SystemSampler
+from metrics_store import MetricsStore, RESOLUTIONS
+from tracing import Tracer, span
+from profiler import InstrumentedLock, SamplingProfiler, ProfilerBusyError, lock_stats
+from call_timeline import CallTimeline
+from expiry import expiry_scheduler
+from session_tokens import SessionTokenSigner
+from telegram_dispatcher import TelegramDispatcher, TELEGRAM_API_BASE
+from notifier import NotificationHub, TelegramNotifier, WebhookNotifier, EventBus
+from admin_feed import call_view, with_minutes_ago, stream_events
+from call_queue import CallQueue
+from presence import PresenceTracker, OFFLINE
 from otp_manager import OTPManager
 from metrics import (
-    record_request_metrics, record_call_metrics, record_rate_limit_metrics,
-    get_system_metrics, get_historical_metrics, export_metrics
+    record_request_metrics, record_call_metrics, record_call_stage_metrics, record_rate_limit_metrics,
+    record_queue_wait_metrics, update_queue_depth_metrics,
+    get_historical_metrics, export_metrics
 )
 from metrics import metrics_collector
 from database import DatabaseManager
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 # Load .env file
 load_dotenv()
@@ -43,6 +63,9 @@ SESSION_TIMEOUT_HOURS: int = int(os.getenv('SESSION_TIMEOUT_HOURS', '8'))
 RATE_LIMIT_CALLS: int = int(os.getenv('RATE_LIMIT_CALLS', '20'))
 RATE_LIMIT_PERIOD: int = int(os.getenv('RATE_LIMIT_PERIOD', '60'))
 HEARTBEAT_INTERVAL: int = int(os.getenv('HEARTBEAT_INTERVAL', '30'))
+HEARTBEAT_TIMEOUT: int = int(os.getenv('HEARTBEAT_TIMEOUT', '120'))  # offline after this many seconds
+PRESENCE_AWAY_SECONDS: float = float(os.getenv('PRESENCE_AWAY_SECONDS', str(HEARTBEAT_INTERVAL + 10)))
+PRESENCE_FLUSH_SECONDS: float = float(os.getenv('PRESENCE_FLUSH_SECONDS', '30'))  # last-seen DB batch interval
 CLEANUP_INTERVAL: int = int(os.getenv('CLEANUP_INTERVAL', '60'))
 MAX_CALL_DURATION_HOURS: int = int(os.getenv('MAX_CALL_DURATION_HOURS', '2'))
 DATABASE_URL: Optional[str] = os.getenv('DATABASE_URL')
@@ -50,17 +73,85 @@ DB_PATH: str = os.getenv('DB_PATH', 'production_data.db') if not DATABASE_URL el
 LOG_FILE: str = os.getenv('LOG_FILE', 'production.log')
 LOG_MAX_SIZE_MB: int = int(os.getenv('LOG_MAX_SIZE_MB', '10'))
 LOG_BACKUP_COUNT: int = int(os.getenv('LOG_BACKUP_COUNT', '5'))
+LOG_FORMAT: str = os.getenv('LOG_FORMAT', 'json').lower()  # json | text
+LOG_QUEUE_SIZE: int = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+SIGNAL_LOG_SAMPLE_EVERY: int = int(os.getenv('SIGNAL_LOG_SAMPLE_EVERY', '20'))
+
+# Request body limits (bytes); SDP-carrying routes get the larger cap
+MAX_BODY_BYTES: int = int(os.getenv('MAX_BODY_BYTES', str(16 * 1024)))
+MAX_SIGNAL_BODY_BYTES: int = int(os.getenv('MAX_SIGNAL_BODY_BYTES', str(256 * 1024)))
+BODY_READ_TIMEOUT: int = int(os.getenv('BODY_READ_TIMEOUT', '10'))
+ROUTE_BODY_LIMITS: Dict[str, int] = {
+    '/api/signal': MAX_SIGNAL_BODY_BYTES,
+    '/api/webrtc-offer': MAX_SIGNAL_BODY_BYTES,
+    '/api/webrtc-answer': MAX_SIGNAL_BODY_BYTES,
+}
+
+# Signed stateless admin session tokens (Authorization: Bearer ...) instead of
+# the in-process session table; set ADMIN_TOKEN_SECRET(_FILE) to share across nodes
+ADMIN_SESSION_TOKENS: bool = os.getenv('ADMIN_SESSION_TOKENS', 'false').lower() == 'true'
+
+# Telegram dispatcher: API base (point at a stand-in for tests), worker pool,
+# queue bound, burst coalescing window (seconds), overflow spill file
+TELEGRAM_API_URL: str = os.getenv('TELEGRAM_API_URL', TELEGRAM_API_BASE)
+TELEGRAM_WORKERS: int = int(os.getenv('TELEGRAM_WORKERS', '2'))
+TELEGRAM_QUEUE_SIZE: int = int(os.getenv('TELEGRAM_QUEUE_SIZE', '1000'))
+TELEGRAM_COALESCE_SECONDS: float = float(os.getenv('TELEGRAM_COALESCE_SECONDS', '2'))
+TELEGRAM_SPILL_FILE: str = os.getenv('TELEGRAM_SPILL_FILE', 'telegram_spill.jsonl')
+
+# Generic webhook notifier: target URL, events it receives, HMAC signing secret
+WEBHOOK_URL: Optional[str] = os.getenv('WEBHOOK_URL')
+WEBHOOK_EVENTS: List[str] = [e.strip() for e in os.getenv('WEBHOOK_EVENTS', 'call_waiting').split(',') if e.strip()]
+WEBHOOK_SECRET: Optional[str] = os.getenv('WEBHOOK_SECRET')
+
+# Admin dashboard event stream (SSE): idle ping interval (seconds), per-admin event backlog
+ADMIN_EVENTS_PING_SECONDS: float = float(os.getenv('ADMIN_EVENTS_PING_SECONDS', '15'))
+ADMIN_EVENTS_BACKLOG: int = int(os.getenv('ADMIN_EVENTS_BACKLOG', '256'))
+
+# Call queue: hand waiting calls to connected admins automatically, seconds of
+# waiting one priority level is worth, initial average handle time (seconds),
+# seconds an admin has to accept an assigned call before it is offered again (0 = no limit)
+CALL_AUTO_ASSIGN: bool = os.getenv('CALL_AUTO_ASSIGN', 'true').lower() == 'true'
+CALL_PRIORITY_STEP_SECONDS: float = float(os.getenv('CALL_PRIORITY_STEP_SECONDS', '60'))
+CALL_HANDLE_SECONDS: float = float(os.getenv('CALL_HANDLE_SECONDS', '180'))
+CALL_ASSIGN_TIMEOUT: float = float(os.getenv('CALL_ASSIGN_TIMEOUT', '60'))
+
+# /metrics (OpenMetrics): optional bearer token, render cache window (seconds)
+METRICS_TOKEN: Optional[str] = os.getenv('METRICS_TOKEN')
+METRICS_CACHE_SECONDS: float = float(os.getenv('METRICS_CACHE_SECONDS', '1'))
+
+# Persisted metric rollups: flush interval (seconds)
+METRICS_FLUSH_INTERVAL: float = float(os.getenv('METRICS_FLUSH_INTERVAL', '60'))
+
+# Request tracing: fraction of requests with span timings, ring buffer size,
+# max distinct route labels (further routes are reported as "(other)")
+TRACE_SAMPLE_RATE: float = float(os.getenv('TRACE_SAMPLE_RATE', '0.1'))
+TRACE_BUFFER_SIZE: int = int(os.getenv('TRACE_BUFFER_SIZE', '500'))
+TRACE_MAX_ROUTES: int = int(os.getenv('TRACE_MAX_ROUTES', '200'))
+
+# On-demand sampling profiler (/api/debug/profile): run length, rate, CPU cap
+PROFILER_MAX_SECONDS: float = float(os.getenv('PROFILER_MAX_SECONDS', '30'))
+PROFILER_MAX_HZ: float = float(os.getenv('PROFILER_MAX_HZ', '250'))
+PROFILER_MAX_OVERHEAD: float = float(os.getenv('PROFILER_MAX_OVERHEAD', '0.05'))
+
+# Background host/process sampler: interval (seconds) and ring buffer size
+SYSTEM_SAMPLE_INTERVAL: float = float(os.getenv('SYSTEM_SAMPLE_INTERVAL', '5'))
+SYSTEM_SAMPLE_HISTORY: int = int(os.getenv('SYSTEM_SAMPLE_HISTORY', '720'))
+
+# HTTP/1.1 keep-alive: idle timeout (seconds) and max requests per connection
+KEEPALIVE_TIMEOUT: int = int(os.getenv('KEEPALIVE_TIMEOUT', '15'))
+KEEPALIVE_MAX_REQUESTS: int = int(os.getenv('KEEPALIVE_MAX_REQUESTS', '100'))
 
 # Logging configuration
 def setup_logging() -> logging.Logger:
-    """Production-ready structured logging setup"""
-    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    """Production-ready structured logging setup
     
+    Handlers run on log_config's listener thread; request threads only
+    enqueue records (see log_config.py).
+    """
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(getattr(logging, LOG_LEVEL))
-    console_formatter = logging.Formatter(log_format)
-    console_handler.setFormatter(console_formatter)
     
     # File handler (production)
     if PRODUCTION_MODE:
@@ -73,113 +164,109 @@ def setup_logging() -> logging.Logger:
         )
     else:
         file_handler = logging.FileHandler('app.log', encoding='utf-8')
-    
     file_handler.setLevel(logging.INFO)
-    file_formatter = logging.Formatter(log_format)
-    file_handler.setFormatter(file_formatter)
     
-    # Root logger
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
-    
-    return root_logger
+    return log_config.setup_logging(
+        level=LOG_LEVEL,
+        handlers=[console_handler, file_handler],
+        json_format=LOG_FORMAT == 'json',
+        queue_size=LOG_QUEUE_SIZE,
+        sampled_loggers={'signaling.ice': SIGNAL_LOG_SAMPLE_EVERY, 'signaling.poll': SIGNAL_LOG_SAMPLE_EVERY}
+    )
 
 # Initialize logging
 logger = setup_logging()
+# WebRTC signaling: offers/answers in full, per-candidate and poll logs sampled
+signal_logger = logging.getLogger('signaling')
+ice_logger = logging.getLogger('signaling.ice')
+poll_logger = logging.getLogger('signaling.poll')
 
 # Global server instance for graceful shutdown
 server_instance: Optional[HTTPServer] = None
 
-# Custom exceptions
-class APIError(Exception):
-    """Custom API exception"""
-    def __init__(self, message: str, status_code: int = 400) -> None:
-        self.message = message
-        self.status_code = status_code
-        super().__init__(self.message)
-
-class ValidationError(APIError):
-    """Input validation error"""
-    def __init__(self, message: str) -> None:
-        super().__init__(message, 422)
-
-class RateLimitError(APIError):
-    """Rate limit exceeded error"""
-    def __init__(self, message: str = "Rate limit exceeded") -> None:
-        super().__init__(message, 429)
-
-class AuthenticationError(APIError):
-    """Authentication error"""
-    def __init__(self, message: str = "Authentication required") -> None:
-        super().__init__(message, 401)
+# Per-request IDs, sampled span timings and route-name normalization
+tracer = Tracer(sample_rate=TRACE_SAMPLE_RATE, buffer_size=TRACE_BUFFER_SIZE, max_routes=TRACE_MAX_ROUTES)
+
+# Stack sampler for production hot-path analysis (one run at a time)
+profiler = SamplingProfiler(
+    max_seconds=PROFILER_MAX_SECONDS,
+    max_hz=PROFILER_MAX_HZ,
+    max_overhead=PROFILER_MAX_OVERHEAD
+)
+
+# Host/process stats sampled off the request path (started in __main__)
+system_sampler = SystemSampler(interval=SYSTEM_SAMPLE_INTERVAL, history=SYSTEM_SAMPLE_HISTORY)
+
+# TLS termination (set at startup when HTTPS_ENABLED and certs exist)
+tls_config: Optional[TLSConfig] = None
 
 if not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
     if os.getenv('DEBUG', 'false').lower() == 'true':
-        print('WARNING: TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID not set. Telegram notifications disabled.')
+        logger.warning('TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID not set. Telegram notifications disabled.')
     TELEGRAM_ENABLED = False
 else:
     TELEGRAM_ENABLED = True
 
-def check_rate_limit(client_ip, user_agent=''):
+# Notification backends (started in __main__). Admin OTP codes only go to
+# Telegram; admin panels get call events from the in-process bus.
+admin_events = EventBus(events={'call_waiting'}, max_pending=ADMIN_EVENTS_BACKLOG)
+notifier = NotificationHub([admin_events])
+if TELEGRAM_ENABLED:
+    notifier.register(TelegramNotifier(TelegramDispatcher(
+        TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID,
+        api_base=TELEGRAM_API_URL,
+        workers=TELEGRAM_WORKERS,
+        queue_size=TELEGRAM_QUEUE_SIZE,
+        coalesce_window=TELEGRAM_COALESCE_SECONDS,
+        spill_path=TELEGRAM_SPILL_FILE or None
+    )))
+if WEBHOOK_URL:
+    notifier.register(WebhookNotifier(WEBHOOK_URL, events=WEBHOOK_EVENTS, secret=WEBHOOK_SECRET))
+
+# Waiting calls in priority/arrival order; admins with an open dashboard get
+# calls assigned (lock order: data_lock, then the queue's own lock)
+call_queue = CallQueue(
+    priority_step=CALL_PRIORITY_STEP_SECONDS,
+    handle_seconds=CALL_HANDLE_SECONDS,
+    auto_assign=CALL_AUTO_ASSIGN,
+    assign_timeout=CALL_ASSIGN_TIMEOUT or None,
+    on_wait=record_queue_wait_metrics,
+    on_depth=update_queue_depth_metrics
+)
+
+# Rate-limit bucket ids: keyed BLAKE2b (the per-process key keeps ids
+# unguessable; they are never persisted). Cached per (ip, UA) and per
+# connection, so keep-alive requests skip hashing entirely.
+_FINGERPRINT_KEY = secrets.token_bytes(32)
+
+@lru_cache(maxsize=4096)
+def client_fingerprint(client_ip: str, user_agent: str) -> str:
+    """IP + User-Agent fingerprint (16 hex chars), cached per (ip, UA) pair"""
+    return hashlib.blake2b(f"{client_ip}:{user_agent}".encode(), digest_size=8, key=_FINGERPRINT_KEY).hexdigest()
+
+def check_rate_limit(client_ip, user_agent='', fingerprint=None):
     """Rate limiting kontrolü - IP + User-Agent fingerprint"""
     if not RATE_LIMIT_ENABLED:
         return True
     
-    # IP + User-Agent kombinasyonu ile fingerprint oluştur
-    fingerprint = hashlib.sha256(f"{client_ip}:{user_agent}".encode()).hexdigest()[:16]
+    with span('rate_limit'):
+        if fingerprint is None:
+            fingerprint = client_fingerprint(client_ip, user_agent)
+        allowed = OTPManager.check_rate_limit(fingerprint)
     
-    if not OTPManager.check_rate_limit(fingerprint):
-        logger.warning(f"Rate limit exceeded for fingerprint: {fingerprint}")
+    if not allowed:
+        logger.warning("Rate limit exceeded for fingerprint: %s", fingerprint)
         record_rate_limit_metrics(client_ip)
         raise RateLimitError()
     
     return True
 
-def validate_input(data, required_fields=None, max_length=None):
-    """Input validation (lenient, relies on sanitization)"""
-    if required_fields:
-        for field in required_fields:
-            if field not in data:
-                raise ValidationError(f"Missing required field: {field}")
-
-    if max_length:
-        for field, value in data.items():
-            if isinstance(value, str) and len(value) > max_length.get(field, 1000):
-                raise ValidationError(f"Field {field} too long")
-
-    # Do not reject typical punctuation; sanitization will escape HTML special chars
-    # Only reject raw angle brackets which may indicate attempted HTML/script injection
-    for field, value in data.items():
-        if isinstance(value, str):
-            if '<' in value or '>' in value:
-                raise ValidationError(f"Invalid characters in field {field}")
-
-    return True
-
-def sanitize_input(text):
-    """Input sanitization"""
-    if not isinstance(text, str):
-        return text
-    
-    # HTML entities
-    replacements = {
-        '<': '&lt;',
-        '>': '&gt;',
-        '"': '&quot;',
-        "'": '&#x27;',
-        '&': '&amp;'
-    }
-    
-    for char, replacement in replacements.items():
-        text = text.replace(char, replacement)
-    
-    return text
+# Request bodies are read into a per-thread reusable buffer
+body_reader = BodyReader(deadline_seconds=BODY_READ_TIMEOUT)
 
 # Storage - Single source of truth: Database
 admin_sessions: Dict[str, Dict[str, Any]] = {}
-data_lock: threading.Lock = threading.Lock()
+data_lock: InstrumentedLock = InstrumentedLock('server.data_lock')
 active_calls: Dict[str, Dict[str, Any]] = {}
 call_logs: List[Dict[str, Any]] = []
 
@@ -187,6 +274,41 @@ call_logs: List[Dict[str, Any]] = []
 from database import DatabaseManager
 db_manager = DatabaseManager(DB_PATH)
 
+# OpenMetrics exposition backed by the metrics collector
+metrics_renderer = OpenMetricsRenderer(
+    metrics_collector,
+    db_stats=db_manager.get_pool_stats,
+    cache_seconds=METRICS_CACHE_SECONDS
+)
+
+# Per-minute metric rollups persisted to the database (started in __main__)
+metrics_store = MetricsStore(metrics_collector, db_manager, interval=METRICS_FLUSH_INTERVAL)
+metrics_collector.store = metrics_store
+
+def load_token_secret() -> bytes:
+    """ADMIN_TOKEN_SECRET or ADMIN_TOKEN_SECRET_FILE, else a random per-process secret
+
+    Never kept in the database: anyone who can read it could mint admin tokens.
+    """
+    # Eski sürümler secret'ı settings tablosuna yazıyordu
+    if db_manager.get_setting('admin_token_secret') is not None:
+        db_manager.delete_setting('admin_token_secret')
+    secret = os.getenv('ADMIN_TOKEN_SECRET', '').encode()
+    secret_file = os.getenv('ADMIN_TOKEN_SECRET_FILE')
+    if not secret and secret_file:
+        with open(secret_file, 'rb') as f:
+            secret = f.read().strip()
+    if secret:
+        return secret
+    logger.warning("ADMIN_TOKEN_SECRET / ADMIN_TOKEN_SECRET_FILE not set: using a per-process secret, "
+                   "admin tokens will not survive a restart or be accepted by other nodes")
+    return secrets.token_bytes(32)
+
+session_signer: Optional[SessionTokenSigner] = None
+if ADMIN_SESSION_TOKENS:
+    session_signer = SessionTokenSigner(load_token_secret(), SESSION_TIMEOUT_HOURS * 3600)
+    expiry_scheduler.register('revoked_token', lambda ids, now: session_signer.forget_revoked(ids))
+
 def generate_csrf_token():
     """CSRF token üret"""
     return secrets.token_urlsafe(32)
@@ -200,7 +322,8 @@ def validate_csrf_token(token, session_token):
 def create_secure_session(call_id, ip_address, user_agent):
     """Güvenli session oluştur - CSRF + fingerprint"""
     csrf_token = generate_csrf_token()
-    fingerprint = hashlib.sha256(f"{ip_address}:{user_agent}:{call_id}".encode()).hexdigest()
+    client_fp = client_fingerprint(ip_address, user_agent)
+    fingerprint = hashlib.blake2b(f"{client_fp}:{call_id}".encode(), digest_size=16, key=_FINGERPRINT_KEY).hexdigest()
     
     session_data = {
         'authenticated': True,
@@ -214,38 +337,6 @@ def create_secure_session(call_id, ip_address, user_agent):
     }
     return session_data, csrf_token
 
-def send_telegram(text: str) -> bool:
-    """
-    Send message to Telegram bot.
-    
-    Args:
-        text (str): Message text to send (HTML format supported)
-        
-    Returns:
-        bool: True if message sent successfully, False otherwise
-        
-    Note:
-        Requires TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID environment variables
-    """
-    if not TELEGRAM_ENABLED:
-        return False
-    try:
-        url = f'https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage'
-        data = urlencode({
-            'chat_id': TELEGRAM_CHAT_ID,
-            'text': text,
-            'parse_mode': 'HTML'
-        }).encode()
-        urllib.request.urlopen(url, data=data, timeout=5)
-        return True
-    except Exception as e:
-        logger.error(f"Telegram error: {e}")
-        return False
-
-def send_telegram_async(text):
-    """Asenkron Telegram mesaj"""
-    threading.Thread(target=lambda: send_telegram(text), daemon=True).start()
-
 # OTP functions now use OTPManager
 create_otp = OTPManager.create_otp
 verify_otp = OTPManager.verify_otp
@@ -260,7 +351,7 @@ def log_call_event(call_id: str, event_type: str, customer_name: str = None, dur
         'customer_name': customer_name,
         'duration': duration
     }
-    logger.info(f"Call event: {event_type} - {event_data}")
+    logger.info("Call event: %s - %s", event_type, event_data)
 
 def create_call_log_entry(call_data: dict, status: str, duration: int = None) -> dict:
     """Create standardized call log entry"""
@@ -271,8 +362,72 @@ def create_call_log_entry(call_data: dict, status: str, duration: int = None) ->
         'status': status
     }
 
+def mark_call_stage(call_data: Dict[str, Any], stage: str) -> None:
+    """Mark a lifecycle stage on an active call and record completed setup intervals"""
+    timeline = call_data.get('timeline')
+    if timeline is None:
+        return
+    for interval, duration_ms in timeline.mark(stage):
+        record_call_stage_metrics(interval, duration_ms)
+
+def save_call_timing(call_id: str, call_data: Dict[str, Any], outcome: str) -> None:
+    """Mark the call ended and persist its timeline (call without holding data_lock)"""
+    timeline = call_data.get('timeline')
+    if timeline is None:
+        return
+    mark_call_stage(call_data, 'ended')
+    try:
+        db_manager.save_call_timing(
+            call_id,
+            timeline.created_at,
+            outcome,
+            timeline.interval_ms('time_to_connect'),
+            timeline.interval_ms('offer_to_answer'),
+            json_codec.dumps_str(timeline.to_dict())
+        )
+    except Exception as e:
+        logger.error("Error saving call timing %s: %s", call_id[:8], e)
+
+def update_call_view(call_id: str, call_data: Dict[str, Any], **changes) -> None:
+    """Patch the call's dashboard view and push call_updated (caller holds data_lock)"""
+    view = call_data.get('view')
+    if view is None:
+        return
+    view.update(changes)
+    admin_events.publish('call_updated', dict(view))
+
+def apply_assignments(assignments: List[Tuple[str, Optional[str]]]) -> None:
+    """Reflect call_queue assignments in the dashboard views (caller holds data_lock)"""
+    for call_id, admin_id in assignments:
+        call_data = active_calls.get(call_id)
+        if call_data is not None:
+            update_call_view(call_id, call_data, assigned_to=admin_id)
+        if admin_id is not None and call_queue.assign_timeout and call_queue.awaiting_accept(call_id):
+            expiry_scheduler.schedule('call_assignment', call_id, call_queue.assign_timeout)
+
+def pop_active_call(call_id: str, reason: str) -> Optional[Dict[str, Any]]:
+    """Drop a call from active_calls and the queue, push call_ended (caller holds data_lock)"""
+    active_call = active_calls.pop(call_id, None)
+    if active_call is not None:
+        presence.forget(call_id)
+        admin_events.publish('call_ended', {'call_id': call_id, 'reason': reason})
+        apply_assignments(call_queue.remove(call_id))
+    return active_call
+
+def clear_active_calls(reason: str = 'removed') -> int:
+    """End every active call through pop_active_call; returns how many"""
+    with data_lock:
+        call_ids = list(active_calls)
+        for call_id in call_ids:
+            pop_active_call(call_id, reason)
+    return len(call_ids)
+
 def remove_call_from_active(call_id: str, reason: str = 'unknown') -> bool:
     """Remove call and save to database"""
+    with data_lock:
+        active_call = pop_active_call(call_id, reason)
+    if active_call is not None:
+        save_call_timing(call_id, active_call, reason)
     try:
         # Get call from database
         with db_manager.get_connection() as conn:
@@ -309,53 +464,58 @@ def remove_call_from_active(call_id: str, reason: str = 'unknown') -> bool:
         logger.error(f"Error removing call {call_id}: {e}")
         return False
 
-def get_system_metrics():
-    """Sistem metriklerini al"""
-    try:
-        import psutil
-        return {
-            'cpu_usage': psutil.cpu_percent(interval=1),
-            'memory_usage': psutil.virtual_memory().percent,
-            'disk_usage': psutil.disk_usage('/').percent,
-            'packet_loss': 0.01,  # Simulated
-            'jitter': 25.5,  # Simulated
-            'bitrate': 1500000,  # Simulated
-            'fps': 30  # Simulated
-        }
-    except ImportError:
-        # psutil yoksa simüle edilmiş veriler
-        return {
-            'cpu_usage': 45.2,
-            'memory_usage': 67.8,
-            'disk_usage': 23.1,
-            'packet_loss': 0.01,
-            'jitter': 25.5,
-            'bitrate': 1500000,
-            'fps': 30
-        }
-
-def cleanup_expired():
-    """Suresi dolmus OTP, session ve offline cagrılari temizle"""
-    try:
-        # OTP ve session temizleme (OTPManager kullan)
-        OTPManager.cleanup_expired()
-        
-        # Offline cagrı temizleme
-        with data_lock:
-            current_time = datetime.now()
-            offline_calls = [
-                cid for cid, call in active_calls.items()
-                if 'last_heartbeat' in call and (current_time - call['last_heartbeat']).total_seconds() > 120
-            ]
-            
-            for cid in offline_calls:
-                remove_call_from_active(cid, 'disconnected')
-            
-            if offline_calls:
-                logger.info(f"Cleaned {len(offline_calls)} offline calls")
-                
-    except Exception as e:
-        logger.error(f"Error in cleanup_expired: {str(e)}")
+def on_presence_change(call_id: str, state: str, last_seen: float) -> None:
+    """presence: push away/online to admin panels, close calls that went offline"""
+    if state == OFFLINE:
+        if remove_call_from_active(call_id, 'disconnected'):
+            logger.info("Closed offline call %s (no heartbeat for %ds)", call_id[:8], HEARTBEAT_TIMEOUT)
+        return
+    with data_lock:
+        call_data = active_calls.get(call_id)
+        if call_data is not None:
+            update_call_view(call_id, call_data, presence=state, last_seen=last_seen)
+
+def expire_admin_sessions(call_ids: List[str], now: float) -> Dict[str, float]:
+    """expiry_scheduler: drop admin sessions past their expiry"""
+    current_time = datetime.now()
+    rearm = {}
+    with data_lock:
+        for cid in call_ids:
+            session = admin_sessions.get(cid)
+            if session is None:
+                continue
+            remaining = (session['expires'] - current_time).total_seconds()
+            if remaining > 0:
+                rearm[cid] = remaining
+            else:
+                del admin_sessions[cid]
+    return rearm
+
+def expire_call_assignments(call_ids: List[str], now: float) -> Dict[str, Optional[float]]:
+    """expiry_scheduler: requeue assigned calls the admin did not accept in time"""
+    with data_lock:
+        assignments, rearm = call_queue.expire_assignments(call_ids, now)
+        apply_assignments(assignments)
+    expired = [cid for cid, admin_id in assignments if admin_id is None]
+    if expired:
+        logger.info("Assignment not accepted in %ds, requeued: %s", CALL_ASSIGN_TIMEOUT,
+                    ', '.join(cid[:8] for cid in expired))
+    return rearm
+
+expiry_scheduler.register('admin_session', expire_admin_sessions)
+expiry_scheduler.register('call_assignment', expire_call_assignments)
+
+# Customer heartbeats: recorded without data_lock, checked by a 1 s timer
+# wheel (away after PRESENCE_AWAY_SECONDS, closed after HEARTBEAT_TIMEOUT),
+# last-seen times written to the DB in batches. A call is tracked from its
+# first heartbeat on; calls that never send one are not timed out.
+presence = PresenceTracker(
+    away_after=PRESENCE_AWAY_SECONDS,
+    offline_after=HEARTBEAT_TIMEOUT,
+    flush_interval=PRESENCE_FLUSH_SECONDS,
+    on_change=on_presence_change,
+    persist=db_manager.save_last_seen
+)
 
 def cleanup_old_logs():
     """Clean up old log files in production"""
@@ -402,14 +562,10 @@ def cleanup_loop():
     while True:
         try:
             time.sleep(CLEANUP_INTERVAL)
-            cleanup_expired()
             
             # Update system metrics: active calls and memory usage
-            try:
-                import psutil
-                memory_usage_mb = psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
-            except Exception:
-                memory_usage_mb = 0.0
+            sample = system_sampler.latest() or {}
+            memory_usage_mb = sample.get('rss_mb') or 0.0
             metrics_collector.update_system_metrics(
                 active_calls=len(active_calls),
                 memory_usage_mb=memory_usage_mb
@@ -429,29 +585,101 @@ def signal_handler(signum, frame):
     logger.info(f"Received signal {signum}, initiating graceful shutdown...")
     
     # Cleanup
-    cleanup_expired()
+    expiry_scheduler.stop()
+    presence.stop()
+    metrics_store.stop()
+    OTPManager.stop_persistence()
+    notifier.stop()
     
-    # Close server
+    # Close server. The handler runs on the thread inside serve_forever(),
+    # so shutdown() must be called from another thread or it deadlocks;
+    # serve_forever() then returns and __main__ finishes the shutdown.
     if server_instance:
         logger.info("Shutting down server...")
-        server_instance.shutdown()
-        server_instance.server_close()
+        threading.Thread(target=server_instance.shutdown, daemon=True).start()
+        return
     
     logger.info("Graceful shutdown completed")
     sys.exit(0)
 
+def reload_tls_handler(signum, frame):
+    """SIGHUP: reload TLS certificate without restarting"""
+    if tls_config:
+        tls_config.reload()
+
 # Register signal handlers
 signal.signal(signal.SIGINT, signal_handler)
 signal.signal(signal.SIGTERM, signal_handler)
 
 class Handler(SimpleHTTPRequestHandler):
+    # Persistent connections: every response carries Content-Length, idle
+    # sockets are dropped after KEEPALIVE_TIMEOUT seconds (socket timeout).
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    
+    def setup(self):
+        # TLS handshake happens here, on the worker thread, not in accept()
+        self.tls_failed = False
+        self._fingerprint = None  # (user_agent, fingerprint) for this connection
+        if tls_config is not None:
+            try:
+                self.request = tls_config.wrap(self.request)
+            except (OSError, ssl.SSLError) as e:
+                # wrap() already closed the socket: no rfile/wfile, handle() is a no-op
+                self.tls_failed = True
+                logger.debug("TLS handshake failed from %s: %s", self.client_address[0], e)
+                return
+        super().setup()
+        self.requests_handled = 0
+    
+    def handle(self):
+        if self.tls_failed:
+            return
+        super().handle()
+    
+    def finish(self):
+        if self.tls_failed:
+            return
+        super().finish()
+        if isinstance(self.request, ssl.SSLSocket):
+            # The raw socket was detached by wrap(); close the TLS socket itself
+            self.request.close()
+    
     def log_message(self, format, *args):
         pass  # Sessiz log
     
-    def _record_request_metrics(self, start_time: float, status_code: int = 200) -> None:
-        """Record request metrics"""
+    def _send_connection_headers(self) -> None:
+        """Keep-alive / close headers; caps requests per connection"""
+        self.requests_handled += 1
+        if self.close_connection:
+            # Client asked for close (or send_error already announced it)
+            return
+        if self.requests_handled >= KEEPALIVE_MAX_REQUESTS:
+            self.send_header('Connection', 'close')
+            return
+        remaining = KEEPALIVE_MAX_REQUESTS - self.requests_handled
+        self.send_header('Connection', 'keep-alive')
+        self.send_header('Keep-Alive', f'timeout={KEEPALIVE_TIMEOUT}, max={remaining}')
+    
+    def send_response(self, code, message=None):
+        self.status_code = code
+        super().send_response(code, message)
+    
+    def _start_request(self) -> None:
+        """Assign a request ID (X-Request-ID) and maybe sample span timings"""
+        self.status_code = 200
+        self.streaming = False
+        self.trace = tracer.start(self.command, self.path, self.headers.get('X-Request-ID'))
+    
+    def _record_request_metrics(self, start_time: float) -> None:
+        """Record request metrics under the normalized route name"""
         response_time = (time.time() - start_time) * 1000  # Convert to milliseconds
-        record_request_metrics(self.path, response_time, status_code)
+        trace = tracer.finish(self.status_code)
+        self.trace = None
+        if self.streaming:
+            return  # a stream's lifetime is not a response latency
+        route = trace.route if trace is not None else tracer.routes.route(self.path, self.status_code)
+        record_request_metrics(route, response_time, self.status_code)
     
     def end_headers(self):
         # Security headers
@@ -476,25 +704,35 @@ class Handler(SimpleHTTPRequestHandler):
             self.send_header('Access-Control-Allow-Origin', fallback_origin)
         
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Call-ID')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, X-Call-ID, X-CSRF-Token, Authorization')
         self.send_header('Access-Control-Allow-Credentials', 'true')
         # HTTPS enforcement
         if HTTPS_ENABLED:
             self.send_header('Strict-Transport-Security', 'max-age=31536000; includeSubDomains')
         
         # Performance headers
-        self.send_header('Cache-Control', 'public, max-age=3600')  # 1 hour cache for static files
+        if getattr(self, 'streaming', False):
+            self.send_header('Cache-Control', 'no-cache')
+        else:
+            self.send_header('Cache-Control', 'public, max-age=3600')  # 1 hour cache for static files
         self.send_header('X-Content-Type-Options', 'nosniff')
         
+        trace = getattr(self, 'trace', None)
+        if trace is not None:
+            self.send_header('X-Request-ID', trace.request_id)
+        
+        self._send_connection_headers()
         super().end_headers()
     
     def do_OPTIONS(self):
         # Handle preflight requests
         self.send_response(200)
+        self.send_header('Content-Length', '0')
         self.end_headers()
     
     def do_GET(self):
         start_time = time.time()
+        self._start_request()
         try:
             parsed = urlparse(self.path)
             path = parsed.path
@@ -514,6 +752,8 @@ class Handler(SimpleHTTPRequestHandler):
                 self.serve_file('app' + path)
             elif path.startswith('/static/'):
                 self.serve_file('app' + path)
+            elif path == '/metrics':
+                self.serve_openmetrics()
             elif path == '/healthz':
                 # Alias to API health endpoint for compatibility with docs
                 self.handle_api_get('/api/healthz')
@@ -526,26 +766,48 @@ class Handler(SimpleHTTPRequestHandler):
     
     def do_POST(self):
         start_time = time.time()
+        self._start_request()
         try:
             path = urlparse(self.path).path
             if path.startswith('/api/'):
-                content_length = int(self.headers.get('Content-Length', 0))
-                body = self.rfile.read(content_length).decode('utf-8')
+                try:
+                    with span('read_body'):
+                        body = self._read_body(path)
+                except APIError as e:
+                    # Body left (partly) unread: answer early and drop the connection
+                    self.close_connection = True
+                    logger.warning(f"Rejected POST body on {path}: {e.message}")
+                    self.send_json({'success': False, 'error': e.message}, e.status_code)
+                    return
                 
-                # Safe JSON parsing
+                # Safe JSON parsing (bytes straight into the codec, no str round-trip)
                 try:
-                    data = json.loads(body) if body else {}
-                except json.JSONDecodeError as e:
+                    with span('parse_json'):
+                        data = json_codec.loads(body) if body else {}
+                except ValueError as e:
                     logger.warning(f"Invalid JSON in POST request: {e}")
                     self.send_json({'success': False, 'error': 'Invalid JSON format'})
                     return
                 
                 self.handle_api_post(path, data)
             else:
+                # Body was not consumed; the connection can't be reused
+                self.close_connection = True
                 self.send_error(404)
         finally:
             self._record_request_metrics(start_time)
     
+    def _read_body(self, path: str) -> memoryview:
+        """Read the POST body, enforcing the route limit before reading"""
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            raise APIError("Content-Length required", 411)
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            raise APIError("Invalid Content-Length", 400)
+        limit = ROUTE_BODY_LIMITS.get(path, MAX_BODY_BYTES)
+        return body_reader.read(self.rfile, content_length, limit)
+    
     def serve_file(self, file_path):
         try:
             with open(file_path, 'rb') as f:
@@ -573,8 +835,22 @@ class Handler(SimpleHTTPRequestHandler):
         except FileNotFoundError:
             self.send_error(404)
     
+    def serve_openmetrics(self):
+        """Prometheus/OpenMetrics scrape endpoint"""
+        if METRICS_TOKEN:
+            auth = self.headers.get('Authorization', '')
+            if not secrets.compare_digest(auth, f'Bearer {METRICS_TOKEN}'):
+                self.send_json({'success': False, 'error': 'Unauthorized'}, 401)
+                return
+        content = metrics_renderer.render()
+        self.send_response(200)
+        self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+        self.send_header('Content-Length', len(content))
+        self.end_headers()
+        self.wfile.write(content)
+    
     def handle_api_get(self, path):
-        elif path == '/api/healthz':
+        if path == '/api/healthz':
             # Basic health check
             health_data = {
                 'status': 'ok',
@@ -650,9 +926,16 @@ class Handler(SimpleHTTPRequestHandler):
                 })
         
         elif path == '/api/metrics':
-            # System metrics
-            metrics = get_system_metrics()
-            self.send_json({'success': True, 'metrics': metrics})
+            # System metrics: latest background sample, ?history=N for the ring buffer
+            response = {'success': True, 'metrics': system_sampler.latest()}
+            query = parse_qs(urlparse(self.path).query)
+            if 'history' in query:
+                try:
+                    limit = int(query['history'][0])
+                except ValueError:
+                    limit = SYSTEM_SAMPLE_HISTORY
+                response['history'] = system_sampler.history(limit)
+            self.send_json(response)
         elif path == '/api/ice-servers':
             # Dynamic ICE/TURN config from env
             stun_list = [
@@ -677,7 +960,7 @@ class Handler(SimpleHTTPRequestHandler):
             with data_lock:
                 stats = {
                     'active_calls': len(active_calls),
-                    'queue_count': len([c for c in active_calls.values() if c.get('status') == 'waiting']),
+                    'queue_count': call_queue.waiting_count(),
                     'today_calls': len([c for c in active_calls.values() if c.get('start_time', '').startswith(datetime.now().strftime('%Y-%m-%d'))]),
                     'week_calls': len([c for c in active_calls.values() if c.get('start_time', '').startswith(datetime.now().strftime('%Y-%W'))]),
                     'month_calls': len([c for c in active_calls.values() if c.get('start_time', '').startswith(datetime.now().strftime('%Y-%m'))]),
@@ -767,41 +1050,134 @@ class Handler(SimpleHTTPRequestHandler):
                 else:
                     self.send_json({'success': False, 'error': 'Call not found'})
         
+        elif path == '/api/metrics/history':
+            # Persisted rollups for the dashboard:
+            # ?metric=requests,errors&start=<epoch>&end=<epoch>&resolution=minute|hour|day
+            if not self.require_admin_auth():
+                return
+            query = parse_qs(urlparse(self.path).query)
+            try:
+                end = float(query.get('end', [time.time()])[0])
+                start = float(query.get('start', [end - 86400])[0])
+                resolution = query.get('resolution', [None])[0]
+                if resolution is not None and resolution not in RESOLUTIONS:
+                    raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+                if not (math.isfinite(start) and math.isfinite(end)):
+                    raise ValueError("start and end must be finite epoch seconds")
+                if start >= end:
+                    raise ValueError("start must be before end")
+            except ValueError as e:
+                self.send_json({'success': False, 'error': str(e)}, 400)
+                return
+            names = [n for n in query.get('metric', ['requests'])[0].split(',') if n]
+            self.send_json({'success': True, **metrics_store.query(names, start, end, resolution)})
+        
+        elif path == '/api/debug/slow-requests':
+            # Slowest recent sampled requests with per-stage breakdown (?limit=N)
+            if not self.require_admin_auth():
+                return
+            query = parse_qs(urlparse(self.path).query)
+            try:
+                limit = max(1, min(int(query.get('limit', ['20'])[0]), TRACE_BUFFER_SIZE))
+            except ValueError:
+                limit = 20
+            self.send_json({
+                'success': True,
+                'sample_rate': tracer.sample_rate,
+                'stages': tracer.stage_summary(),
+                'requests': tracer.slowest(limit),
+            })
+        
+        elif path == '/api/debug/slow-calls':
+            # Slowest persisted call setups with their stage timelines (?limit=N)
+            if not self.require_admin_auth():
+                return
+            query = parse_qs(urlparse(self.path).query)
+            try:
+                limit = max(1, min(int(query.get('limit', ['20'])[0]), 500))
+            except ValueError:
+                limit = 20
+            calls = db_manager.get_slow_call_setups(limit)
+            for call in calls:
+                call['timeline'] = json_codec.loads(call['timeline'])
+            self.send_json({
+                'success': True,
+                'call_setup': metrics_collector.get_current_metrics()['call_setup'],
+                'calls': calls,
+            })
+
+        elif path == '/api/debug/notifications':
+            # Per-backend delivery counters and queue depths
+            if not self.require_admin_auth():
+                return
+            self.send_json({'success': True, 'notifiers': notifier.stats()})
+
+        elif path == '/api/queue':
+            # Queue depth, online/busy admins, average handle time, counters
+            if not self.require_admin_auth():
+                return
+            self.send_json({'success': True, 'queue': call_queue.stats()})
+
+        elif path == '/api/debug/profile':
+            # Sample all threads: ?seconds=5&hz=100&format=json|collapsed
+            if not self.require_admin_auth():
+                return
+            query = parse_qs(urlparse(self.path).query)
+            try:
+                seconds = float(query.get('seconds', ['5'])[0])
+                hz = float(query.get('hz', ['100'])[0])
+            except ValueError:
+                self.send_json({'success': False, 'error': 'seconds and hz must be numbers'}, 400)
+                return
+            try:
+                result = profiler.profile(seconds, hz)
+            except ProfilerBusyError as e:
+                self.send_json({'success': False, 'error': str(e)}, 409)
+                return
+            if query.get('format', ['json'])[0] == 'collapsed':
+                content = SamplingProfiler.collapsed(result).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', len(content))
+                self.end_headers()
+                self.wfile.write(content)
+            else:
+                self.send_json({'success': True, 'profile': result, 'locks': lock_stats()})
+        
+        elif path == '/api/debug/locks':
+            if not self.require_admin_auth():
+                return
+            self.send_json({'success': True, 'locks': lock_stats(), 'expiry': expiry_scheduler.stats(),
+                            'presence': presence.stats()})
+        
         elif path == '/api/metrics/export':
             format_type = self.headers.get('X-Format', 'json')
             try:
-                exported = export_metrics(format_type)
+                exported = export_metrics(format_type).encode('utf-8')
                 self.send_response(200)
                 self.send_header('Content-Type', 'application/json' if format_type == 'json' else 'text/csv')
+                self.send_header('Content-Length', len(exported))
                 self.end_headers()
-                self.wfile.write(exported.encode('utf-8'))
+                self.wfile.write(exported)
             except Exception as e:
                 self.send_json({'success': False, 'error': str(e)})
         
         elif path == '/api/active-calls':
-            calls = []
-            for call_id, call_data in active_calls.items():
-                # Parse start_time if it's a string
-                start_time = call_data.get('start_time')
-                if isinstance(start_time, str):
-                    start_time = datetime.fromisoformat(start_time)
-                
-                minutes_ago = int((datetime.now() - start_time).total_seconds() / 60)
-                calls.append({
-                    'call_id': call_id,
-                    'customer_name': call_data['customer_name'],
-                    'customer_peer_id': call_data.get('peer_id'),
-                    'status': call_data['status'],
-                    'formatted_date': start_time.strftime('%d.%m.%Y'),
-                    'formatted_time': start_time.strftime('%H:%M'),
-                    'minutes_ago': minutes_ago
-                })
+            # Views are precomputed at create-call; only minutes_ago is per request
+            with data_lock:
+                calls = with_minutes_ago([c['view'] for c in active_calls.values() if 'view' in c])
             self.send_json({'success': True, 'active_calls': calls})
         
+        elif path == '/api/admin/events':
+            # Dashboard feed: snapshot, then pushed call events (admin_feed)
+            if not self.require_admin_auth():
+                return
+            self.serve_admin_events()
+        
         elif path == '/api/call-logs':
             logs = [{
                 'customer_name': log['customer_name'],
-                'start_time': log['start_time'].isoformat(),
+                'start_time': log['start_time'],
                 'duration': log['duration'],
                 'status': log['status']
             } for log in call_logs]
@@ -811,7 +1187,9 @@ class Handler(SimpleHTTPRequestHandler):
             call_id = self.headers.get('X-Call-ID')
             authenticated = False
             
-            if call_id and call_id in admin_sessions:
+            if session_signer is not None and self.bearer_token():
+                authenticated = self.check_admin_auth()
+            elif call_id and call_id in admin_sessions:
                 session = admin_sessions[call_id]
                 if datetime.now() < session['expires']:
                     authenticated = True
@@ -826,6 +1204,13 @@ class Handler(SimpleHTTPRequestHandler):
     
     def check_admin_auth(self):
         """Admin session kontrolu - gelişmiş güvenlik"""
+        token = self.bearer_token()
+        if token and session_signer is not None:
+            claims = session_signer.verify(token, self.client_address[0], self.headers.get('User-Agent', ''))
+            if claims and not claims['user_agent_match'] and os.getenv('DEBUG', 'false').lower() == 'true':
+                logger.debug("User-Agent mismatch detected")
+            return claims is not None
+        
         call_id = self.headers.get('X-Call-ID')
         if not call_id or call_id not in admin_sessions:
             return False
@@ -843,32 +1228,62 @@ class Handler(SimpleHTTPRequestHandler):
         client_ip = self.client_address[0]
         if session.get('ip_address') != client_ip:
             if os.getenv('DEBUG', 'false').lower() == 'true':
-                print(f"IP mismatch: session={session.get('ip_address')}, client={client_ip}")
+                logger.debug("IP mismatch: session=%s, client=%s", session.get('ip_address'), client_ip)
             return False
         
         # User-Agent kontrolü (opsiyonel)
         user_agent = self.headers.get('User-Agent', '')
         if session.get('user_agent') and session.get('user_agent') != user_agent:
             if os.getenv('DEBUG', 'false').lower() == 'true':
-                print(f"User-Agent mismatch detected")
+                logger.debug("User-Agent mismatch detected")
             # User-Agent değişikliği kritik değil, sadece logla
         
         return True
     
+    def connection_fingerprint(self) -> str:
+        """client_fingerprint, computed once per keep-alive connection"""
+        user_agent = self.headers.get('User-Agent', '')
+        cached = self._fingerprint
+        if cached is None or cached[0] != user_agent:
+            cached = self._fingerprint = (user_agent, client_fingerprint(self.client_address[0], user_agent))
+        return cached[1]
+    
+    def admin_id(self) -> str:
+        """Stable, non-secret handle of the authenticated admin (queue assignment)
+
+        Derived from the session id with the per-process fingerprint key, so it
+        can be shown to other admins without exposing the session credential.
+        """
+        token = self.bearer_token()
+        if token and session_signer is not None:
+            session_key = token.split('.')[1] if token.count('.') == 5 else token
+        else:
+            session_key = self.headers.get('X-Call-ID', '')
+        return hashlib.blake2b(session_key.encode(), digest_size=6, key=_FINGERPRINT_KEY).hexdigest()
+    
+    def bearer_token(self) -> str:
+        auth = self.headers.get('Authorization', '')
+        return auth[7:].strip() if auth.startswith('Bearer ') else ''
+    
+    def require_admin_auth(self) -> bool:
+        """Helper: Ensure admin auth, send unauthorized automatically"""
+        try:
+            if not self.check_admin_auth():
+                self.send_json({'success': False, 'error': 'Unauthorized'})
+                return False
+            return True
+        except Exception:
+            self.send_json({'success': False, 'error': 'Unauthorized'})
+            return False
+    
     def handle_api_post(self, path, data):
         try:
             # Rate limiting kontrolü
-            client_ip = self.client_address[0]
-            user_agent = self.headers.get('User-Agent', '')
-            check_rate_limit(client_ip, user_agent)
-            
-            # Input validation
-            validate_input(data, max_length={'customer_name': 50, 'otp': 6})
+            check_rate_limit(self.client_address[0], fingerprint=self.connection_fingerprint())
             
-            # Sanitize input
-            for key, value in data.items():
-                if isinstance(value, str):
-                    data[key] = sanitize_input(value)
+            # Input validation + sanitization (single pass, per-route schema)
+            with span('validate'):
+                validate_request(path, data)
                     
         except (RateLimitError, ValidationError) as e:
             self.send_json({'success': False, 'error': e.message})
@@ -889,8 +1304,12 @@ class Handler(SimpleHTTPRequestHandler):
                 f"🆔 Session ID: <code>{call_id[:8]}...</code>\n\n"
                 f"⚠ Bu kod 10 dakika geçerlidir."
             )
-            send_telegram_async(message)
-            print(f"OTP created: {call_id[:8]}... -> {otp}")
+            notifier.notify('admin_otp', text=message, urgent=True)
+            if TELEGRAM_ENABLED:
+                logger.info("Admin OTP created: %s...", call_id[:8])
+            else:
+                # No Telegram: the console log is the only way to read the code
+                logger.warning("Admin OTP created (Telegram disabled): %s... -> %s", call_id[:8], otp)
             self.send_json({'success': True, 'callId': call_id})
         
         elif path == '/api/verify-otp':
@@ -913,37 +1332,71 @@ class Handler(SimpleHTTPRequestHandler):
             if success:
                 client_ip = self.client_address[0]
                 user_agent = self.headers.get('User-Agent', '')
-                session_data, csrf_token = create_secure_session(call_id, client_ip, user_agent)
-                
-                with data_lock:
-                    admin_sessions[call_id] = session_data
+                response = {'success': True, 'callId': call_id}
+                if session_signer is not None:
+                    # Stateless: nothing stored, any worker can verify the token
+                    issued = session_signer.issue(client_ip, user_agent)
+                    response['sessionToken'] = issued['token']
+                    response['csrfToken'] = generate_csrf_token()
+                else:
+                    session_data, csrf_token = create_secure_session(call_id, client_ip, user_agent)
+                    with data_lock:
+                        admin_sessions[call_id] = session_data
+                    expiry_scheduler.schedule('admin_session', call_id, SESSION_TIMEOUT_HOURS * 3600)
+                    response['csrfToken'] = csrf_token
                 
                 if os.getenv('DEBUG', 'false').lower() == 'true':
-                    print(f"Admin authenticated: {call_id[:8]} (12 saat gecerli, IP: {client_ip})")
+                    logger.info("Admin authenticated: %s (12 saat gecerli, IP: %s)", call_id[:8], client_ip)
                 
-                self.send_json({'success': True, 'callId': call_id, 'csrfToken': csrf_token})
+                self.send_json(response)
             else:
                 self.send_json({'success': False, 'error': message})
         
+        elif path == '/api/logout':
+            token = self.bearer_token()
+            if token and session_signer is not None:
+                revoked = session_signer.revoke(token)
+                if revoked is not None:
+                    # Keep the revocation only until the token would have expired
+                    expiry_scheduler.schedule('revoked_token', *revoked)
+            else:
+                call_id = self.headers.get('X-Call-ID')
+                with data_lock:
+                    admin_sessions.pop(call_id, None)
+            self.send_json({'success': True})
+        
         elif path == '/api/create-call':
             call_id = secrets.token_urlsafe(16)
             customer_name = data.get('customer_name', 'Misafir')
             
             # Save to database
             db_manager.save_call(call_id, customer_name, status='waiting')
+            now = datetime.now()
+            with data_lock:
+                active_calls[call_id] = {
+                    'customer_name': customer_name,
+                    'status': 'waiting',
+                    'start_time': now.isoformat(),
+                    'timestamp': now,
+                    'admin_connected': False,
+                    'ice_candidates': [],
+                    'timeline': CallTimeline()
+                }
+                view = active_calls[call_id]['view'] = call_view(call_id, active_calls[call_id])
+                apply_assignments(call_queue.enqueue(call_id))
             
-            # Send Telegram notification
-            current_time = datetime.now().strftime('%H:%M:%S')
+            # Notify admins (Telegram, webhook, connected admin panels)
+            admin_url = f"{BASE_URL.rstrip('/')}/admin"
             message = (
                 f"📞 <b>{customer_name}</b> arama sayfasına girdi!\n\n"
                 f"🔥 Sizi arıyor ve bağlantı bekliyor!\n"
-                f"⏰ Giriş Saati: {current_time}\n"
+                f"⏰ Giriş Saati: {now.strftime('%H:%M:%S')}\n"
                 f"🆔 Arama ID: <code>{call_id[:8]}</code>\n\n"
                 f"👨‍💼 Hemen Admin Paneline Git\n"
-                f"http://localhost:8080/admin\n"
+                f"{admin_url}\n"
                 f"⚡ Müşteriyi bekletmeyin!"
             )
-            send_telegram_async(message)
+            notifier.notify('call_waiting', dict(view, admin_url=admin_url), text=message)
             
             # Record metrics
             record_call_metrics('call_started', call_id, customer_name)
@@ -956,13 +1409,19 @@ class Handler(SimpleHTTPRequestHandler):
                 self.send_json({'success': False, 'error': 'Call ID required'})
                 return
             
-            # Update last heartbeat time
-            with data_lock:
-                if call_id in active_calls:
-                    active_calls[call_id]['last_heartbeat'] = datetime.now()
-                    self.send_json({'success': True, 'status': 'alive'})
-                else:
-                    self.send_json({'success': False, 'error': 'Call not found'})
+            # Presence tracker only: no data_lock, no DB write per heartbeat.
+            # Tracking starts with the first heartbeat, so clients that never
+            # send one are not timed out.
+            alive = presence.heartbeat(call_id)
+            if not alive:
+                with data_lock:
+                    if call_id in active_calls:
+                        presence.track(call_id)
+                        alive = True
+            if alive:
+                self.send_json({'success': True, 'status': 'alive', 'interval': HEARTBEAT_INTERVAL})
+            else:
+                self.send_json({'success': False, 'error': 'Call not found'})
         
         elif path == '/api/call-status':
             call_id = data.get('callId', '')
@@ -988,7 +1447,7 @@ class Handler(SimpleHTTPRequestHandler):
             with data_lock:
                 stats = {
                     'active_calls': len(active_calls),
-                    'queue_count': len([c for c in active_calls.values() if c.get('status') == 'waiting']),
+                    'queue_count': call_queue.waiting_count(),
                     'today_calls': len([c for c in active_calls.values() if c.get('start_time', '').startswith(datetime.now().strftime('%Y-%m-%d'))]),
                     'week_calls': len([c for c in active_calls.values() if c.get('start_time', '').startswith(datetime.now().strftime('%Y-%W'))]),
                     'month_calls': len([c for c in active_calls.values() if c.get('start_time', '').startswith(datetime.now().strftime('%Y-%m'))]),
@@ -1020,8 +1479,15 @@ class Handler(SimpleHTTPRequestHandler):
                 self.send_json({'success': False, 'error': 'Call ID required'})
                 return
             
+            admin_id = self.admin_id()
             try:
                 db_manager.update_call_status(call_id, 'connected')
+                with data_lock:
+                    if call_id in active_calls:
+                        active_calls[call_id]['admin_connected'] = True
+                        mark_call_stage(active_calls[call_id], 'accepted')
+                        update_call_view(call_id, active_calls[call_id], admin_connected=True)
+                        apply_assignments([(call_id, admin_id)] + call_queue.claim(call_id, admin_id))
                 self.send_json({'success': True, 'message': 'Call accepted'})
             except Exception as e:
                 logger.error(f"Accept call error: {e}")
@@ -1034,17 +1500,18 @@ class Handler(SimpleHTTPRequestHandler):
                 return
             
             with data_lock:
-                if call_id in active_calls:
-                    call_data = active_calls.pop(call_id)
-                    # Log call end
-                    log_call_event(call_id, 'call_ended', {
-                        'customer_name': call_data.get('customer_name', ''),
-                        'duration': 'unknown',
-                        'admin_connected': call_data.get('admin_connected', False)
-                    })
-                    self.send_json({'success': True, 'message': 'Call ended'})
-                else:
-                    self.send_json({'success': False, 'error': 'Call not found'})
+                call_data = pop_active_call(call_id, 'completed')
+            if call_data is not None:
+                # Log call end
+                log_call_event(call_id, 'call_ended', {
+                    'customer_name': call_data.get('customer_name', ''),
+                    'duration': 'unknown',
+                    'admin_connected': call_data.get('admin_connected', False)
+                })
+                save_call_timing(call_id, call_data, 'completed')
+                self.send_json({'success': True, 'message': 'Call ended'})
+            else:
+                self.send_json({'success': False, 'error': 'Call not found'})
         
         elif path == '/api/webrtc-offer':
             # WebRTC offer exchange
@@ -1059,6 +1526,7 @@ class Handler(SimpleHTTPRequestHandler):
                 if call_id in active_calls:
                     active_calls[call_id]['offer'] = offer
                     active_calls[call_id]['offer_time'] = datetime.now().isoformat()
+                    mark_call_stage(active_calls[call_id], 'offer')
                     self.send_json({'success': True, 'message': 'Offer received'})
                 else:
                     self.send_json({'success': False, 'error': 'Call not found'})
@@ -1076,6 +1544,7 @@ class Handler(SimpleHTTPRequestHandler):
                 if call_id in active_calls:
                     active_calls[call_id]['answer'] = answer
                     active_calls[call_id]['answer_time'] = datetime.now().isoformat()
+                    mark_call_stage(active_calls[call_id], 'answer')
                     self.send_json({'success': True, 'message': 'Answer received'})
                 else:
                     self.send_json({'success': False, 'error': 'Call not found'})
@@ -1094,6 +1563,7 @@ class Handler(SimpleHTTPRequestHandler):
                     if 'ice_candidates' not in active_calls[call_id]:
                         active_calls[call_id]['ice_candidates'] = []
                     active_calls[call_id]['ice_candidates'].append(candidate)
+                    mark_call_stage(active_calls[call_id], 'ice')
                     self.send_json({'success': True, 'message': 'ICE candidate received'})
                 else:
                     self.send_json({'success': False, 'error': 'Call not found'})
@@ -1102,31 +1572,47 @@ class Handler(SimpleHTTPRequestHandler):
             call_id = data.get('callId')
             signal_type = data.get('type')
             
-            if not call_id or call_id not in active_calls:
-                print(f"[SIGNAL] Invalid call: {call_id[:8] if call_id else 'None'}")
+            call_data = active_calls.get(call_id) if call_id else None
+            if call_data is None:
+                signal_logger.warning("Invalid call: %s", call_id[:8] if call_id else 'None')
                 self.send_json({'success': False, 'error': 'Invalid call'})
                 return
             
             if signal_type == 'offer':
-                active_calls[call_id]['offer'] = data.get('offer')
-                active_calls[call_id]['status'] = 'offered'
-                print(f"[SIGNAL] ✅ Offer received from INDEX: {call_id[:8]}")
+                with data_lock:
+                    call_data['offer'] = data.get('offer')
+                    call_data['status'] = 'offered'
+                    mark_call_stage(call_data, 'offer')
+                    update_call_view(call_id, call_data, status='offered')
+                signal_logger.info("Offer received from INDEX: %s", call_id[:8])
                 self.send_json({'success': True})
             
             elif signal_type == 'answer':
-                active_calls[call_id]['answer'] = data.get('answer')
-                active_calls[call_id]['status'] = 'connected'
-                print(f"[SIGNAL] ✅ Answer received from ADMIN: {call_id[:8]}")
+                with data_lock:
+                    call_data['answer'] = data.get('answer')
+                    call_data['status'] = 'connected'
+                    mark_call_stage(call_data, 'answer')
+                    update_call_view(call_id, call_data, status='connected')
+                signal_logger.info("Answer received from ADMIN: %s", call_id[:8])
                 self.send_json({'success': True})
             
             elif signal_type == 'ice':
-                active_calls[call_id]['ice_candidates'].append(data.get('candidate'))
+                with data_lock:
+                    call_data['ice_candidates'].append(data.get('candidate'))
+                    mark_call_stage(call_data, 'ice')
                 candidate_type = data.get('candidate', {}).get('type', 'unknown')
-                print(f"[SIGNAL] ICE candidate ({candidate_type}): {call_id[:8]}")
+                ice_logger.info("ICE candidate (%s): %s", candidate_type, call_id[:8])
+                self.send_json({'success': True})
+            
+            elif signal_type == 'connected':
+                # Peer reports RTCPeerConnection.connectionState == 'connected'
+                with data_lock:
+                    mark_call_stage(call_data, 'connected')
+                signal_logger.info("Peer connected: %s", call_id[:8])
                 self.send_json({'success': True})
             
             else:
-                print(f"[SIGNAL] Unknown signal type: {signal_type}")
+                signal_logger.warning("Unknown signal type: %s", signal_type)
                 self.send_json({'success': False, 'error': 'Unknown signal type'})
         
         elif path == '/api/poll-signal':
@@ -1144,10 +1630,17 @@ class Handler(SimpleHTTPRequestHandler):
                 'ice_candidates': call_data.get('ice_candidates', []),
                 'status': call_data.get('status')
             }
+            if response['status'] == 'waiting':
+                # Place in line and estimated wait for the customer page
+                response['queue'] = call_queue.status(call_id)
             
             # Log only when there's new data
             if response['offer'] or response['answer'] or response['ice_candidates']:
-                print(f"[POLL] Sending to {call_id[:8]}: offer={bool(response['offer'])}, answer={bool(response['answer'])}, ice={len(response['ice_candidates'])}, status={response['status']}")
+                poll_logger.info(
+                    "Sending to %s: offer=%s, answer=%s, ice=%d, status=%s",
+                    call_id[:8], bool(response['offer']), bool(response['answer']),
+                    len(response['ice_candidates']), response['status']
+                )
             
             # ICE adaylarini gonderdikten sonra temizle
             if call_data.get('ice_candidates'):
@@ -1159,8 +1652,12 @@ class Handler(SimpleHTTPRequestHandler):
             if not self.require_admin_auth():
                 return
             call_id = data.get('callId')
-            if call_id in active_calls:
-                active_calls[call_id]['status'] = data.get('status')
+            with data_lock:
+                call_data = active_calls.get(call_id)
+                if call_data is not None:
+                    call_data['status'] = data.get('status')
+                    update_call_view(call_id, call_data, status=call_data['status'])
+            if call_data is not None:
                 self.send_json({'success': True})
             else:
                 self.send_json({'success': False})
@@ -1169,8 +1666,9 @@ class Handler(SimpleHTTPRequestHandler):
             if not self.require_admin_auth():
                 return
             call_id = data.get('call_id')
-            if call_id in active_calls:
-                del active_calls[call_id]
+            with data_lock:
+                removed = pop_active_call(call_id, 'removed')
+            if removed is not None:
                 self.send_json({'success': True})
             else:
                 self.send_json({'success': False})
@@ -1178,15 +1676,15 @@ class Handler(SimpleHTTPRequestHandler):
         elif path == '/api/remove-multiple-activities':
             if not self.require_admin_auth():
                 return
-            for call_id in data.get('call_ids', []):
-                if call_id in active_calls:
-                    del active_calls[call_id]
+            with data_lock:
+                for call_id in data.get('call_ids', []):
+                    pop_active_call(call_id, 'removed')
             self.send_json({'success': True})
         
         elif path == '/api/clear-all-activities':
             if not self.require_admin_auth():
                 return
-            active_calls.clear()
+            clear_active_calls()
             self.send_json({'success': True})
         
         elif path == '/api/clear-history':
@@ -1194,37 +1692,50 @@ class Handler(SimpleHTTPRequestHandler):
                 return
             with data_lock:
                 call_logs.clear()
-            print("Call history cleared")
+            logger.info("Call history cleared")
             self.send_json({'success': True, 'message': 'Gecmis temizlendi'})
         
         elif path == '/api/clear-active-calls':
             if not self.require_admin_auth():
                 return
-            with data_lock:
-                active_calls.clear()
-            print("Active calls cleared")
+            cleared = clear_active_calls()
+            logger.info("Active calls cleared: %d", cleared)
             self.send_json({'success': True, 'message': 'Aktif cagrılar temizlendi'})
         
-        elif path == '/api/heartbeat':
-            call_id = data.get('callId')
-            if call_id in active_calls:
-                active_calls[call_id]['last_heartbeat'] = datetime.now()
-                self.send_json({'success': True})
-            else:
-                self.send_json({'success': False, 'error': 'Call not found'})
-        
         elif path == '/api/hold-call':
             if not self.require_admin_auth():
                 return
             call_id = data.get('callId')
-            if call_id in active_calls:
-                active_calls[call_id]['status'] = 'on_hold'
-                active_calls[call_id]['hold_message'] = 'Admin şuan meşgul'
-                print(f"Call on hold: {call_id[:8]}")
+            with data_lock:
+                call_data = active_calls.get(call_id)
+                if call_data is not None:
+                    call_data['status'] = 'on_hold'
+                    call_data['hold_message'] = 'Admin şuan meşgul'
+                    update_call_view(call_id, call_data, status='on_hold')
+            if call_data is not None:
+                logger.info("Call on hold: %s", call_id[:8])
                 self.send_json({'success': True})
             else:
                 self.send_json({'success': False})
         
+        elif path == '/api/queue/priority':
+            # Move a waiting call up/down; it keeps its original arrival time
+            if not self.require_admin_auth():
+                return
+            call_id = data.get('callId', '')
+            try:
+                priority = max(-10, min(int(data.get('priority', 0)), 10))
+            except (TypeError, ValueError):
+                self.send_json({'success': False, 'error': 'priority must be an integer'}, 400)
+                return
+            with data_lock:
+                call_data = active_calls.get(call_id)
+                moved = call_data is not None and call_queue.reprioritize(call_id, priority)
+                if moved:
+                    call_data['priority'] = priority
+                    update_call_view(call_id, call_data, priority=priority)
+            self.send_json({'success': moved, 'position': call_queue.position(call_id) if moved else None})
+        
         elif path == '/api/close-call':
             if not self.require_admin_auth():
                 return
@@ -1244,19 +1755,73 @@ class Handler(SimpleHTTPRequestHandler):
         else:
             self.send_json({'success': False, 'error': 'Unknown endpoint'})
     
+    def serve_admin_events(self):
+        """text/event-stream until the admin disconnects, logs out or falls behind"""
+        subscription = admin_events.subscribe()
+        admin_id = self.admin_id()
+        try:
+            with data_lock:
+                # Online admins take part in auto-assignment while the stream is open
+                apply_assignments(call_queue.add_admin(admin_id))
+                snapshot = [dict(c['view']) for c in active_calls.values() if 'view' in c]
+            self.streaming = True
+            self.close_connection = True  # no Content-Length: the body ends with the connection
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.send_header('Connection', 'close')
+            self.send_header('X-Accel-Buffering', 'no')
+            self.end_headers()
+
+            def write(frame: bytes) -> None:
+                self.wfile.write(frame)
+                self.wfile.flush()
+
+            sent = stream_events(write, subscription, snapshot,
+                                 ping_interval=ADMIN_EVENTS_PING_SECONDS,
+                                 keep_open=self.check_admin_auth,
+                                 extra={'admin_id': admin_id})
+            logger.debug("Admin event stream closed after %d events", sent)
+        except OSError as e:
+            # BrokenPipe / reset / TLS errors: the browser went away
+            logger.debug("Admin event stream dropped: %s", e)
+        finally:
+            admin_events.unsubscribe(subscription)
+            with data_lock:
+                apply_assignments(call_queue.remove_admin(admin_id))
+    
     def send_json(self, data, status_code: int = 200):
         """Send JSON response with proper headers"""
-        content = json.dumps(data).encode('utf-8')
-        self.send_response(status_code)
-        self.send_header('Content-Type', 'application/json')
-        self.send_header('Content-Length', len(content))
-        self.end_headers()
-        self.wfile.write(content)
+        with span('json_encode'):
+            content = json_codec.dumps(data)
+        with span('write'):
+            self.send_response(status_code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', len(content))
+            self.end_headers()
+            self.wfile.write(content)
 
 if __name__ == '__main__':
     # Start time for uptime calculation
     server_start_time = time.time()
     
+    # Start system sampler (first sample is taken synchronously)
+    system_sampler.start()
+    
+    # Start metric rollup flusher
+    metrics_store.start()
+    
+    # Start expiry timer (OTPs, sessions, rate-limit entries)
+    expiry_scheduler.start()
+    
+    # Start presence wheel (missed heartbeats, batched last-seen writes)
+    presence.start()
+    
+    # Restore unexpired OTPs and start their async DB writer
+    OTPManager.init_persistence(db_manager)
+    
+    # Start notification backends (Telegram replays messages spilled by the last run)
+    notifier.start()
+    
     # Start cleanup thread
     cleanup_thread = threading.Thread(target=cleanup_loop, daemon=True)
     cleanup_thread.start()
@@ -1267,17 +1832,16 @@ if __name__ == '__main__':
     HOST = os.getenv('HOST', '0.0.0.0')
     
     try:
-        server_instance = HTTPServer((HOST, PORT), Handler)
+        # Thread per connection so idle keep-alive sockets don't block others
+        server_instance = ThreadingHTTPServer((HOST, PORT), Handler)
         
         # HTTPS configuration (if enabled)
         if HTTPS_ENABLED:
-            cert_file = os.getenv('CERT_FILE')
-            key_file = os.getenv('KEY_FILE')
-            if cert_file and key_file and os.path.exists(cert_file) and os.path.exists(key_file):
-                context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
-                context.load_cert_chain(certfile=cert_file, keyfile=key_file)
-                server_instance.socket = context.wrap_socket(server_instance.socket, server_side=True)
-                logger.info(f"HTTPS enabled with cert: {cert_file}")
+            tls_config = load_tls_config_from_env()
+            if tls_config:
+                if hasattr(signal, 'SIGHUP'):
+                    signal.signal(signal.SIGHUP, reload_tls_handler)
+                logger.info(f"HTTPS enabled with cert: {tls_config.cert_file} (TLS 1.2+, SIGHUP reloads)")
             else:
                 logger.warning("HTTPS_ENABLED=true ancak CERT_FILE/KEY_FILE bulunamadı veya erişilemedi. HTTP olarak devam ediliyor.")
         
@@ -1296,6 +1860,7 @@ Dashboard: {BASE_URL}/dashboard
 - Telegram Bildirim: {'Aktif' if TELEGRAM_ENABLED else 'Devre Disi'}
 - Otomatik Temizlik: Her {CLEANUP_INTERVAL} saniye
 - Rate Limiting: {'Aktif' if RATE_LIMIT_ENABLED else 'Devre Disi'} ({RATE_LIMIT_CALLS}/{RATE_LIMIT_PERIOD}s)
+- Keep-Alive: HTTP/1.1, {KEEPALIVE_TIMEOUT}s bosta, {KEEPALIVE_MAX_REQUESTS} istek/baglanti
 - Logging: {LOG_LEVEL} level
 - Database: {'Postgres' if DATABASE_URL else DB_PATH}
 - Max Call Duration: {MAX_CALL_DURATION_HOURS} saat
@@ -1304,6 +1869,7 @@ Dashboard: {BASE_URL}/dashboard
 ''')
     
         server_instance.serve_forever()
+        server_instance.server_close()
         
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt")
@@ -1318,14 +1884,3 @@ Dashboard: {BASE_URL}/dashboard
             logger.info(f"- Aktif Session: {len(admin_sessions)}")
             logger.info(f"- Aktif Arama: {len(active_calls)}")
         logger.info("Gule gule!")
-
-    def require_admin_auth(self) -> bool:
-        """Helper: Ensure admin auth, send unauthorized automatically"""
-        try:
-            if not self.check_admin_auth():
-                self.send_json({'success': False, 'error': 'Unauthorized'})
-                return False
-            return True
-        except Exception:
-            self.send_json({'success': False, 'error': 'Unauthorized'})
-            return False
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stateless admin session tokens - verified with a MAC instead of a lookup
+
+    v1.<session_id>.<expires>.<ip_fp>.<ua_fp>.<mac>
+
+mac is HMAC-SHA256 over everything before it; ip_fp/ua_fp are keyed
+BLAKE2b digests of the client IP and User-Agent, so the token binds the
+client without carrying either in clear. Every worker or node holding the
+same secret verifies a token without shared state. Logout puts the session
+id on a small revocation list that only needs to live until the token's
+own expiry.
+"""
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+VERSION = 'v1'
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+class SessionTokenSigner:
+    """Issues and verifies signed admin session tokens"""
+
+    def __init__(self, secret: bytes, ttl_seconds: int):
+        if len(secret) < 16:
+            raise ValueError("Session token secret must be at least 16 bytes")
+        self.ttl_seconds = ttl_seconds
+        self._mac_key = hashlib.sha256(b'session-mac:' + secret).digest()
+        self._fp_key = hashlib.sha256(b'session-fp:' + secret).digest()
+        self._revoked: Dict[str, float] = {}  # session_id -> token expiry (epoch)
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, value: str) -> str:
+        return _b64(hashlib.blake2b(value.encode(), digest_size=8, key=self._fp_key).digest())
+
+    def _mac(self, body: str) -> str:
+        return _b64(hmac.digest(self._mac_key, body.encode(), 'sha256'))
+
+    def issue(self, ip_address: str, user_agent: str = '', now: Optional[float] = None) -> Dict[str, Any]:
+        """New token: {'token', 'session_id', 'expires'}"""
+        now = time.time() if now is None else now
+        session_id = secrets.token_urlsafe(12)
+        expires = int(now) + self.ttl_seconds
+        body = '.'.join((VERSION, session_id, str(expires),
+                         self._fingerprint(ip_address), self._fingerprint(user_agent)))
+        return {'token': f'{body}.{self._mac(body)}', 'session_id': session_id, 'expires': expires}
+
+    def verify(self, token: str, ip_address: str, user_agent: str = '',
+               now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Claims of a valid token, or None (bad MAC, expired, other IP, revoked)
+
+        User-Agent changes do not invalidate the token (same policy as table
+        sessions); `user_agent_match` reports them.
+        """
+        parts = token.split('.') if token else ()
+        if len(parts) != 6 or parts[0] != VERSION:
+            return None
+        body, mac = token.rsplit('.', 1)
+        if not hmac.compare_digest(mac, self._mac(body)):
+            return None
+        _, session_id, expires, ip_fp, ua_fp = parts[:5]
+        try:
+            expires_at = int(expires)
+        except ValueError:
+            return None
+        if (time.time() if now is None else now) >= expires_at:
+            return None
+        if not hmac.compare_digest(ip_fp, self._fingerprint(ip_address)):
+            return None
+        if session_id in self._revoked:
+            return None
+        return {
+            'session_id': session_id,
+            'expires': expires_at,
+            'user_agent_match': hmac.compare_digest(ua_fp, self._fingerprint(user_agent)),
+        }
+
+    def revoke(self, token: str) -> Optional[Tuple[str, float]]:
+        """Revoke a well-signed token; returns (session_id, seconds until its expiry)"""
+        parts = token.split('.') if token else ()
+        if len(parts) != 6 or not hmac.compare_digest(parts[5], self._mac(token.rsplit('.', 1)[0])):
+            return None
+        try:
+            expires_at = int(parts[2])
+        except ValueError:
+            return None
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            return None
+        with self._lock:
+            self._revoked[parts[1]] = expires_at
+        return parts[1], remaining
+
+    def forget_revoked(self, session_ids: List[str], now: Optional[float] = None) -> Dict[str, float]:
+        """Drop revocations whose tokens have expired anyway (expiry_scheduler callback)"""
+        now = time.time() if now is None else now
+        rearm = {}
+        with self._lock:
+            for session_id in session_ids:
+                expires_at = self._revoked.get(session_id)
+                if expires_at is None:
+                    continue
+                if expires_at > now:
+                    rearm[session_id] = expires_at - now
+                else:
+                    del self._revoked[session_id]
+        return rearm
+
+    def revoked_count(self) -> int:
+        return len(self._revoked)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Background system/process sampler
+
+A daemon thread samples CPU, memory, fd/thread counts and GC stats every
+`interval` seconds into a ring buffer. Request handlers only read the latest
+snapshot, so /api/metrics never blocks on psutil.cpu_percent(interval=...).
+"""
+import gc
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_PROCESS_START = time.time()
+
+
+def process_stats() -> Dict[str, float]:
+    """CPU/memory/fd/thread stats for this process (psutil if installed)"""
+    stats: Dict[str, float] = {
+        'start_time_seconds': _PROCESS_START,
+        'threads': threading.active_count(),
+    }
+    if psutil is not None:
+        try:
+            proc = psutil.Process(os.getpid())
+            cpu = proc.cpu_times()
+            stats['cpu_seconds'] = cpu.user + cpu.system
+            stats['resident_memory_bytes'] = proc.memory_info().rss
+            stats['threads'] = proc.num_threads()
+            stats['start_time_seconds'] = proc.create_time()
+            if hasattr(proc, 'num_fds'):
+                stats['open_fds'] = proc.num_fds()
+            return stats
+        except Exception:
+            pass
+
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        stats['cpu_seconds'] = usage.ru_utime + usage.ru_stime
+    except Exception:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            stats['resident_memory_bytes'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        stats['open_fds'] = len(os.listdir('/proc/self/fd'))
+    except Exception:
+        pass
+    return stats
+
+
+class SystemSampler:
+    """Samples host/process stats on a fixed interval into a ring buffer"""
+
+    def __init__(self, interval: float = 5.0, history: int = 720):
+        self.interval = interval
+        self._history: deque = deque(maxlen=history)
+        self._latest: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_cpu_seconds: Optional[float] = None
+        self._last_sample_time: Optional[float] = None
+        if psutil is not None:
+            # Prime the non-blocking counters; the first call always returns 0.0
+            psutil.cpu_percent(interval=None)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.sample_once()
+        self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample_once()
+            except Exception as e:
+                logger.error(f"System sampler error: {e}")
+
+    def sample_once(self) -> Dict[str, Any]:
+        """Take one sample and append it to the ring buffer"""
+        now = time.monotonic()
+        proc = process_stats()
+
+        # Process CPU% from cpu-time delta over wall-time delta (never blocks)
+        process_cpu = None
+        cpu_seconds = proc.get('cpu_seconds')
+        if cpu_seconds is not None and self._last_cpu_seconds is not None:
+            elapsed = now - self._last_sample_time
+            if elapsed > 0:
+                process_cpu = round((cpu_seconds - self._last_cpu_seconds) / elapsed * 100, 2)
+        self._last_cpu_seconds = cpu_seconds
+        self._last_sample_time = now
+
+        gc_stats = gc.get_stats()
+        snapshot: Dict[str, Any] = {
+            'timestamp': datetime.now().isoformat(),
+            'cpu_usage': None,
+            'memory_usage': None,
+            'disk_usage': None,
+            'process_cpu_percent': process_cpu,
+            'rss_mb': round(proc['resident_memory_bytes'] / (1024 * 1024), 2)
+            if 'resident_memory_bytes' in proc else None,
+            'open_fds': proc.get('open_fds'),
+            'threads': proc['threads'],
+            'gc': {
+                'counts': list(gc.get_count()),
+                'collections': [g['collections'] for g in gc_stats],
+                'collected': [g['collected'] for g in gc_stats],
+                'uncollectable': [g['uncollectable'] for g in gc_stats],
+            },
+        }
+        if psutil is not None:
+            try:
+                snapshot['cpu_usage'] = psutil.cpu_percent(interval=None)
+                snapshot['memory_usage'] = psutil.virtual_memory().percent
+                snapshot['disk_usage'] = psutil.disk_usage('/').percent
+            except Exception:
+                pass
+
+        self._history.append(snapshot)
+        self._latest = snapshot
+        return snapshot
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent snapshot (no I/O, safe on the request path)"""
+        return self._latest
+
+    def history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Up to `limit` most recent snapshots, oldest first"""
+        samples = list(self._history)
+        if limit is not None:
+            samples = samples[-limit:] if limit > 0 else []
+        return samples
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram notification dispatcher - bounded queue, worker pool, keep-alive
+
+Request threads call send() which only enqueues. A few worker threads each
+hold one persistent HTTPS connection to the Bot API and:
+
+- coalesce bursts: when more notifications are already waiting, a worker
+  lingers up to `coalesce_window` and sends one digest message instead of N
+  (urgent messages such as OTPs are never merged or delayed);
+- pace sends to `min_interval` per chat and honour 429 retry_after, with
+  exponential backoff on 5xx and network errors;
+- spill to a JSON-lines file when the queue is full or retries run out;
+  spilled messages are replayed on the next start(). Urgent messages are
+  never spilled (an OTP alert holds a plaintext code and is stale by the
+  next start), nor are messages Telegram rejected with a 4xx (they would
+  fail again on every replay); both are dropped and counted.
+
+`api_base` may point at a local stand-in server (http://) for tests.
+"""
+import http.client
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_BASE = 'https://api.telegram.org'
+MAX_MESSAGE_CHARS = 4096
+DIGEST_SEPARATOR = '\n\n────────\n\n'
+
+_STOP = object()
+
+# _post outcomes
+SENT, REJECTED, FAILED = 'sent', 'rejected', 'failed'
+
+
+class _Message:
+    __slots__ = ('text', 'coalesce')
+
+    def __init__(self, text: str, coalesce: bool):
+        self.text = text
+        self.coalesce = coalesce
+
+
+class TelegramDispatcher:
+    """Queued, pooled sender for Bot API sendMessage"""
+
+    def __init__(self, token: str, chat_id: str, api_base: str = TELEGRAM_API_BASE,
+                 workers: int = 2, queue_size: int = 1000, coalesce_window: float = 2.0,
+                 max_batch: int = 20, min_interval: float = 1.0, max_retries: int = 5,
+                 timeout: float = 5.0, spill_path: Optional[str] = None):
+        self.token = token
+        self.chat_id = chat_id
+        self.workers = max(1, workers)
+        self.coalesce_window = coalesce_window
+        self.max_batch = max(1, max_batch)
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.spill_path = spill_path
+        parts = urlsplit(api_base)
+        self._scheme, self._host = parts.scheme, parts.netloc
+        self._path = f'{parts.path.rstrip("/")}/bot{token}/sendMessage'
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._threads: List[threading.Thread] = []
+        self._local = threading.local()
+        self._stopping = threading.Event()
+        self._slot_lock = threading.Lock()
+        self._next_slot = 0.0
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, int] = {
+            'queued': 0, 'sent': 0, 'messages_delivered': 0, 'coalesced': 0,
+            'retries': 0, 'failed': 0, 'rejected': 0, 'dropped': 0, 'dropped_urgent': 0,
+            'spilled': 0, 'replayed': 0,
+        }
+
+    # -- producer side -------------------------------------------------
+
+    def send(self, text: str, coalesce: bool = True) -> bool:
+        """Enqueue a message (never blocks); False if it was spilled or dropped"""
+        message = _Message(text, coalesce)
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self._overflow([message])
+            return False
+        self._count('queued')
+        return True
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stopping.clear()
+        self._replay_spill()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'telegram-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop workers; messages still queued afterwards are spilled"""
+        self._stopping.set()
+        for _ in self._threads:
+            try:
+                self._queue.put(_STOP, timeout=0.1)
+            except queue.Full:
+                pass
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._overflow(leftover)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    # -- workers -------------------------------------------------------
+
+    def _run(self) -> None:
+        try:
+            while True:
+                first = self._queue.get()
+                if first is _STOP:
+                    return
+                if not first.coalesce:
+                    self._deliver([first])
+                    continue
+                batch, stop_seen = self._collect(first)
+                self._deliver(batch)
+                if stop_seen:
+                    return
+        finally:
+            self._close_connection()
+
+    def _collect(self, first: _Message) -> Tuple[List[_Message], bool]:
+        """Gather queued coalescable messages while waiting for the send slot"""
+        batch = [first]
+        now = time.monotonic()
+        slot_at = now + self._reserve_slot()
+        # Only linger when a burst is in progress; a lone message goes out at its slot
+        deadline = max(slot_at, now + self.coalesce_window if self._queue.qsize() else now)
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            if item.coalesce:
+                batch.append(item)
+            else:
+                self._deliver([item])
+        if not self._stopping.is_set():
+            self._stopping.wait(max(0.0, slot_at - time.monotonic()))
+        return batch, False
+
+    def _reserve_slot(self) -> float:
+        """Seconds until this worker may send (per-chat pacing shared by workers)"""
+        with self._slot_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+            return slot - now
+
+    def _deliver(self, batch: List[_Message]) -> None:
+        if len(batch) > 1:
+            self._count('coalesced', len(batch) - 1)
+        for text, members in self._digests(batch):
+            outcome = self._post(text)
+            if outcome == SENT:
+                self._count('sent')
+                self._count('messages_delivered', len(members))
+            elif outcome == REJECTED:
+                self._count('rejected', len(members))
+            else:
+                self._count('failed')
+                self._overflow(members)
+
+    def _digests(self, batch: List[_Message]) -> List[Tuple[str, List[_Message]]]:
+        """One text per batch, split so each stays under Telegram's length limit"""
+        if len(batch) == 1:
+            return [(batch[0].text[:MAX_MESSAGE_CHARS], batch)]
+        out: List[Tuple[str, List[_Message]]] = []
+        group: List[_Message] = []
+        size = 0
+        for message in batch:
+            extra = len(message.text) + len(DIGEST_SEPARATOR)
+            if group and size + extra > MAX_MESSAGE_CHARS - 64:
+                out.append(group)
+                group, size = [], 0
+            group.append(message)
+            size += extra
+        out.append(group)
+        return [
+            (self._digest_text(group) if len(group) > 1 else group[0].text[:MAX_MESSAGE_CHARS], group)
+            for group in out
+        ]
+
+    @staticmethod
+    def _digest_text(group: List[_Message]) -> str:
+        header = f'🔔 <b>{len(group)} bildirim</b>\n\n'
+        return (header + DIGEST_SEPARATOR.join(m.text for m in group))[:MAX_MESSAGE_CHARS]
+
+    # -- HTTP ----------------------------------------------------------
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self._scheme == 'https':
+                conn = http.client.HTTPSConnection(self._host, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(self._host, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _close_connection(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _request(self, text: str) -> Tuple[int, Dict[str, Any]]:
+        body = urlencode({'chat_id': self.chat_id, 'text': text, 'parse_mode': 'HTML'})
+        conn = self._connection()
+        conn.request('POST', self._path, body=body,
+                     headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        response = conn.getresponse()
+        raw = response.read()
+        if response.will_close:
+            self._close_connection()
+        try:
+            payload = json.loads(raw) if raw else {}
+        except ValueError:
+            payload = {}
+        return response.status, payload if isinstance(payload, dict) else {}
+
+    def _post(self, text: str) -> str:
+        """SENT, REJECTED (4xx, never worth retrying) or FAILED (retries exhausted)"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                status, payload = self._request(text)
+            except (OSError, http.client.HTTPException) as e:
+                self._close_connection()
+                logger.warning("Telegram request failed (attempt %d): %s", attempt + 1, e)
+                delay = self._backoff(attempt)
+            else:
+                if status == 200:
+                    return SENT
+                if status == 429:
+                    retry_after = (payload.get('parameters') or {}).get('retry_after')
+                    delay = float(retry_after) if retry_after else self._backoff(attempt)
+                    logger.warning("Telegram rate limited, retrying in %.1fs", delay)
+                    self._push_slot(delay)
+                elif status >= 500:
+                    delay = self._backoff(attempt)
+                else:
+                    # 4xx: the request itself is wrong (bad token/chat/markup); retrying won't help
+                    logger.error("Telegram rejected message: %s %s", status, payload.get('description', ''))
+                    return REJECTED
+            if attempt == self.max_retries or self._stopping.wait(delay):
+                break
+            self._count('retries')
+        return FAILED
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(30.0, 0.5 * (2 ** attempt))
+
+    def _push_slot(self, delay: float) -> None:
+        with self._slot_lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + delay)
+
+    # -- overflow ------------------------------------------------------
+
+    def _overflow(self, messages: List[_Message]) -> None:
+        urgent = sum(1 for m in messages if not m.coalesce)
+        if urgent:
+            # OTP alerts carry the plaintext code: never to disk, never replayed
+            self._count('dropped_urgent', urgent)
+            logger.warning("Telegram: %d urgent message(s) dropped, not spilled", urgent)
+            messages = [m for m in messages if m.coalesce]
+            if not messages:
+                return
+        if not self.spill_path:
+            self._count('dropped', len(messages))
+            logger.warning("Telegram queue overflow: %d message(s) dropped", len(messages))
+            return
+        try:
+            with self._spill_lock, open(self.spill_path, 'a', encoding='utf-8') as f:
+                for message in messages:
+                    f.write(json.dumps({'text': message.text, 'coalesce': message.coalesce}, ensure_ascii=False) + '\n')
+            self._count('spilled', len(messages))
+        except OSError as e:
+            self._count('dropped', len(messages))
+            logger.error("Telegram spill failed, %d message(s) dropped: %s", len(messages), e)
+
+    def _replay_spill(self) -> None:
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, encoding='utf-8') as f:
+                    lines = f.readlines()
+                os.remove(self.spill_path)
+            except OSError as e:
+                logger.error("Telegram spill replay failed: %s", e)
+                return
+        messages = []
+        for line in lines:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            if not item.get('coalesce', True):
+                # Urgent entry written by an older version: stale, may hold an OTP
+                self._count('dropped_urgent')
+                continue
+            messages.append(_Message(str(item.get('text', '')), True))
+        replayed = 0
+        for message in messages:
+            try:
+                self._queue.put_nowait(message)
+            except queue.Full:
+                break
+            replayed += 1
+        if replayed < len(messages):
+            # Whatever does not fit goes back to disk for the next start
+            self._overflow(messages[replayed:])
+        if replayed:
+            self._count('replayed', replayed)
+            logger.info("Replayed %d spilled Telegram message(s)", replayed)
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += n
@@ -0,0 +1,52 @@
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # module import creates the SQLite DB in cwd
+    server_v2 = importlib.import_module('server_v2')
+    yield server_v2
+    server_v2.clear_active_calls()
+
+
+def add_calls(server, *call_ids):
+    with server.data_lock:
+        for call_id in call_ids:
+            server.active_calls[call_id] = {'customer_name': call_id, 'status': 'waiting'}
+
+
+def test_clear_active_calls_publishes_call_ended(server):
+    add_calls(server, 'c1', 'c2')
+    subscription = server.admin_events.subscribe()
+    try:
+        assert server.clear_active_calls() == 2
+        events = iter(lambda: subscription.get(timeout=0.1), None)
+        ended = sorted(data['call_id'] for _, event, data in events if event == 'call_ended')
+    finally:
+        server.admin_events.unsubscribe(subscription)
+    assert server.active_calls == {}
+    assert ended == ['c1', 'c2']
+
+
+def test_cleared_calls_leave_the_queue(server):
+    add_calls(server, 'c1', 'c2')
+    with server.data_lock:
+        for call_id in ('c1', 'c2'):
+            server.apply_assignments(server.call_queue.enqueue(call_id))
+    assert server.call_queue.waiting_count() == 2
+
+    server.clear_active_calls()
+    assert server.call_queue.waiting_count() == 0 and len(server.call_queue) == 0
+    assert server.call_queue.position('c1') is None
+
+
+def test_cleared_calls_are_forgotten_by_presence(server):
+    add_calls(server, 'c1', 'c2')
+    for call_id in ('c1', 'c2'):
+        server.presence.track(call_id)
+
+    server.clear_active_calls()
+    assert server.presence.state('c1') is None and server.presence.state('c2') is None
+    assert server.presence.heartbeat('c1') is False
@@ -0,0 +1,64 @@
+import threading
+from datetime import datetime
+
+import json_codec
+from admin_feed import call_view, format_sse, stream_events, with_minutes_ago
+from notifier import EventBus
+
+
+def parse_frames(chunks):
+    frames = []
+    for frame in b''.join(chunks).decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in frame.split('\n') if ': ' in line)
+        if 'event' in fields:
+            frames.append((fields['event'], json_codec.loads(fields['data'])))
+    return frames
+
+
+def test_call_view_is_precomputed_once():
+    started = datetime(2024, 5, 1, 14, 30)
+    view = call_view('c1', {'customer_name': 'Ayşe', 'status': 'waiting', 'timestamp': started})
+    assert view['formatted_date'] == '01.05.2024' and view['formatted_time'] == '14:30'
+    assert view['start_ts'] == started.timestamp()
+
+    (listed,) = with_minutes_ago([view], now=started.timestamp() + 185)
+    assert listed['minutes_ago'] == 3
+    assert 'minutes_ago' not in view
+
+
+def test_format_sse_frame():
+    frame = format_sse('call_ended', {'call_id': 'c1'}, seq=7)
+    assert frame == b'id: 7\nevent: call_ended\ndata: {"call_id":"c1"}\n\n'
+
+
+def test_stream_sends_snapshot_then_events_until_closed():
+    bus = EventBus()
+    subscription = bus.subscribe()
+    chunks = []
+    snapshot = [{'call_id': 'c1', 'status': 'waiting'}]
+
+    thread = threading.Thread(target=stream_events, args=(chunks.append, subscription, snapshot),
+                              kwargs={'ping_interval': 0.05})
+    thread.start()
+    bus.publish('call_updated', {'call_id': 'c1', 'status': 'connected'})
+    bus.publish('call_ended', {'call_id': 'c1', 'reason': 'completed'})
+    bus.unsubscribe(subscription)
+    thread.join(2)
+    assert not thread.is_alive()
+
+    frames = parse_frames(chunks)
+    assert frames[0] == ('snapshot', {'calls': snapshot, 'server_time': frames[0][1]['server_time']})
+    assert [f[0] for f in frames[1:]] == ['call_updated', 'call_ended']
+    assert chunks[0].startswith(b'retry: ')
+
+
+def test_stream_pings_and_stops_when_session_expires():
+    bus = EventBus()
+    subscription = bus.subscribe()
+    chunks = []
+    checks = iter([True, False])
+
+    sent = stream_events(chunks.append, subscription, [], ping_interval=0.01, keep_open=lambda: next(checks))
+    assert sent == 0
+    assert b': ping\n\n' in chunks
+    assert parse_frames(chunks)[-1][0] == 'session_expired'
@@ -0,0 +1,96 @@
+from call_queue import CallQueue
+
+
+def test_priority_orders_but_old_calls_are_not_starved():
+    queue = CallQueue(priority_step=60, auto_assign=False)
+    queue.enqueue('old-low', priority=0, now=0)
+    queue.enqueue('new-high', priority=1, now=30)   # key -30: ahead of old-low (0)
+    queue.enqueue('newer-high', priority=1, now=90)  # key 30: old-low has waited longer
+
+    assert [queue.position(c) for c in ('new-high', 'old-low', 'newer-high')] == [1, 2, 3]
+
+    assert queue.reprioritize('newer-high', 3)  # key 90 - 180 = -90
+    assert queue.position('newer-high') == 1
+    assert queue.position('unknown') is None
+
+
+def test_auto_assignment_goes_to_longest_idle_admin():
+    waits = []
+    queue = CallQueue(on_wait=lambda outcome, ms: waits.append((outcome, ms)))
+    assert queue.add_admin('alice', now=0) == []
+    queue.add_admin('bob', now=1)
+
+    assert queue.enqueue('c1', now=10) == [('c1', 'alice')]
+    assert queue.enqueue('c2', now=11) == [('c2', 'bob')]
+    assert queue.enqueue('c3', now=12) == []
+    assert queue.position('c3') == 1
+
+    # alice finishes: the next waiting call is hers, her handle time feeds the estimate
+    queue.claim('c1', 'alice', now=15)
+    assert queue.remove('c1', now=75) == [('c3', 'alice')]
+    assert queue.handle_seconds < 180
+    assert ('assigned', 0.0) in waits and ('assigned', 63000.0) in waits
+
+
+def test_unaccepted_assignment_is_requeued_when_admin_leaves():
+    queue = CallQueue()
+    queue.enqueue('first', now=0)
+    queue.enqueue('second', now=5)
+    assert queue.add_admin('alice', now=10) == [('first', 'alice')]
+    assert queue.position('second') == 1
+
+    # Two dashboards open: closing one keeps alice online
+    queue.add_admin('alice', now=11)
+    assert queue.remove_admin('alice', now=12) == []
+    assert queue.remove_admin('alice', now=13) == [('first', None)]
+    assert [queue.position('first'), queue.position('second')] == [1, 2]
+    assert queue.counters['requeued'] == 1
+
+
+def test_manual_claim_frees_the_assigned_admin():
+    queue = CallQueue()
+    queue.add_admin('alice', now=0)
+    queue.enqueue('c1', now=1)
+    queue.enqueue('c2', now=2)
+    assert queue.assigned_to('c1') == 'alice'
+
+    # bob (no dashboard open) answers c1 first; alice gets the next call
+    assert queue.claim('c1', 'bob', now=3) == [('c2', 'alice')]
+    assert queue.assigned_to('c1') == 'bob'
+    assert queue.waiting_count() == 1  # c2 assigned but not accepted yet
+
+
+def test_status_and_estimate_for_customer_page():
+    depths = []
+    queue = CallQueue(handle_seconds=120, auto_assign=False, on_depth=depths.append)
+    for i in range(3):
+        queue.enqueue(f'c{i}', now=i)
+    queue.add_admin('alice')
+    queue.add_admin('bob')
+
+    assert queue.status('c2') == {'position': 3, 'estimated_wait_seconds': 240, 'queue_length': 3}
+    queue.remove('c0', now=10)
+    assert queue.status('c2')['position'] == 2
+    assert depths[-1] == 2 and len(queue) == 2
+    assert queue.stats()['abandoned'] == 1
+
+
+def test_unaccepted_assignment_expires_and_goes_to_another_admin():
+    queue = CallQueue(assign_timeout=60)
+    queue.add_admin('alice', now=0)
+    assert queue.enqueue('c1', now=1) == [('c1', 'alice')]
+    queue.add_admin('bob', now=2)
+
+    # Not due yet: left to the younger scheduler entry
+    assert queue.expire_assignments(['c1'], now=30) == ([], {'c1': None})
+    assert queue.assigned_to('c1') == 'alice'
+
+    # alice ignored it: back in the queue, bob is offered it, alice is idle-last
+    assert queue.expire_assignments(['c1'], now=61) == ([('c1', None), ('c1', 'bob')], {})
+    assert queue.awaiting_accept('c1') and queue.stats()['assign_expired'] == 1
+    assert queue.enqueue('c2', now=62) == [('c2', 'alice')]
+
+    # Accepted assignments never expire
+    queue.claim('c1', 'bob', now=70)
+    assert queue.expire_assignments(['c1'], now=500) == ([], {})
+    assert queue.assigned_to('c1') == 'bob'
@@ -0,0 +1,49 @@
+import pytest
+
+from call_timeline import CallTimeline
+from metrics import CALL_CONNECT_SLO_MS, MetricsCollector
+
+
+def test_marks_complete_setup_intervals():
+    t = CallTimeline(now=100.0)
+    assert t.mark('accepted', now=101.0) == [('time_to_accept', pytest.approx(1000))]
+    assert t.mark('offer', now=101.5) == [('time_to_offer', pytest.approx(1500))]
+    assert t.mark('ice', now=101.6) == []
+    assert t.mark('ice', now=102.0) == []
+    assert dict(t.mark('answer', now=102.5)) == {'offer_to_answer': pytest.approx(1000)}
+    assert dict(t.mark('connected', now=103.0)) == {
+        'answer_to_connect': pytest.approx(500),
+        'time_to_connect': pytest.approx(3000),
+    }
+    # First mark wins: a second 'connected' from the other peer is ignored
+    assert t.mark('connected', now=104.0) == []
+    assert dict(t.mark('ended', now=163.0)) == {
+        'call_duration': pytest.approx(60000),
+        'ice_gathering': pytest.approx(400),
+    }
+
+    offsets = t.offsets_ms()
+    assert list(offsets) == ['created', 'accepted', 'offer', 'answer', 'first_ice', 'last_ice', 'connected', 'ended']
+    assert offsets['first_ice'] == 1600.0 and offsets['last_ice'] == 2000.0
+    assert t.to_dict()['intervals_ms']['time_to_connect'] == 3000.0
+
+
+def test_unconnected_call_has_no_connect_interval():
+    t = CallTimeline(now=0.0)
+    t.mark('offer', now=1.0)
+    assert t.mark('ended', now=30.0) == []
+    assert t.interval_ms('time_to_connect') is None
+    assert 'time_to_connect' not in t.to_dict()['intervals_ms']
+
+
+def test_collector_call_setup_histograms_and_slo():
+    collector = MetricsCollector()
+    for ms in (800, 2500, 9000, CALL_CONNECT_SLO_MS * 3):
+        collector.record_call_stage('time_to_connect', ms)
+    collector.record_call_stage('offer_to_answer', 400)
+
+    setup = collector.get_current_metrics()['call_setup']
+    assert setup['stages']['time_to_connect']['count'] == 4
+    assert setup['stages']['offer_to_answer']['count'] == 1
+    assert setup['slo'] == {'threshold_ms': CALL_CONNECT_SLO_MS, 'calls': 4, 'within_threshold': 3, 'ratio': 0.75}
+    assert collector.get_exposition_snapshot()['call_setup']['time_to_connect'].count == 4
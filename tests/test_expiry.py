@@ -0,0 +1,43 @@
+import threading
+import time
+
+from expiry import ExpiryScheduler
+
+
+def test_due_keys_are_batched_per_kind_and_rearmed():
+    scheduler = ExpiryScheduler()
+    alive = {'b': 5.0}
+    batches = []
+
+    def expire(keys, now):
+        batches.append(sorted(keys))
+        return {k: alive[k] for k in keys if k in alive}
+
+    scheduler.register('session', expire)
+    for key in ('a', 'b', 'c'):
+        scheduler.schedule('session', key, 0)
+    scheduler.schedule('session', 'later', 60)
+
+    assert scheduler.run_pending() == 2
+    assert batches == [['a', 'b', 'c']]
+    assert scheduler.stats()['pending'] == {'session': 2}  # 'b' re-armed + 'later'
+    assert scheduler.expired_total['session'] == 2
+
+    # None: still alive but scheduled elsewhere, so not re-armed
+    scheduler.register('session', lambda keys, now: {k: None for k in keys})
+    assert scheduler.run_pending(now=time.monotonic() + 120) == 0
+    assert len(scheduler) == 0
+
+
+def test_timer_thread_fires_at_deadline():
+    scheduler = ExpiryScheduler(resolution=0.01)
+    fired = threading.Event()
+    scheduler.register('otp', lambda keys, now: fired.set())
+    scheduler.start()
+    try:
+        start = time.monotonic()
+        scheduler.schedule('otp', 'x', 0.2)
+        assert fired.wait(2)
+        assert 0.15 <= time.monotonic() - start < 1.5
+    finally:
+        scheduler.stop()
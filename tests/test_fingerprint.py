@@ -0,0 +1,55 @@
+import hashlib
+import importlib
+
+import pytest
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # module import creates the SQLite DB in cwd
+    server_v2 = importlib.import_module('server_v2')
+    server_v2.client_fingerprint.cache_clear()
+    return server_v2
+
+
+def make_handler(server, user_agent):
+    handler = server.Handler.__new__(server.Handler)  # no socket needed
+    handler._fingerprint = None
+    handler.client_address = ('203.0.113.7', 50000)
+    handler.headers = {'User-Agent': user_agent}
+    return handler
+
+
+def test_connection_memo_is_reused_until_user_agent_changes(server, monkeypatch):
+    calls = []
+    original = server.client_fingerprint
+
+    def counting(ip, user_agent):
+        calls.append((ip, user_agent))
+        return original(ip, user_agent)
+
+    monkeypatch.setattr(server, 'client_fingerprint', counting)
+    handler = make_handler(server, 'Firefox')
+
+    first = handler.connection_fingerprint()
+    assert handler.connection_fingerprint() == first  # keep-alive request: memo hit
+    assert calls == [('203.0.113.7', 'Firefox')]
+
+    handler.headers = {'User-Agent': 'Chrome'}
+    second = handler.connection_fingerprint()
+    assert second != first
+    assert calls[-1] == ('203.0.113.7', 'Chrome')
+
+
+def test_rate_limit_buckets_by_keyed_blake2b_id(server, monkeypatch):
+    buckets = []
+    monkeypatch.setattr(server, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(server.OTPManager, 'check_rate_limit', staticmethod(lambda fp: buckets.append(fp) or True))
+
+    server.check_rate_limit('203.0.113.7', 'Firefox')
+    handler = make_handler(server, 'Firefox')
+    server.check_rate_limit('203.0.113.7', fingerprint=handler.connection_fingerprint())
+
+    expected = hashlib.blake2b(b'203.0.113.7:Firefox', digest_size=8, key=server._FINGERPRINT_KEY).hexdigest()
+    assert buckets == [expected, expected]
+    assert expected != hashlib.blake2b(b'203.0.113.7:Firefox', digest_size=8).hexdigest()
@@ -0,0 +1,36 @@
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+
+import json_codec
+
+
+@pytest.mark.parametrize('backend', json_codec.BACKENDS)
+def test_backends_round_trip_bytes(backend):
+    dumps, loads, actual = json_codec.load_backend(backend)
+    if actual != backend:
+        pytest.skip(f'{backend} not installed')
+
+    ts = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    data = {
+        'sdp': 'v=0\r\no=- 1 2 IN IP4 127.0.0.1\r\na=fmtp:111 a&b<c>',
+        'start_time': ts,
+        'calls_by_hour': defaultdict(int, {9: 3}),
+        'name': 'Müşteri',
+    }
+    out = dumps(data)
+    assert isinstance(out, bytes)
+
+    decoded = loads(out)
+    assert decoded['sdp'] == data['sdp']
+    assert decoded['start_time'] == ts.isoformat()
+    assert decoded['calls_by_hour'] == {'9': 3}
+    assert decoded['name'] == 'Müşteri'
+
+
+def test_invalid_input_raises_value_error():
+    with pytest.raises(ValueError):
+        json_codec.loads(b'{"a":')
+    with pytest.raises(ValueError):
+        json_codec.loads(b'\xff\xfe')
@@ -0,0 +1,68 @@
+import json
+import logging
+import queue
+
+import log_config
+from log_config import JSONLineFormatter, NonBlockingQueueHandler, SamplingFilter
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+def test_json_lines_through_queue_listener():
+    sink = ListHandler()
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    log_config.setup_logging('INFO', handlers=[sink], sampled_loggers={'test.sampled': 3})
+    try:
+        log = logging.getLogger('test.pipeline')
+        log.debug("filtered %s", object())  # below root level: never formatted
+        log.info("call %s connected", 'abc12345', extra={'request_id': 'r-1'})
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            log.exception("boom")
+
+        sampled = logging.getLogger('test.sampled')
+        for i in range(9):
+            sampled.info("ICE candidate (%s): %s", 'host', i)
+        sampled.warning("always kept")
+    finally:
+        log_config.stop_logging()  # drains the queue
+        root.handlers[:] = saved_handlers
+        root.setLevel(saved_level)
+
+    entries = [json.loads(line) for line in sink.lines]
+    first = entries[0]
+    assert first['msg'] == 'call abc12345 connected'
+    assert first['level'] == 'INFO' and first['request_id'] == 'r-1'
+    assert 'ZeroDivisionError' in entries[1]['exc']
+    ice = [e for e in entries if e['logger'] == 'test.sampled' and e['level'] == 'INFO']
+    assert [e['msg'][-1] for e in ice] == ['0', '3', '6']
+    assert all(e['sample_every'] == 3 for e in ice)
+    assert entries[-1]['msg'] == 'always kept'
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    log = logging.getLogger('test.dropping')
+    log.propagate = False
+    log.addHandler(handler)
+    for i in range(5):
+        log.error("record %d", i)
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_sampling_filter_passes_warnings():
+    f = SamplingFilter(every=100)
+    record = logging.LogRecord('x', logging.WARNING, __file__, 1, 'w', (), None)
+    assert all(f.filter(record) for _ in range(5))
+    formatted = json.loads(JSONLineFormatter().format(record))
+    assert formatted['logger'] == 'x'
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from metric_types import Histogram, SpaceSaving, TimeBuckets
+
+
+def test_running_aggregates_and_percentiles():
+    h = Histogram()
+    values = [random.uniform(1, 100) for _ in range(5000)]
+    for v in values:
+        h.record(v)
+
+    values.sort()
+    assert h.count == 5000
+    assert h.mean == pytest.approx(sum(values) / len(values))
+    assert h.min == values[0] and h.max == values[-1]
+    # Bucket interpolation: within one bucket width of the exact answer
+    assert h.percentile(50) == pytest.approx(values[2500], abs=25)
+    assert h.percentile(99) == pytest.approx(values[4950], abs=25)
+    assert h.percentile(100) == pytest.approx(values[-1])
+
+
+def test_merge_matches_single_histogram():
+    a, b, both = Histogram(), Histogram(), Histogram()
+    for i in range(1, 200):
+        (a if i % 2 else b).record(i)
+        both.record(i)
+    a.merge(b)
+    assert a.counts == both.counts
+    assert a.snapshot() == both.snapshot()
+
+    with pytest.raises(ValueError):
+        a.merge(Histogram(bounds=(1, 2, 3)))
+
+
+def test_space_saving_keeps_heavy_hitters_in_fixed_space():
+    summary = SpaceSaving(capacity=10)
+    for i in range(5000):
+        summary.add('heavy-a' if i % 4 == 0 else 'heavy-b' if i % 4 == 1 else f'rare-{i}')
+    assert len(summary) == 10
+    top = summary.top_k(2)
+    assert [key for key, _ in top] == ['heavy-a', 'heavy-b']
+    # Count never under-estimates, and over-estimates by at most the error bound
+    count, error = summary.counters['heavy-a']
+    assert count >= 1250 and count - error <= 1250
+
+    other = SpaceSaving(capacity=10)
+    for _ in range(3000):
+        other.add('heavy-c')
+    summary.merge(other)
+    assert len(summary) == 10
+    assert summary.top_k(1)[0][0] == 'heavy-c'
+    count, error = summary.counters['heavy-c']
+    assert count >= 3000 and count - error <= 3000
+
+
+def test_space_saving_bounds_hold_across_repeated_merges():
+    def summary_of(counts, capacity=2):
+        summary = SpaceSaving(capacity)
+        for key, n in counts.items():
+            summary.add(key, n)
+        return summary
+
+    # A is dropped by the second merge; re-adding it must not report an exact 6
+    total = SpaceSaving(capacity=2)
+    for part in ({'A': 3, 'B': 5}, {'C': 4, 'D': 6}, {'A': 6}):
+        total.merge(summary_of(part))
+    count, error = total.counters['A']
+    assert count >= 9 and error > 0
+
+    rng = random.Random(7)
+    total, truth = SpaceSaving(capacity=8), {}
+    for _ in range(30):
+        part = SpaceSaving(capacity=8)
+        for _ in range(200):
+            key = f'k{min(int(rng.expovariate(0.2)), 40)}'
+            part.add(key)
+            truth[key] = truth.get(key, 0) + 1
+        total.merge(part)
+        for key, (count, error) in total.counters.items():
+            assert count >= truth[key] and count - error <= truth[key]
+
+
+def test_time_buckets_expire_and_range():
+    buckets = TimeBuckets(size=7)
+    for day in range(100, 110):
+        buckets.add(day, day - 99)
+    assert buckets.get(102) == 0  # expired, slot reused by 109
+    assert buckets.items() == [(d, d - 99) for d in range(103, 110)]
+    assert buckets.range(105, 106) == [(105, 6), (106, 7)]
+    assert buckets.range(0, 104) == [(103, 4), (104, 5)]
+    buckets.add(50)  # older than the window: ignored
+    assert buckets.get(50) == 0
+
+    other = TimeBuckets(size=7)
+    other.add(109, 5)
+    buckets.merge(other)
+    assert buckets.get(109) == 15
+
+
+def test_count_le_uses_bucket_bounds():
+    h = Histogram((10, 100, 1000))
+    for v in (5, 10, 50, 500, 5000):
+        h.record(v)
+    assert h.count_le(10) == 2
+    assert h.count_le(100) == 3
+    assert h.count_le(1000) == 4
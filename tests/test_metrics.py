@@ -0,0 +1,68 @@
+import threading
+
+from metrics import MetricsCollector
+
+
+def record_batch(collector, worker):
+    for i in range(200):
+        collector.record_request(f'/api/route-{i % 3}', float(i % 50), 500 if i % 20 == 0 else 200)
+    collector.record_call_event('call_started', f'call-{worker:04d}xxxx', f'user{worker % 4}')
+    collector.record_call_event('call_completed', f'call-{worker:04d}xxxx', f'user{worker % 4}', duration_seconds=10 + worker)
+    collector.record_rate_limit_hit('127.0.0.1')
+
+
+def test_sharded_totals_match_single_thread():
+    threaded, serial = MetricsCollector(), MetricsCollector()
+    threads = [threading.Thread(target=record_batch, args=(threaded, w)) for w in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for w in range(16):
+        record_batch(serial, w)
+
+    a, b = threaded.get_current_metrics(), serial.get_current_metrics()
+    assert a['system'] == b['system']
+    assert a['system']['total_requests'] == 3200
+    assert a['system']['errors_total'] == 160
+    assert a['system']['completed_calls'] == 16
+    assert a['latency'] == b['latency']
+    assert a['call_analytics']['customer_names'] == b['call_analytics']['customer_names']
+    assert a['call_analytics']['max_call_duration_seconds'] == 25
+    assert a['performance']['avg_response_time_ms'] == b['performance']['avg_response_time_ms']
+
+    snap = threaded.get_exposition_snapshot()
+    assert snap['requests'][('/api/route-0', 500)] == 64
+    assert snap['call_events'] == {'call_started': 16, 'call_completed': 16}
+
+
+def test_short_lived_threads_share_a_fixed_shard_pool():
+    collector = MetricsCollector(shards=4)
+    for _ in range(50):
+        t = threading.Thread(target=collector.record_request, args=('/api/x', 1.0, 200))
+        t.start()
+        t.join()
+    collector.record_request('/api/x', 1.0, 200)
+    assert len(collector._shards) == 4
+    assert collector.get_exposition_snapshot()['requests'][('/api/x', 200)] == 51
+    # Request-only shards never allocate the call history structures
+    assert all(shard.daily_calls is None for shard in collector._shards)
+
+    collector.record_call_event('call_started', 'call-00000000', 'Ayşe')
+    assert sum(shard.customer_names is not None for shard in collector._shards) == 1
+    assert collector.get_historical_data(days=1)['summary']['top_customers'] == {'Ayşe': 1}
+
+
+def test_historical_data_is_bounded():
+    collector = MetricsCollector()
+    for i in range(1000):
+        collector.record_call_event('call_started', f'call-{i:08d}', f'customer-{i}')
+    for _ in range(50):
+        collector.record_call_event('call_started', 'call-vip00000', 'VIP')
+
+    history = collector.get_historical_data(days=7)
+    assert history['summary']['total_calls'] == 1050
+    assert next(iter(history['summary']['top_customers'])) == 'VIP'
+    assert sum(history['daily_stats'].values()) == 1050
+    assert sum(history['hourly_stats'].values()) == 1050
+    assert len(collector.get_current_metrics()['call_analytics']['customer_names']) <= 100
@@ -0,0 +1,67 @@
+import time
+
+from database import DatabaseManager
+from metrics import MetricsCollector
+from metrics_store import MetricsStore, bucket_start, pick_resolution
+
+
+def make_store(tmp_path):
+    collector = MetricsCollector()
+    db = DatabaseManager(str(tmp_path / 'metrics.db'))
+    return collector, db, MetricsStore(collector, db)
+
+
+def test_flush_writes_deltas_at_every_resolution(tmp_path):
+    collector, db, store = make_store(tmp_path)
+    now = time.time()
+
+    collector.record_request('/api/a', 10.0, 200)
+    collector.record_request('/api/a', 30.0, 500)
+    collector.record_call_event('call_started', 'call-00000001', 'Ali')
+    assert store.flush(timestamp=now - 120) == 9  # requests, errors, calls_started x 3 resolutions
+    assert store.flush(timestamp=now - 120) == 0  # nothing new
+
+    collector.record_request('/api/a', 20.0, 200)
+    store.flush(timestamp=now - 60)
+
+    minutes = store.query(['requests', 'errors'], now - 600, now, 'minute')
+    assert [p['count'] for p in minutes['series']['requests']] == [2, 1]
+    assert minutes['series']['requests'][0]['mean'] == 20.0
+    assert minutes['series']['errors'][0]['count'] == 1
+
+    # Hour/day buckets are downsampled sums of the minute rows
+    hours = store.query(['requests'], now - 7200, now, 'hour')['series']['requests']
+    assert sum(p['count'] for p in hours) == 3
+    assert sum(p['sum'] for p in hours) == 60.0
+
+
+def test_rollups_survive_restart_and_prune(tmp_path):
+    collector, db, store = make_store(tmp_path)
+    collector.record_call_event('call_started', 'call-00000001', 'Ali')
+    store.flush()
+
+    # New process: fresh collector, same database
+    collector2 = MetricsCollector()
+    store2 = MetricsStore(collector2, DatabaseManager(str(tmp_path / 'metrics.db')))
+    collector2.store = store2
+    store2.start()
+    collector2.record_call_event('call_started', 'call-00000002', 'Veli')
+    store2.stop()
+
+    history = collector2.get_historical_data(days=1)
+    assert sum(history['daily_stats'].values()) == 2
+    assert sum(history['hourly_stats'].values()) == 2
+
+    # Minute rows expire after two days, day rows are kept
+    assert store2.prune(now=time.time() + 3 * 86400) > 0
+    assert store2.query(['calls_started'], time.time() - 3600, time.time() + 60, 'minute')['series']['calls_started'] == []
+    assert store2.query(['calls_started'], time.time() - 86400 * 2, time.time() + 60, 'day')['series']['calls_started']
+
+
+def test_bucket_alignment_and_resolution_choice():
+    ts = 1_700_000_123.5
+    assert bucket_start(ts, 'minute') == 1_700_000_100
+    assert bucket_start(ts, 'hour') % 3600 == 0
+    assert pick_resolution(0, 3600) == 'minute'
+    assert pick_resolution(0, 3 * 86400) == 'hour'
+    assert pick_resolution(0, 60 * 86400) == 'day'
@@ -0,0 +1,107 @@
+import hashlib
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from notifier import EventBus, NotificationHub, Notifier, WebhookNotifier
+
+
+class Recorder(Notifier):
+    name = 'recorder'
+
+    def __init__(self, events=None):
+        super().__init__(events)
+        self.received = []
+
+    def deliver(self, event, data, text, urgent):
+        self.received.append((event, data, text, urgent))
+        return True
+
+
+def test_hub_routes_by_event_filter():
+    everything, calls_only = Recorder(), Recorder(events={'call_waiting'})
+    hub = NotificationHub([everything, calls_only])
+
+    assert hub.notify('admin_otp', text='OTP', urgent=True) == ['recorder']
+    hub.notify('call_waiting', {'call_id': 'c1'}, text='new call')
+
+    assert [e[0] for e in everything.received] == ['admin_otp', 'call_waiting']
+    assert calls_only.received == [('call_waiting', {'call_id': 'c1'}, 'new call', False)]
+
+
+def test_failing_backend_does_not_block_others():
+    class Broken(Notifier):
+        name = 'broken'
+
+        def deliver(self, event, data, text, urgent):
+            raise RuntimeError('down')
+
+    recorder = Recorder()
+    hub = NotificationHub([Broken(), recorder])
+    assert hub.notify('call_waiting', {}) == ['recorder']
+
+
+def test_event_bus_fans_out_with_sequence_numbers():
+    bus = EventBus()
+    first, second = bus.subscribe(), bus.subscribe()
+    assert bus.publish('call_waiting', {'call_id': 'a'}) == 2
+    bus.publish('call_waiting', {'call_id': 'b'})
+
+    assert first.get(0.1) == (1, 'call_waiting', {'call_id': 'a'})
+    assert first.get(0.1)[0] == 2
+    assert second.get(0.1)[2] == {'call_id': 'a'}
+
+    bus.unsubscribe(second)
+    assert bus.publish('call_waiting', {}) == 1
+    assert bus.stats()['subscribers'] == 1
+
+
+def test_slow_subscriber_is_dropped_not_blocking():
+    bus = EventBus(max_pending=2)
+    slow = bus.subscribe()
+    for i in range(3):
+        bus.publish('call_waiting', {'n': i})
+    assert slow.overflowed and slow.closed
+    assert bus.subscriber_count() == 0
+    assert bus.stats()['overflowed'] == 1
+
+
+def test_webhook_posts_signed_json():
+    received = []
+    done = threading.Event()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            received.append((self.path, dict(self.headers), body))
+            self.send_response(204)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            done.set()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    webhook = WebhookNotifier(f'http://127.0.0.1:{server.server_port}/hook?x=1', secret='s3cret')
+    webhook.start()
+    try:
+        assert webhook.deliver('call_waiting', {'call_id': 'c1'}, 'ignored', False)
+        assert done.wait(5)
+    finally:
+        webhook.stop()
+        server.shutdown()
+        server.server_close()
+
+    path, headers, body = received[0]
+    assert path == '/hook?x=1'
+    assert headers['X-Event'] == 'call_waiting'
+    expected = 'sha256=' + hmac.new(b's3cret', body, hashlib.sha256).hexdigest()
+    assert headers['X-Signature-256'] == expected
+    payload = json.loads(body)
+    assert payload['event'] == 'call_waiting' and payload['data'] == {'call_id': 'c1'}
+    assert webhook.stats()['sent'] == 1
@@ -0,0 +1,39 @@
+from metrics import MetricsCollector
+from openmetrics import OpenMetricsRenderer
+
+
+def test_render_families_and_cache():
+    collector = MetricsCollector()
+    collector.record_request('/api/poll-signal', 4.0, 200)
+    collector.record_request('/api/poll-signal', 40.0, 200)
+    collector.record_request('/api/create-call', 12.0, 429)
+    collector.record_call_event('call_started', 'abcdefgh1234', 'Ali')
+    collector.record_rate_limit_hit('127.0.0.1')
+    collector.record_call_stage('time_to_connect', 2500)
+    collector.record_queue_wait('assigned', 1500)
+    collector.update_queue_depth(2)
+
+    db = {'connections_opened': 3, 'connections_in_use': 1, 'connection_errors': 0, 'pool_max': 0}
+    renderer = OpenMetricsRenderer(collector, db_stats=lambda: db, cache_seconds=60)
+    text = renderer.render().decode('utf-8')
+    lines = text.splitlines()
+
+    assert lines[-1] == '# EOF'
+    assert 'canli_destek_http_requests_total{route="/api/poll-signal",status="200"} 2' in lines
+    assert 'canli_destek_http_requests_total{route="/api/create-call",status="429"} 1' in lines
+    assert 'canli_destek_http_request_duration_seconds_bucket{route="/api/poll-signal",le="0.005"} 1' in lines
+    assert 'canli_destek_http_request_duration_seconds_bucket{route="/api/poll-signal",le="+Inf"} 2' in lines
+    assert 'canli_destek_http_request_duration_seconds_count{route="/api/poll-signal"} 2' in lines
+    assert 'canli_destek_call_events_total{event="call_started"} 1' in lines
+    assert 'canli_destek_rate_limit_hits_total 1' in lines
+    assert 'canli_destek_call_setup_duration_seconds_bucket{stage="time_to_connect",le="5"} 1' in lines
+    assert 'canli_destek_call_setup_duration_seconds_sum{stage="time_to_connect"} 2.5' in lines
+    assert 'canli_destek_call_queue_wait_seconds_count{outcome="assigned"} 1' in lines
+    assert 'canli_destek_call_queue_depth 2' in lines
+    assert 'canli_destek_db_connections_opened_total 3' in lines
+    assert any(line.startswith('process_threads ') for line in lines)
+
+    # Within the cache window the same payload object is served
+    collector.record_request('/api/poll-signal', 1.0, 200)
+    assert renderer.render() is renderer.render()
+    assert 'status="200"} 2' in renderer.render().decode('utf-8')
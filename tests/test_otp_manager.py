@@ -0,0 +1,134 @@
+import pytest
+
+import otp_manager
+from expiry import ExpiryScheduler
+from otp_manager import OTPManager
+
+
+@pytest.fixture(autouse=True)
+def scheduler(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # otp_backup.json must not appear
+    scheduler = ExpiryScheduler()
+    scheduler.register('otp', otp_manager._expire_otps)
+    scheduler.register('rate_limit', otp_manager._expire_rate_limits)
+    monkeypatch.setattr(otp_manager, 'expiry_scheduler', scheduler)
+    otp_manager.otp_codes.clear()
+    otp_manager.otp_index.clear()
+    yield scheduler
+    otp_manager.otp_codes.clear()
+    otp_manager.otp_index.clear()
+    otp_manager.rate_limit_storage.clear()
+
+
+def test_codes_are_stored_hashed_and_indexed():
+    code = OTPManager.create_otp('call-a')
+    entry = otp_manager.otp_codes['call-a']
+    assert 'code' not in entry and code not in entry['code_hash']
+    assert OTPManager.find_call_id_by_code(code) == 'call-a'
+    assert OTPManager.find_call_id_by_code('000000') is None
+
+    # Re-issuing for the same call drops the old code from the index
+    new_code = OTPManager.create_otp('call-a')
+    assert len(otp_manager.otp_index) == 1
+    assert OTPManager.find_call_id_by_code(new_code) == 'call-a'
+
+    assert OTPManager.verify_otp('call-a', new_code) == (True, 'OTP dogrulandi')
+    assert not otp_manager.otp_codes and not otp_manager.otp_index
+
+
+def test_wrong_attempts_exhaust_code():
+    code = OTPManager.create_otp('call-b')
+    wrong = f'{(int(code) - 100000 + 1) % 900000 + 100000:06d}'
+    for _ in range(otp_manager.MAX_OTP_ATTEMPTS - 1):
+        ok, _ = OTPManager.verify_otp('call-b', wrong)
+        assert not ok
+    assert OTPManager.verify_otp('call-b', wrong) == (False, 'Cok fazla yanlis deneme')
+    assert OTPManager.find_call_id_by_code(code) is None
+    assert OTPManager.verify_otp('call-b', code)[0] is False
+
+
+def test_scheduler_expires_only_due_otps(monkeypatch, scheduler):
+    monkeypatch.setattr(otp_manager, 'OTP_VALIDITY_MINUTES', -1)
+    expired = [OTPManager.create_otp(f'old-{i}') for i in range(3)]
+    monkeypatch.setattr(otp_manager, 'OTP_VALIDITY_MINUTES', 10)
+    live = OTPManager.create_otp('live')
+
+    assert OTPManager.find_call_id_by_code(expired[0]) is None  # lookups check expiry too
+    assert scheduler.run_pending() == 3
+    assert set(otp_manager.otp_codes) == {'live'}
+    assert len(otp_manager.otp_index) == 1
+    assert OTPManager.find_call_id_by_code(live) == 'live'
+    assert len(scheduler) == 1
+
+
+def test_rate_limit_entries_are_forgotten(monkeypatch, scheduler):
+    assert OTPManager.check_rate_limit('fp-a')
+    assert OTPManager.check_rate_limit('fp-a')
+    assert len(scheduler) == 1  # one timer per identifier, not per request
+    assert scheduler.run_pending(now=float('inf')) == 0  # window still open: re-armed
+    assert 'fp-a' in otp_manager.rate_limit_storage
+
+    monkeypatch.setattr(otp_manager, 'RATE_LIMIT_WINDOW', 0)
+    assert scheduler.run_pending(now=float('inf')) == 1
+    assert 'fp-a' not in otp_manager.rate_limit_storage
+
+
+def test_otps_survive_restart_via_database(tmp_path, monkeypatch):
+    from database import DatabaseManager
+
+    monkeypatch.setattr(otp_manager, 'OTP_HASH_KEY', b'key-from-env-or-secret-file')
+    monkeypatch.setattr(otp_manager, 'OTP_HASH_KEY_DURABLE', True)
+    db = DatabaseManager(str(tmp_path / 'otp.db'))
+    OTPManager.init_persistence(db)
+    try:
+        code = OTPManager.create_otp('call-c')
+        other = OTPManager.create_otp('call-d')
+        wrong = f'{(int(other) - 100000 + 1) % 900000 + 100000:06d}'
+        assert OTPManager.verify_otp('call-d', wrong)[0] is False
+        assert OTPManager.verify_otp('call-c', code)[0] is True
+        otp_manager._persistence.flush()
+    finally:
+        OTPManager.stop_persistence()
+    assert not (tmp_path / 'otp_backup.json').exists()
+
+    # "Restart": empty memory, same database
+    otp_manager.otp_codes.clear()
+    otp_manager.otp_index.clear()
+    assert OTPManager.init_persistence(db) == 1
+    try:
+        assert OTPManager.find_call_id_by_code(other) == 'call-d'
+        assert otp_manager.otp_codes['call-d']['attempts'] == 1
+        assert OTPManager.find_call_id_by_code(code) is None
+    finally:
+        OTPManager.stop_persistence()
+
+
+def test_per_process_key_is_never_stored_and_nothing_is_restored(tmp_path, monkeypatch):
+    from database import DatabaseManager
+
+    monkeypatch.setattr(otp_manager, 'OTP_HASH_KEY_DURABLE', False)
+    db = DatabaseManager(str(tmp_path / 'otp.db'))
+    db.save_setting('otp_hash_key', 'ab' * 32)  # left behind by an older version
+    OTPManager.init_persistence(db)
+    try:
+        OTPManager.create_otp('call-e')
+        otp_manager._persistence.flush()
+    finally:
+        OTPManager.stop_persistence()
+    assert db.get_setting('otp_hash_key') is None
+
+    otp_manager.otp_codes.clear()
+    otp_manager.otp_index.clear()
+    assert OTPManager.init_persistence(db) == 0
+    OTPManager.stop_persistence()
+    assert not otp_manager.otp_codes
+
+
+def test_hash_key_can_come_from_a_secret_file(tmp_path, monkeypatch):
+    key_file = tmp_path / 'otp_hash_key'
+    key_file.write_text('s3cret\n')
+    monkeypatch.delenv('OTP_HASH_KEY', raising=False)
+    monkeypatch.setenv('OTP_HASH_KEY_FILE', str(key_file))
+    assert otp_manager._load_hash_key() == b's3cret'
+    monkeypatch.delenv('OTP_HASH_KEY_FILE')
+    assert otp_manager._load_hash_key() is None
@@ -0,0 +1,99 @@
+from database import DatabaseManager
+from presence import PresenceTracker
+
+
+def make_tracker(**kwargs):
+    changes = []
+    tracker = PresenceTracker(away_after=10, offline_after=30, tick=1.0,
+                              on_change=lambda key, state, seen: changes.append((key, state)), **kwargs)
+    return tracker, changes, tracker._origin
+
+
+def test_missed_heartbeats_go_away_then_offline_within_a_tick():
+    tracker, changes, t0 = make_tracker()
+    tracker.track('c1', now=t0)
+    tracker.track('c2', now=t0)
+
+    for second in range(1, 10):
+        tracker.heartbeat('c2', now=t0 + second)
+        tracker.advance(t0 + second)
+    assert changes == []
+
+    tracker.advance(t0 + 10.5)
+    assert changes == [('c1', 'away')]
+    assert tracker.state('c1') == 'away' and tracker.state('c2') == 'online'
+
+    tracker.advance(t0 + 30.5)
+    assert ('c1', 'offline') in changes
+    assert tracker.state('c1') is None and tracker.heartbeat('c1') is False
+    assert tracker.stats()['went_offline'] == 1
+
+
+def test_heartbeat_brings_away_call_back_online_immediately():
+    tracker, changes, t0 = make_tracker()
+    tracker.track('c1', now=t0)
+    tracker.advance(t0 + 12)
+    assert tracker.heartbeat('c1', now=t0 + 15)
+    assert changes == [('c1', 'away'), ('c1', 'online')]
+
+    # Refiled from the new heartbeat: away again 10 s later, not at the old offline deadline
+    tracker.advance(t0 + 24)
+    assert changes[-1] == ('c1', 'online')
+    tracker.advance(t0 + 25.5)
+    assert changes[-1] == ('c1', 'away')
+
+
+def test_forget_and_large_jumps():
+    tracker, changes, t0 = make_tracker()
+    tracker.track('gone', now=t0)
+    tracker.track('idle', now=t0)
+    tracker.forget('gone')
+
+    # Longer than the whole wheel: every slot is still visited once
+    tracker.advance(t0 + 500)
+    assert changes == [('idle', 'offline')]
+    assert len(tracker) == 0
+
+
+def test_last_seen_is_persisted_in_batches(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'presence.db'))
+    tracker, _, t0 = make_tracker(flush_interval=5, persist=db.save_last_seen)
+    tracker.track('c1', now=t0)
+    tracker.track('c2', now=t0)
+    for second in range(1, 5):
+        tracker.heartbeat('c1', now=t0 + second)
+
+    tracker.advance(t0 + 5)
+    assert tracker.counters['flushes'] == 1 and tracker.counters['rows_flushed'] == 2
+    assert db.get_last_seen('c1') is not None
+
+    # Only entries that moved are written again
+    tracker.heartbeat('c2', now=t0 + 6)
+    assert tracker.flush(t0 + 7) == 1
+
+    db.delete_call('c2')
+    assert db.get_last_seen('c2') is None
+
+    # Ended (forgotten) and offline calls lose their row on the next flush
+    tracker.track('c3', now=t0 + 7)
+    tracker.flush(t0 + 7)
+    tracker.forget('c1')
+    tracker.advance(t0 + 40)  # c3 offline, flush due
+    assert db.get_last_seen('c1') is None and db.get_last_seen('c3') is None
+    assert tracker.counters['rows_removed'] >= 2
+
+
+def test_call_forgotten_during_a_flush_is_deleted_by_the_next(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'presence.db'))
+
+    def persist(rows, removed):
+        db.save_last_seen(rows, removed)
+        tracker.forget('c1')  # call ends while the batch is being written
+
+    tracker, _, t0 = make_tracker(persist=persist)
+    tracker.track('c1', now=t0)
+    tracker.flush(t0 + 1)
+    assert db.get_last_seen('c1') is not None
+
+    tracker.flush(t0 + 2)
+    assert db.get_last_seen('c1') is None
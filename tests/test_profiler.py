@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from profiler import InstrumentedLock, ProfilerBusyError, SamplingProfiler, lock_stats
+
+
+def spin_in_marker_function(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+def test_profile_collects_collapsed_stacks_under_overhead_cap():
+    stop = threading.Event()
+    worker = threading.Thread(target=spin_in_marker_function, args=(stop,), name='worker-7')
+    worker.start()
+    try:
+        profiler = SamplingProfiler(max_overhead=0.05)
+        result = profiler.profile(0.5, hz=200)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert result['samples'] > 10
+    assert result['overhead_percent'] <= 6
+    marker = [s for s in result['stacks'] if 'spin_in_marker_function' in s]
+    assert marker and all(s.startswith('worker;') for s in marker)
+    text = SamplingProfiler.collapsed(result)
+    assert text.splitlines()[0].rsplit(' ', 1)[1].isdigit()
+
+
+def test_only_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    t = threading.Thread(target=profiler.profile, args=(0.3,))
+    t.start()
+    time.sleep(0.05)
+    with pytest.raises(ProfilerBusyError):
+        profiler.profile(0.1)
+    t.join()
+
+
+def test_instrumented_lock_records_waits():
+    lock = InstrumentedLock('test.lock')
+    with lock:
+        pass
+    assert lock.stats()['contended'] == 0
+
+    lock.acquire()
+    t = threading.Thread(target=lambda: lock.acquire() and lock.release())
+    t.start()
+    time.sleep(0.05)
+    lock.release()
+    t.join()
+
+    stats = lock_stats()['test.lock']
+    assert stats['acquisitions'] == 3
+    assert stats['contended'] == 1
+    assert stats['wait_max_ms'] >= 40
+    assert lock.acquire(blocking=False)
+    assert not lock.acquire(blocking=False)
+    lock.release()
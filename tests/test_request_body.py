@@ -0,0 +1,39 @@
+import io
+
+import pytest
+
+from errors import APIError, PayloadTooLargeError
+from request_body import BodyReader
+
+
+class TrickleReader(io.BytesIO):
+    """Hands out at most 3 bytes per readinto, like a slow socket"""
+    def readinto(self, b):
+        return super().readinto(b[:3])
+
+
+def test_reads_in_chunks_and_reuses_buffer():
+    reader = BodyReader(chunk_size=4)
+    body = b'{"callId": "abc"}'
+
+    first = reader.read(TrickleReader(body), len(body), limit=1024)
+    assert bytes(first) == body
+    buf_id = id(reader._local.buffer)
+
+    second = reader.read(io.BytesIO(b'{}'), 2, limit=1024)
+    assert bytes(second) == b'{}'
+    assert id(reader._local.buffer) == buf_id
+
+
+def test_limit_enforced_before_reading():
+    reader = BodyReader()
+    rfile = io.BytesIO(b'x' * 100)
+    with pytest.raises(PayloadTooLargeError):
+        reader.read(rfile, 100, limit=10)
+    assert rfile.tell() == 0
+
+
+def test_short_body_is_an_error():
+    with pytest.raises(APIError) as exc:
+        BodyReader().read(io.BytesIO(b'{}'), 10, limit=1024)
+    assert exc.value.status_code == 400
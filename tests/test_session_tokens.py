@@ -0,0 +1,74 @@
+import importlib
+
+import pytest
+
+from database import DatabaseManager
+from session_tokens import SessionTokenSigner
+
+SECRET = b'0123456789abcdef0123456789abcdef'
+UA = 'Mozilla/5.0 (X11; Linux x86_64)'
+
+
+def test_issue_and_verify_across_instances():
+    issued = SessionTokenSigner(SECRET, 3600).issue('10.0.0.1', UA, now=1000)
+    # A second worker with the same secret and no shared state
+    other = SessionTokenSigner(SECRET, 3600)
+    claims = other.verify(issued['token'], '10.0.0.1', UA, now=1001)
+    assert claims == {'session_id': issued['session_id'], 'expires': 4600, 'user_agent_match': True}
+    assert other.verify(issued['token'], '10.0.0.1', 'curl/8', now=1001)['user_agent_match'] is False
+
+
+@pytest.mark.parametrize('mutate', [
+    lambda t: t[:-2] + ('AA' if not t.endswith('AA') else 'BB'),  # bad MAC
+    lambda t: t.replace('.4600.', '.9999.'),                       # extended expiry
+    lambda t: 'v2' + t[2:],
+    lambda t: t + '.x',
+    lambda t: '',
+])
+def test_tampered_tokens_are_rejected(mutate):
+    signer = SessionTokenSigner(SECRET, 3600)
+    token = signer.issue('10.0.0.1', UA, now=1000)['token']
+    assert signer.verify(mutate(token), '10.0.0.1', UA, now=1001) is None
+
+
+def test_expiry_ip_binding_and_revocation():
+    signer = SessionTokenSigner(SECRET, 3600)
+    token = signer.issue('10.0.0.1', UA)['token']
+    assert signer.verify(token, '10.0.0.2', UA) is None
+    assert SessionTokenSigner(b'another-secret-of-32-bytes......', 3600).verify(token, '10.0.0.1', UA) is None
+
+    expired = signer.issue('10.0.0.1', UA, now=0)['token']
+    assert signer.verify(expired, '10.0.0.1', UA) is None
+    assert signer.revoke(expired) is None  # nothing to remember
+
+    session_id, remaining = signer.revoke(token)
+    assert 3590 < remaining <= 3600
+    assert signer.verify(token, '10.0.0.1', UA) is None
+    assert signer.forget_revoked([session_id]) == {session_id: pytest.approx(remaining, abs=5)}
+    assert signer.forget_revoked([session_id], now=10 ** 12) == {}
+    assert signer.revoked_count() == 0
+
+
+def test_server_secret_comes_from_env_or_file_never_the_database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # module import creates the SQLite DB in cwd
+    server_v2 = importlib.import_module('server_v2')
+    db = DatabaseManager(str(tmp_path / 'tokens.db'))
+    monkeypatch.setattr(server_v2, 'db_manager', db)
+    db.save_setting('admin_token_secret', 'ab' * 32)  # written by older versions
+    monkeypatch.delenv('ADMIN_TOKEN_SECRET', raising=False)
+    monkeypatch.delenv('ADMIN_TOKEN_SECRET_FILE', raising=False)
+
+    warnings = []
+    monkeypatch.setattr(server_v2.logger, 'warning', lambda msg, *args: warnings.append(msg))
+    first = server_v2.load_token_secret()
+    assert len(first) == 32 and first != bytes.fromhex('ab' * 32)
+    assert 'per-process secret' in warnings[0]
+    assert server_v2.load_token_secret() != first  # random each process, nothing stored
+    assert db.get_setting('admin_token_secret') is None
+
+    secret_file = tmp_path / 'admin_token_secret'
+    secret_file.write_bytes(b'from-a-file\n')
+    monkeypatch.setenv('ADMIN_TOKEN_SECRET_FILE', str(secret_file))
+    assert server_v2.load_token_secret() == b'from-a-file'
+    monkeypatch.setenv('ADMIN_TOKEN_SECRET', 'from-env')
+    assert server_v2.load_token_secret() == b'from-env'
@@ -49,3 +49,73 @@ def test_health_and_create_call():
         except subprocess.TimeoutExpired:
             proc.kill()
 
+
+
+def test_keep_alive_reuses_connection():
+    import http.client
+
+    env = os.environ.copy()
+    env['PORT'] = '8098'
+    env['HOST'] = '127.0.0.1'
+    env['KEEPALIVE_MAX_REQUESTS'] = '3'
+    proc = subprocess.Popen(['python', 'server_v2.py'], env=env)
+    try:
+        assert wait_for_server('http://127.0.0.1:8098/api/healthz')
+
+        conn = http.client.HTTPConnection('127.0.0.1', 8098, timeout=3)
+        conn.request('GET', '/api/ice-servers')
+        r = conn.getresponse()
+        r.read()
+        assert r.version == 11
+        assert r.getheader('Connection') == 'keep-alive'
+        sock = conn.sock
+
+        # Same socket, POST with body, then the per-connection cap closes it
+        conn.request('POST', '/api/poll-signal', body='{}', headers={'Content-Type': 'application/json'})
+        r = conn.getresponse()
+        r.read()
+        assert conn.sock is sock
+        assert r.getheader('Content-Length') is not None
+
+        conn.request('GET', '/api/metrics/export')
+        r = conn.getresponse()
+        body = r.read()
+        assert int(r.getheader('Content-Length')) == len(body)
+        assert r.getheader('Connection') == 'close'
+        conn.close()
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def test_calls_time_out_only_after_a_first_heartbeat():
+    env = os.environ.copy()
+    env['PORT'] = '8096'
+    env['HOST'] = '127.0.0.1'
+    env['PRESENCE_AWAY_SECONDS'] = '1'
+    env['HEARTBEAT_TIMEOUT'] = '2'
+    proc = subprocess.Popen(['python', 'server_v2.py'], env=env)
+    base = 'http://127.0.0.1:8096'
+    try:
+        assert wait_for_server(f'{base}/api/healthz')
+
+        def post(path, **body):
+            return requests.post(f'{base}{path}', json=body, timeout=3).json()
+
+        silent = post('/api/create-call', customer_name='Sessiz')['call_id']
+        beating = post('/api/create-call', customer_name='Kalp')['call_id']
+        assert post('/api/heartbeat', callId=beating)['success'] is True
+        time.sleep(4)
+
+        # No heartbeat ever: not timed out; heartbeats stopped: closed
+        assert post('/api/call-status', callId=silent)['success'] is True
+        assert post('/api/call-status', callId=beating)['success'] is False
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
@@ -0,0 +1,40 @@
+import time
+
+from system_sampler import SystemSampler, process_stats
+
+
+def test_process_stats_has_core_fields():
+    stats = process_stats()
+    assert stats['threads'] >= 1
+    assert stats['start_time_seconds'] > 0
+
+
+def test_sample_ring_buffer_and_latest():
+    sampler = SystemSampler(interval=60, history=3)
+    assert sampler.latest() is None
+
+    first = sampler.sample_once()
+    assert first['process_cpu_percent'] is None  # needs a previous sample
+    assert set(first['gc']) == {'counts', 'collections', 'collected', 'uncollectable'}
+
+    sum(i * i for i in range(200000))
+    for _ in range(4):
+        sampler.sample_once()
+    latest = sampler.latest()
+    assert latest['process_cpu_percent'] is not None
+    assert len(sampler.history()) == 3
+    assert sampler.history(2)[-1] is latest
+    assert sampler.history(0) == []
+
+
+def test_latest_does_not_block():
+    sampler = SystemSampler(interval=60)
+    sampler.start()
+    try:
+        start = time.perf_counter()
+        for _ in range(1000):
+            sampler.latest()
+        assert time.perf_counter() - start < 0.1
+        assert sampler.latest() is not None
+    finally:
+        sampler.stop()
@@ -0,0 +1,195 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from telegram_dispatcher import TelegramDispatcher
+
+
+class FakeTelegram:
+    """Local stand-in for the Bot API: records messages, can answer 429 first"""
+
+    def __init__(self):
+        self.messages = []
+        self.connections = set()
+        self.responses = []  # queued (status, payload) overrides
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                form = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+                with fake.lock:
+                    fake.connections.add(self.client_address)
+                    status, payload = fake.responses.pop(0) if fake.responses else (200, {'ok': True})
+                    if status == 200:
+                        fake.messages.append((self.path, form['chat_id'][0], form['text'][0]))
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def wait_for(self, count, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if len(self.messages) >= count:
+                return True
+            time.sleep(0.01)
+        return False
+
+
+@pytest.fixture
+def telegram():
+    fake = FakeTelegram()
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
+
+
+def make(telegram, **kwargs):
+    options = dict(workers=1, coalesce_window=0.2, min_interval=0.0)
+    options.update(kwargs)
+    return TelegramDispatcher('TOKEN', '42', api_base=telegram.url, **options)
+
+
+def test_messages_reuse_one_keepalive_connection(telegram):
+    dispatcher = make(telegram, coalesce_window=0)
+    dispatcher.start()
+    try:
+        for i in range(3):
+            dispatcher.send(f'msg {i}', coalesce=False)
+        assert telegram.wait_for(3)
+    finally:
+        dispatcher.stop()
+    assert [m[2] for m in telegram.messages] == ['msg 0', 'msg 1', 'msg 2']
+    assert telegram.messages[0][:2] == ('/botTOKEN/sendMessage', '42')
+    assert len(telegram.connections) == 1
+    assert dispatcher.stats()['sent'] == 3
+
+
+def test_burst_is_coalesced_into_digest(telegram):
+    dispatcher = make(telegram, min_interval=0.5)
+    for i in range(5):
+        dispatcher.send(f'call {i}')
+    dispatcher.start()
+    try:
+        assert telegram.wait_for(1)
+        time.sleep(0.3)
+    finally:
+        dispatcher.stop()
+    assert len(telegram.messages) == 1
+    digest = telegram.messages[0][2]
+    assert '5 bildirim' in digest and all(f'call {i}' in digest for i in range(5))
+    stats = dispatcher.stats()
+    assert stats['coalesced'] == 4 and stats['messages_delivered'] == 5
+
+
+def test_urgent_message_is_never_merged(telegram):
+    dispatcher = make(telegram)
+    dispatcher.send('call a')
+    dispatcher.send('OTP 123456', coalesce=False)
+    dispatcher.send('call b')
+    dispatcher.start()
+    try:
+        assert telegram.wait_for(2)
+    finally:
+        dispatcher.stop()
+    texts = [m[2] for m in telegram.messages]
+    assert 'OTP 123456' in texts
+    assert not any('OTP' in t and 'call' in t for t in texts)
+
+
+def test_429_retry_after_is_honoured(telegram):
+    telegram.responses.append((429, {'ok': False, 'parameters': {'retry_after': 0.3}}))
+    dispatcher = make(telegram)
+    dispatcher.start()
+    try:
+        start = time.monotonic()
+        dispatcher.send('hello', coalesce=False)
+        assert telegram.wait_for(1)
+        assert time.monotonic() - start >= 0.3
+    finally:
+        dispatcher.stop()
+    assert dispatcher.stats()['retries'] == 1
+
+
+def test_client_error_is_not_retried(telegram):
+    telegram.responses.append((400, {'ok': False, 'description': 'chat not found'}))
+    dispatcher = make(telegram)
+    dispatcher.start()
+    try:
+        dispatcher.send('hello', coalesce=False)
+        deadline = time.monotonic() + 5
+        while dispatcher.stats()['rejected'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        dispatcher.stop()
+    stats = dispatcher.stats()
+    assert stats['rejected'] == 1 and stats['retries'] == 0
+    assert stats['failed'] == 0 and stats['spilled'] == 0  # never replayed on restart
+
+
+def test_overflow_spills_to_disk_and_replays(telegram, tmp_path):
+    spill = tmp_path / 'spill.jsonl'
+    dispatcher = make(telegram, queue_size=2, spill_path=str(spill))
+    results = [dispatcher.send(f'm{i}') for i in range(4)]
+    assert results == [True, True, False, False]
+    assert dispatcher.stats()['spilled'] == 2
+    assert len(spill.read_text().splitlines()) == 2
+
+    # Not started: stop() spills what is still queued
+    dispatcher.stop()
+    assert len(spill.read_text().splitlines()) == 4
+
+    replay = make(telegram, spill_path=str(spill))
+    replay.start()
+    try:
+        deadline = time.monotonic() + 5
+        while replay.stats()['messages_delivered'] < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        replay.stop()
+    delivered = '\n'.join(m[2] for m in telegram.messages)
+    assert all(f'm{i}' in delivered for i in range(4))
+    assert replay.stats()['replayed'] == 4
+    assert not spill.exists()
+
+
+def test_urgent_messages_are_never_spilled_or_replayed(telegram, tmp_path):
+    spill = tmp_path / 'spill.jsonl'
+    # Left by an older version: an OTP alert on disk
+    spill.write_text(json.dumps({'text': 'OTP <code>123456</code>', 'coalesce': False}) + '\n')
+
+    dispatcher = make(telegram, queue_size=1, spill_path=str(spill))
+    dispatcher.start()
+    dispatcher.stop()
+    assert not spill.exists() and not telegram.messages
+    assert dispatcher.stats()['dropped_urgent'] == 1
+
+    assert dispatcher.send('call a')
+    assert not dispatcher.send('OTP <code>654321</code>', coalesce=False)
+    dispatcher.stop()
+    assert '654321' not in spill.read_text()
+    assert 'call a' in spill.read_text()
+    assert dispatcher.stats()['dropped_urgent'] == 2
+
+
+def test_overflow_without_spill_file_drops():
+    dispatcher = TelegramDispatcher('TOKEN', '42', api_base='http://127.0.0.1:9', queue_size=1)
+    assert dispatcher.send('a')
+    assert not dispatcher.send('b')
+    assert dispatcher.stats()['dropped'] == 1
@@ -0,0 +1,106 @@
+import importlib
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from tls_config import TLSConfig
+
+pytestmark = pytest.mark.skipif(shutil.which('openssl') is None, reason='openssl CLI not available')
+
+
+@pytest.fixture
+def cert_pair(tmp_path):
+    cert, key = tmp_path / 'cert.pem', tmp_path / 'key.pem'
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+         '-nodes', '-keyout', str(key), '-out', str(cert), '-days', '1', '-subj', '/CN=localhost'],
+        check=True, capture_output=True,
+    )
+    return str(cert), str(key)
+
+
+def serve_once(config, listener):
+    conn, _ = listener.accept()
+    tls = config.wrap(conn)
+    tls.recv(1)
+    tls.sendall(b'ok')
+    tls.close()
+
+
+def connect(port, client_ctx, session=None):
+    raw = socket.create_connection(('127.0.0.1', port), timeout=3)
+    tls = client_ctx.wrap_socket(raw, server_hostname='localhost', session=session)
+    tls.sendall(b'x')
+    assert tls.recv(2) == b'ok'
+    info = (tls.version(), tls.selected_alpn_protocol(), tls.session, tls.session_reused)
+    tls.close()
+    return info
+
+
+def test_handshake_resumption_and_reload(cert_pair, tmp_path):
+    config = TLSConfig(*cert_pair)
+    assert config.context.minimum_version == ssl.TLSVersion.TLSv1_2
+
+    listener = socket.create_server(('127.0.0.1', 0))
+    port = listener.getsockname()[1]
+    client_ctx = ssl.create_default_context(cafile=cert_pair[0])
+    client_ctx.set_alpn_protocols(['http/1.1'])
+
+    t = threading.Thread(target=serve_once, args=(config, listener))
+    t.start()
+    version, alpn, session, reused = connect(port, client_ctx)
+    t.join()
+    assert version in ('TLSv1.2', 'TLSv1.3')
+    assert alpn == 'http/1.1'
+    assert not reused
+
+    t = threading.Thread(target=serve_once, args=(config, listener))
+    t.start()
+    _, _, _, reused = connect(port, client_ctx, session=session)
+    t.join()
+    assert reused
+
+    old_context = config.context
+    assert config.reload() is True
+    assert config.context is not old_context
+
+    config.cert_file = str(tmp_path / 'missing.pem')
+    assert config.reload() is False
+    listener.close()
+
+
+def test_plain_http_client_is_counted_and_closed(cert_pair, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # module import creates the SQLite DB in cwd
+    server_v2 = importlib.import_module('server_v2')
+    config = TLSConfig(*cert_pair, handshake_timeout=3)
+    monkeypatch.setattr(server_v2, 'tls_config', config)
+
+    errors = []
+
+    class Server(ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            errors.append(sys.exc_info()[1])
+
+    httpd = Server(('127.0.0.1', 0), server_v2.Handler)
+    port = httpd.server_address[1]
+    t = threading.Thread(target=httpd.handle_request)
+    t.start()
+    raw = socket.create_connection(('127.0.0.1', port), timeout=3)
+    raw.sendall(b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n')
+    try:
+        while raw.recv(1024):
+            pass  # server drops the connection without answering
+    except ConnectionResetError:
+        pass
+    raw.close()
+    t.join(5)
+    httpd.server_close()
+
+    assert errors == []
+    assert config.stats()['handshake_failures'] == 1
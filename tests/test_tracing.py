@@ -0,0 +1,42 @@
+import time
+
+from tracing import OTHER_ROUTE, UNMATCHED_ROUTE, RouteNormalizer, Tracer, current_trace, span
+
+
+def test_route_normalization_bounds_cardinality():
+    routes = RouteNormalizer(max_routes=3)
+    assert routes.route('/api/poll-signal?callId=abc123xyz789') == '/api/poll-signal'
+    assert routes.route('/api/call-status/Yk3p9Qw2ZcV8rT1uXa0bNg') == '/api/call-status/:id'
+    assert routes.route('/static/css/app.css?v=3') == '/static/*'
+    assert routes.route('/nope', status=404) == UNMATCHED_ROUTE
+    assert routes.route('/api/another') == OTHER_ROUTE  # over the limit
+    assert routes.route('/api/poll-signal') == '/api/poll-signal'  # known routes still map
+
+
+def test_sampled_trace_collects_spans():
+    tracer = Tracer(sample_rate=1.0, buffer_size=10)
+    trace = tracer.start('POST', '/api/create-call', request_id='req-1')
+    assert current_trace() is trace and trace.request_id == 'req-1'
+    with span('validate'):
+        time.sleep(0.002)
+    with span('db'):
+        with span('db.connect'):
+            pass
+    finished = tracer.finish(200)
+    assert finished is trace and current_trace() is None
+
+    slow = tracer.slowest(5)[0]
+    assert slow['route'] == '/api/create-call'
+    assert slow['stages']['validate'] >= 2
+    assert [s['name'] for s in slow['spans']] == ['validate', 'db.connect', 'db']
+    assert tracer.stage_summary()['validate']['count'] == 1
+
+
+def test_unsampled_trace_skips_spans_but_keeps_request_id():
+    tracer = Tracer(sample_rate=0.0)
+    trace = tracer.start('GET', '/api/metrics', request_id='bad id with spaces')
+    assert trace.request_id != 'bad id with spaces' and len(trace.request_id) == 16
+    with span('json_encode'):
+        pass
+    tracer.finish(200)
+    assert trace.spans == [] and tracer.slowest() == []
@@ -0,0 +1,30 @@
+import pytest
+
+from errors import ValidationError
+from validation import escape_html, validate_request
+
+
+def test_escape_is_single_pass():
+    assert escape_html('Tom & "Jerry"') == 'Tom &amp; &quot;Jerry&quot;'
+    assert escape_html('a &amp; b') == 'a &amp;amp; b'
+    assert escape_html('plain') == 'plain'
+
+
+def test_opaque_payloads_pass_through():
+    sdp = "v=0\r\na=fmtp:111 minptime=10;useinbandfec=1\r\na=msid:'x' \"y\" & <z>\r\n" * 200
+    data = validate_request('/api/webrtc-offer', {'callId': 'abc', 'offer': sdp})
+    assert data['offer'] == sdp
+
+
+def test_text_fields_checked_per_route():
+    data = validate_request('/api/create-call', {'customer_name': "O'Brien & Co"})
+    assert data['customer_name'] == 'O&#x27;Brien &amp; Co'
+
+    with pytest.raises(ValidationError):
+        validate_request('/api/create-call', {'customer_name': 'x' * 51})
+    with pytest.raises(ValidationError):
+        validate_request('/api/create-call', {'customer_name': '<script>'})
+    with pytest.raises(ValidationError):
+        validate_request('/api/verify-otp', {'otp': '1234567'})
+    with pytest.raises(ValidationError):
+        validate_request('/api/create-call', ['not', 'a', 'dict'])
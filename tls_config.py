@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TLS Configuration - termination settings for the built-in HTTPS server
+
+- TLS 1.2+ only, ECDHE key exchange with AEAD ciphers (AES-GCM, ChaCha20)
+- Session resumption: TLS 1.3 tickets and the TLS 1.2 server session cache
+- ALPN advertises http/1.1 (matches Handler.protocol_version)
+- Certificates reload on demand (SIGHUP) without dropping the listener
+
+Connections are wrapped per accepted socket in the worker thread, so a slow
+client handshake never blocks the accept loop, and a reload only swaps the
+context used for *new* connections.
+"""
+import logging
+import os
+import socket
+import ssl
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# TLS 1.2 suites; TLS 1.3 suites are fixed by OpenSSL and are all AEAD
+TLS12_CIPHERS = 'ECDHE+AESGCM:ECDHE+CHACHA20:!aNULL:!eNULL:!MD5:!SHA1'
+
+
+class TLSConfig:
+    """Builds and hot-reloads the server SSLContext"""
+
+    def __init__(self, cert_file: str, key_file: str,
+                 alpn_protocols: Sequence[str] = ('http/1.1',),
+                 session_tickets: int = 2,
+                 ecdh_curve: Optional[str] = None,
+                 handshake_timeout: float = 5.0):
+        self.cert_file = cert_file
+        self.key_file = key_file
+        self.alpn_protocols = list(alpn_protocols)
+        self.session_tickets = session_tickets
+        self.ecdh_curve = ecdh_curve
+        self.handshake_timeout = handshake_timeout
+        self.reload_count = 0
+        self.handshake_failures = 0
+        self._lock = threading.Lock()
+        self._context = self._build_context()
+
+    @property
+    def context(self) -> ssl.SSLContext:
+        return self._context
+
+    def _build_context(self) -> ssl.SSLContext:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.minimum_version = ssl.TLSVersion.TLSv1_2
+        context.set_ciphers(TLS12_CIPHERS)
+        context.options |= ssl.OP_NO_COMPRESSION | ssl.OP_CIPHER_SERVER_PREFERENCE
+        # Keep stateless tickets on for TLS 1.2 resumption
+        context.options &= ~ssl.OP_NO_TICKET
+        context.num_tickets = self.session_tickets
+        if self.ecdh_curve:
+            # Otherwise OpenSSL's default group order applies (X25519 first)
+            context.set_ecdh_curve(self.ecdh_curve)
+        if self.alpn_protocols and ssl.HAS_ALPN:
+            context.set_alpn_protocols(self.alpn_protocols)
+        context.load_cert_chain(certfile=self.cert_file, keyfile=self.key_file)
+        return context
+
+    def reload(self) -> bool:
+        """Re-read cert/key from disk; keeps the old context on failure"""
+        try:
+            context = self._build_context()
+        except (OSError, ssl.SSLError) as e:
+            logger.error(f"TLS reload failed, keeping current certificate: {e}")
+            return False
+        with self._lock:
+            self._context = context
+            self.reload_count += 1
+        logger.info(f"TLS certificate reloaded: {self.cert_file}")
+        return True
+
+    def wrap(self, sock: socket.socket) -> ssl.SSLSocket:
+        """Wrap an accepted socket and complete the handshake (worker thread)
+
+        On failure the socket is closed before the error is re-raised.
+        """
+        sock.settimeout(self.handshake_timeout)
+        tls_sock = self._context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False)
+        try:
+            tls_sock.do_handshake()
+        except (OSError, ssl.SSLError):
+            self.handshake_failures += 1
+            tls_sock.close()  # owns the fd now; `sock` was detached by wrap_socket
+            raise
+        return tls_sock
+
+    def stats(self) -> Dict[str, Any]:
+        """Session cache / ticket counters for monitoring"""
+        session_stats = self._context.session_stats()
+        return {
+            'reload_count': self.reload_count,
+            'handshake_failures': self.handshake_failures,
+            'sessions_accepted': session_stats.get('accept_good', 0),
+            'sessions_resumed': session_stats.get('hits', 0),
+            'session_cache_size': session_stats.get('number', 0),
+        }
+
+
+def load_tls_config_from_env() -> Optional[TLSConfig]:
+    """TLSConfig from CERT_FILE/KEY_FILE and TLS_* env vars, or None"""
+    cert_file = os.getenv('CERT_FILE')
+    key_file = os.getenv('KEY_FILE')
+    if not (cert_file and key_file and os.path.exists(cert_file) and os.path.exists(key_file)):
+        return None
+    return TLSConfig(
+        cert_file,
+        key_file,
+        session_tickets=int(os.getenv('TLS_SESSION_TICKETS', '2')),
+        ecdh_curve=os.getenv('TLS_ECDH_CURVE') or None,
+        handshake_timeout=float(os.getenv('TLS_HANDSHAKE_TIMEOUT', '5')),
+    )
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request tracing - per-stage timings for the Handler pipeline
+
+Each request gets a request ID (echoed in X-Request-ID) and, when sampled,
+a Trace that collects spans from anywhere on the same thread:
+
+    with span('rate_limit'):
+        ...
+
+Unsampled requests pay one thread-local lookup per span. Finished sampled
+traces go into a bounded ring buffer (slowest-N debug view) and per-stage
+histograms. Route names are normalized so metrics keep a bounded label set.
+"""
+import random
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from metric_types import Histogram
+
+_local = threading.local()
+
+# Incoming X-Request-ID values are echoed only if they look like IDs
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+# Path segments treated as identifiers (call ids, tokens, uuids, numbers)
+_ID_SEGMENT_RE = re.compile(r'^(?=.*\d)[A-Za-z0-9_-]{8,}$|^\d+$|^[0-9a-fA-F-]{16,}$')
+
+# Static trees collapse to one route each
+STATIC_PREFIXES = ('/static/', '/admin/', '/index/')
+UNMATCHED_ROUTE = '(unmatched)'
+OTHER_ROUTE = '(other)'
+
+
+class Trace:
+    """Spans of one request (monotonic perf_counter timestamps)"""
+
+    __slots__ = ('request_id', 'method', 'path', 'route', 'status', 'sampled',
+                 'started_at', 'start', 'end', 'spans')
+
+    def __init__(self, request_id: str, method: str, path: str, sampled: bool):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.route = path
+        self.status = 0
+        self.sampled = sampled
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.spans: List[Tuple[str, float, float]] = []
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def stages(self) -> Dict[str, float]:
+        """Total milliseconds per span name"""
+        totals: Dict[str, float] = {}
+        for name, begin, end in self.spans:
+            totals[name] = totals.get(name, 0.0) + (end - begin) * 1000
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'request_id': self.request_id,
+            'method': self.method,
+            'route': self.route,
+            'status': self.status,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'duration_ms': round(self.duration_ms, 3),
+            'stages': {name: round(ms, 3) for name, ms in self.stages().items()},
+            'spans': [
+                {
+                    'name': name,
+                    'offset_ms': round((begin - self.start) * 1000, 3),
+                    'duration_ms': round((end - begin) * 1000, 3),
+                }
+                for name, begin, end in self.spans
+            ],
+        }
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'begin')
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self) -> '_Span':
+        self.begin = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.trace.spans.append((self.name, self.begin, time.perf_counter()))
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NoopSpan':
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def current_trace() -> Optional[Trace]:
+    return getattr(_local, 'trace', None)
+
+
+def span(name: str):
+    """Time a block into the current thread's trace (no-op when unsampled)"""
+    trace = getattr(_local, 'trace', None)
+    if trace is None or not trace.sampled:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+class RouteNormalizer:
+    """Maps raw request paths to a bounded set of route names"""
+
+    def __init__(self, max_routes: int = 200):
+        self.max_routes = max_routes
+        self._cache: Dict[str, str] = {}
+        self._routes: set = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        path = path.split('?', 1)[0].split('#', 1)[0] or '/'
+        for prefix in STATIC_PREFIXES:
+            if path.startswith(prefix):
+                return prefix + '*'
+        segments = path.split('/')
+        return '/'.join(':id' if _ID_SEGMENT_RE.match(s) else s for s in segments)
+
+    def route(self, path: str, status: int = 200) -> str:
+        if status == 404:
+            return UNMATCHED_ROUTE
+        cached = self._cache.get(path)
+        if cached is not None:
+            return cached
+        route = self._normalize(path)
+        with self._lock:
+            if route not in self._routes:
+                if len(self._routes) >= self.max_routes:
+                    return OTHER_ROUTE
+                self._routes.add(route)
+            if len(self._cache) < self.max_routes * 4:
+                self._cache[path] = route
+        return route
+
+
+class Tracer:
+    """Starts/finishes per-request traces and keeps recent sampled ones"""
+
+    def __init__(self, sample_rate: float = 0.1, buffer_size: int = 500, max_routes: int = 200):
+        self.sample_rate = sample_rate
+        self.routes = RouteNormalizer(max_routes)
+        self._recent: deque = deque(maxlen=buffer_size)
+        self._stage_latency: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def start(self, method: str, path: str, request_id: Optional[str] = None) -> Trace:
+        if not request_id or not _REQUEST_ID_RE.match(request_id):
+            request_id = secrets.token_hex(8)
+        sampled = self.sample_rate >= 1.0 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+        trace = Trace(request_id, method, path, sampled)
+        _local.trace = trace
+        return trace
+
+    def finish(self, status: int) -> Optional[Trace]:
+        """Close the current trace, assign its normalized route, keep it if sampled"""
+        trace = getattr(_local, 'trace', None)
+        if trace is None:
+            return None
+        _local.trace = None
+        trace.end = time.perf_counter()
+        trace.status = status
+        trace.route = self.routes.route(trace.path, status)
+        if trace.sampled:
+            stages = trace.stages()
+            with self._lock:
+                self._recent.append(trace)
+                for name, ms in stages.items():
+                    histogram = self._stage_latency.get(name)
+                    if histogram is None:
+                        histogram = self._stage_latency[name] = Histogram()
+                    histogram.record(ms)
+        return trace
+
+    def slowest(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Slowest of the recent sampled requests, with per-stage breakdown"""
+        with self._lock:
+            recent = list(self._recent)
+        recent.sort(key=lambda t: t.duration_ms, reverse=True)
+        return [t.to_dict() for t in recent[:limit]]
+
+    def stage_summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: h.snapshot() for name, h in self._stage_latency.items()}
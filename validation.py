@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Schema-driven input validation for POST /api/* routes
+
+Each route declares its fields once; a request body is checked and
+sanitized in a single pass over its top-level keys. Text fields are scanned
+with one regex search and, only when something needs escaping, one
+str.translate call. Opaque WebRTC payloads (SDP offers/answers, ICE
+candidates) are passed through untouched.
+"""
+import re
+from typing import Any, Dict, NamedTuple, Optional
+
+from errors import ValidationError
+
+
+class Field(NamedTuple):
+    """Validation rule for one top-level body field"""
+    max_length: int = 1000
+    sanitize: bool = True    # reject '<' / '>' and HTML-escape the rest
+    opaque: bool = False     # skip all checks (SDP, ICE, ...)
+
+
+DEFAULT_FIELD = Field()
+OPAQUE = Field(max_length=0, sanitize=False, opaque=True)
+CALL_ID = Field(max_length=64)
+
+# Fields accepted by every route
+_COMMON: Dict[str, Field] = {
+    'callId': CALL_ID,
+    'call_id': CALL_ID,
+}
+
+ROUTE_SCHEMAS: Dict[str, Dict[str, Field]] = {
+    '/api/verify-otp': {'otp': Field(max_length=6)},
+    '/api/create-call': {'customer_name': Field(max_length=50)},
+    '/api/update-call-status': {'status': Field(max_length=32)},
+    '/api/queue/priority': {'priority': Field(max_length=4)},
+    '/api/webrtc-offer': {'offer': OPAQUE},
+    '/api/webrtc-answer': {'answer': OPAQUE},
+    '/api/ice-candidate': {'candidate': OPAQUE},
+    '/api/signal': {
+        'type': Field(max_length=16),
+        'offer': OPAQUE,
+        'answer': OPAQUE,
+        'candidate': OPAQUE,
+    },
+}
+
+# Merge common fields once at import so lookups are a single dict.get
+_SCHEMAS: Dict[str, Dict[str, Field]] = {
+    route: {**_COMMON, **fields} for route, fields in ROUTE_SCHEMAS.items()
+}
+
+_SPECIAL_CHARS = re.compile(r'[<>&"\']')
+_REJECT_CHARS = re.compile(r'[<>]')
+_ESCAPE_TABLE = str.maketrans({
+    '&': '&amp;',
+    '"': '&quot;',
+    "'": '&#x27;',
+    '<': '&lt;',
+    '>': '&gt;',
+})
+
+
+def escape_html(text: str) -> str:
+    """HTML-escape in one pass ('&' is never double-encoded)"""
+    if _SPECIAL_CHARS.search(text) is None:
+        return text
+    return text.translate(_ESCAPE_TABLE)
+
+
+def get_schema(path: str) -> Dict[str, Field]:
+    """Field rules for a route (common fields only for undeclared routes)"""
+    return _SCHEMAS.get(path, _COMMON)
+
+
+def validate_request(path: str, data: Any, schema: Optional[Dict[str, Field]] = None) -> Dict[str, Any]:
+    """Validate and sanitize a POST body in place; raises ValidationError"""
+    if not isinstance(data, dict):
+        raise ValidationError("Invalid request body")
+
+    if schema is None:
+        schema = get_schema(path)
+
+    for field, value in data.items():
+        if not isinstance(value, str):
+            continue
+
+        spec = schema.get(field, DEFAULT_FIELD)
+        if spec.opaque:
+            continue
+        if len(value) > spec.max_length:
+            raise ValidationError(f"Field {field} too long")
+        if not spec.sanitize:
+            continue
+
+        match = _SPECIAL_CHARS.search(value)
+        if match is None:
+            continue
+        # Raw angle brackets may indicate attempted HTML/script injection
+        if _REJECT_CHARS.search(value, match.start()) is not None:
+            raise ValidationError(f"Invalid characters in field {field}")
+        data[field] = value.translate(_ESCAPE_TABLE)
+
+    return data